@@ -0,0 +1,106 @@
+"""
+Benchmark the /api/tags and /api/parts endpoints of the web app on a database of 10k parts,
+while a background writer keeps updating part statuses as upload jobs do.
+
+The database is created in a temporary playground home. Compare settings by running the script
+with GEMINI_PLAYGROUND_DB_* variables, e.g. the previous configuration:
+
+    GEMINI_PLAYGROUND_DB_POOL_SIZE=0 GEMINI_PLAYGROUND_DB_JOURNAL_MODE=DELETE \\
+        GEMINI_PLAYGROUND_DB_SYNCHRONOUS=FULL python examples/benchmark_web_db.py
+"""
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ["GEMINI_PLAYGROUND_HOME"] = tempfile.mkdtemp(prefix="geminiplayground-bench-")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+
+from geminiplayground.web.api import api  # noqa: E402
+from geminiplayground.web.db.models import MultimodalPartEntry, EntryStatus  # noqa: E402
+from geminiplayground.web.db.session_manager import sessionmanager  # noqa: E402
+
+NUM_PARTS = 10_000
+NUM_REQUESTS = 50
+CONCURRENCY = 16
+
+
+async def seed():
+    await sessionmanager.init()
+    statuses = [EntryStatus.READY, EntryStatus.READY, EntryStatus.PENDING, EntryStatus.ERROR]
+    async with sessionmanager.session() as session:
+        session.add_all(
+            MultimodalPartEntry(
+                name=f"file_{i}.png",
+                content_type=["image", "video", "audio", "pdf"][i % 4],
+                status=statuses[i % len(statuses)],
+                thumbnail=f"thumbnails/{i:064x}_256.jpg",
+            )
+            for i in range(NUM_PARTS)
+        )
+        await session.commit()
+
+
+async def write_statuses(stop: asyncio.Event):
+    """
+    Flip part statuses one commit at a time, returning the number of commits.
+    """
+    commits = 0
+    while not stop.is_set():
+        async with sessionmanager.session() as session:
+            await session.execute(
+                update(MultimodalPartEntry)
+                .where(MultimodalPartEntry.name == f"file_{random.randrange(NUM_PARTS)}.png")
+                .values(status=random.choice([EntryStatus.READY, EntryStatus.PENDING]))
+            )
+            await session.commit()
+        commits += 1
+        await asyncio.sleep(0)
+    return commits
+
+
+async def bench(client: httpx.AsyncClient, path: str):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    writer = asyncio.create_task(write_statuses(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(NUM_REQUESTS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    commits = await writer
+    latencies.sort()
+    print(
+        f"{path:<12} {NUM_REQUESTS / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms  "
+        f"writes {commits / elapsed:7.1f}/s"
+    )
+
+
+async def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    await seed()
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        for path in ("/tags", "/parts"):
+            await bench(client, path)
+    await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
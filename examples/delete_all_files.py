@@ -5,5 +5,9 @@ load_dotenv(find_dotenv())
 
 if __name__ == "__main__":
     gemini_client = GeminiClient()
-    files = gemini_client.query_files()
-    gemini_client.delete_files(*files)
+    # filters such as mime_type="video/*" or expires_within=3600 narrow the selection
+    results = gemini_client.delete_files(all_files=True, max_workers=16)
+    for result in results:
+        if result.status == "failed":
+            print(f"Failed to delete {result.name}: {result.error}")
+    print(f"Deleted {sum(r.status != 'failed' for r in results)} of {len(results)} files")
@@ -32,6 +32,9 @@ if __name__ == "__main__":
         try:
             model_response = chat.send_message(user_input)
             for response_chunk in model_response:
+                if isinstance(response_chunk, ToolCall):
+                    print(f"[{response_chunk.tool_name}({response_chunk.tool_args}) -> {response_chunk.tool_result}]")
+                    continue
                 print(response_chunk.text, end="")
             print()
         except Exception as e:
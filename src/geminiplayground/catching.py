@@ -1,11 +1,107 @@
+import functools
 import logging
+from typing import Any, Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from diskcache import Cache
 from geminiplayground.utils import LibUtils
 
 logger = logging.getLogger("rich")
 
-playground_home = LibUtils.get_lib_home()
-cache_folder = playground_home.joinpath(".cache").resolve()
-logger.info(f"Using cache directory: {cache_folder}")
-cache = Cache(directory=str(cache_folder))
+
+class CacheSettings(BaseSettings):
+    """
+    Cache backend configuration, read from `GEMINI_PLAYGROUND_CACHE_*` environment variables.
+
+    Backends:
+        - "disk": a single `diskcache.Cache` (default).
+        - "fanout": a sharded `diskcache.FanoutCache`, which spreads writers from several
+          uvicorn workers over `shards` SQLite files.
+        - "memory": a per-process `MemoryCache`, handy for tests.
+        - "redis": a `RedisCache` shared across nodes.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="GEMINI_PLAYGROUND_CACHE_")
+
+    backend: Literal["disk", "fanout", "memory", "redis"] = "disk"
+    directory: Optional[str] = None
+    shards: int = 8
+    size_limit: int = 2 ** 30
+    eviction_policy: Literal[
+        "least-recently-stored", "least-recently-used", "least-frequently-used", "none"
+    ] = "least-recently-stored"
+    memory_max_size: int = 10_000
+    redis_url: str = "redis://localhost:6379/0"
+    redis_prefix: str = "geminiplayground:"
+
+
+@functools.lru_cache(maxsize=None)
+def get_cache():
+    """
+    Create the configured cache backend on first use.
+
+    Returns:
+        An object implementing the `diskcache.Cache` API subset used in this package.
+    """
+    settings = CacheSettings()
+
+    if settings.backend == "memory":
+        from geminiplayground.utils import MemoryCache
+
+        logger.info("Using in-memory cache")
+        return MemoryCache(max_size=settings.memory_max_size)
+
+    if settings.backend == "redis":
+        from geminiplayground.utils import RedisCache
+
+        logger.info(f"Using redis cache: {settings.redis_url}")
+        return RedisCache(url=settings.redis_url, prefix=settings.redis_prefix)
+
+    from diskcache import Cache, FanoutCache
+
+    cache_folder = settings.directory or LibUtils.get_lib_home().joinpath(".cache").resolve()
+    if settings.backend == "fanout":
+        logger.info(f"Using cache directory: {cache_folder} ({settings.shards} shards)")
+        return FanoutCache(
+            directory=str(cache_folder),
+            shards=settings.shards,
+            size_limit=settings.size_limit,
+            eviction_policy=settings.eviction_policy,
+        )
+
+    logger.info(f"Using cache directory: {cache_folder}")
+    return Cache(
+        directory=str(cache_folder),
+        size_limit=settings.size_limit,
+        eviction_policy=settings.eviction_policy,
+    )
+
+
+class LazyCache:
+    """
+    A proxy to the configured cache backend, which is only created on first use.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_cache(), name)
+
+    def __contains__(self, key) -> bool:
+        return key in get_cache()
+
+    def __getitem__(self, key):
+        return get_cache()[key]
+
+    def __setitem__(self, key, value):
+        get_cache()[key] = value
+
+    def __delitem__(self, key):
+        del get_cache()[key]
+
+    def __iter__(self):
+        return iter(get_cache())
+
+    def __len__(self) -> int:
+        return len(get_cache())
+
+
+cache = LazyCache()
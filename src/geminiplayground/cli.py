@@ -5,6 +5,7 @@ import typer
 from typing_extensions import Annotated
 from dotenv import load_dotenv, find_dotenv
 from geminiplayground.catching import cache
+from geminiplayground.utils import DownloadCache
 
 app = typer.Typer(invoke_without_command=True)
 
@@ -70,8 +71,57 @@ def api(
 def clear_cache():
     """Clear the application cache."""
     cache.clear()
+    DownloadCache().clear()
     typer.echo("✅ Cache cleared.")
 
 
+@app.command()
+def reconcile(
+        refresh_within: Annotated[
+            Optional[float], typer.Option("--refresh-within", help="Re-upload files expiring within N seconds.")
+        ] = None,
+        dry_run: Annotated[bool, typer.Option("--dry-run")] = False,
+        api_key: Annotated[Optional[str], typer.Option(envvar="GEMINI_API_KEY")] = None,
+):
+    """Evict cached uploads of files deleted from Gemini."""
+    set_api_key_env(api_key)
+    from geminiplayground.parts import RemoteFileReconciler
+
+    report = RemoteFileReconciler().reconcile(refresh_within=refresh_within, dry_run=dry_run)
+    prefix = "Would evict" if dry_run else "Evicted"
+    typer.echo(
+        f"✅ Checked {report.checked} cached files against {report.remote_files} remote files. "
+        f"{prefix} {len(report.evicted)}, refreshed {len(report.refreshed)}, failed {len(report.failed)}."
+    )
+
+
+@app.command()
+def worker(
+        workers: Annotated[int, typer.Option("--workers", help="Number of concurrent jobs.")] = 2,
+        api_key: Annotated[Optional[str], typer.Option(envvar="GEMINI_API_KEY")] = None,
+):
+    """Run background jobs (uploads, clones, thumbnails) outside the web server."""
+    set_api_key_env(api_key)
+    import asyncio
+    # registers the job handlers
+    import geminiplayground.web.api  # noqa: F401
+    from geminiplayground.web.db.session_manager import sessionmanager
+    from geminiplayground.web.jobs import job_queue
+
+    async def run():
+        await sessionmanager.init()
+        job_queue.start(workers)
+        typer.echo(f"✅ Running {workers} job workers, press Ctrl+C to stop.")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await job_queue.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     app()
@@ -1,4 +1,6 @@
-from .gemini_client import GeminiClient
+from .file_mirror import FileMirror
+from .gemini_client import GeminiClient, FileDeletionResult
 from .gemini_playground import GeminiPlayground, Message, ToolCall
+from .history_compactor import HistoryCompactor
 
-__all__ = ["GeminiClient", "GeminiPlayground", "Message", "ToolCall"]
+__all__ = ["GeminiClient", "FileDeletionResult", "FileMirror", "GeminiPlayground", "HistoryCompactor", "Message", "ToolCall"]
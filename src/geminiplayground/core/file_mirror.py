@@ -0,0 +1,216 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, Optional, Union
+
+from google.genai.types import File
+
+from geminiplayground.utils import LibUtils
+
+if TYPE_CHECKING:
+    from .gemini_client import GeminiClient
+
+logger = logging.getLogger("rich")
+
+# A full listing is forced when the last one is older than this many seconds
+MIRROR_FULL_REFRESH_INTERVAL = 15 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS remote_file (
+    name TEXT PRIMARY KEY,
+    display_name TEXT,
+    mime_type TEXT,
+    size_bytes INTEGER,
+    update_time REAL,
+    expiration_time REAL,
+    state TEXT,
+    seen_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_remote_file_mime_type ON remote_file (mime_type);
+CREATE INDEX IF NOT EXISTS ix_remote_file_size_bytes ON remote_file (size_bytes);
+CREATE INDEX IF NOT EXISTS ix_remote_file_expiration_time ON remote_file (expiration_time);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+class FileMirror:
+    """
+    A local SQLite mirror of the metadata of the uploaded Gemini files.
+
+    Lookups by name, MIME type, size or expiry are served locally. `refresh` lists files newest
+    first and stops at the first page that brings nothing new, while a full listing, which also
+    drops files deleted by other clients, runs at most every `full_refresh_interval` seconds.
+    Uploads and deletions made through the owning `GeminiClient` are written through.
+    """
+
+    def __init__(
+            self,
+            gemini_client: "GeminiClient",
+            database: Optional[Union[str, Path]] = None,
+            full_refresh_interval: float = MIRROR_FULL_REFRESH_INTERVAL,
+    ):
+        self._gemini_client = gemini_client
+        self.database = Path(database or LibUtils.get_lib_home().joinpath("file_mirror.db"))
+        self.full_refresh_interval = full_refresh_interval
+        self._refresh_lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row(file: File, seen_at: float) -> tuple:
+        return (
+            file.name,
+            file.display_name,
+            file.mime_type,
+            file.size_bytes,
+            file.update_time.timestamp() if file.update_time else None,
+            file.expiration_time.timestamp() if file.expiration_time else None,
+            file.state.name if file.state else None,
+            seen_at,
+            file.model_dump_json(exclude_none=True),
+        )
+
+    def _get_state(self, conn: sqlite3.Connection, key: str) -> Optional[float]:
+        row = conn.execute("SELECT value FROM mirror_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_state(conn: sqlite3.Connection, key: str, value: float):
+        conn.execute("INSERT OR REPLACE INTO mirror_state (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, files: Iterable[File]) -> int:
+        """
+        Insert or update files in the mirror.
+
+        Returns:
+            The number of files that were new or changed.
+        """
+        now = time.time()
+        changed = 0
+        with closing(self._connect()) as conn, conn:
+            for file in files:
+                row = conn.execute(
+                    "SELECT update_time, state FROM remote_file WHERE name = ?", (file.name,)
+                ).fetchone()
+                new_row = self._row(file, now)
+                if row is None or tuple(row) != (new_row[4], new_row[6]):
+                    changed += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO remote_file VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", new_row
+                )
+        return changed
+
+    def remove(self, *names: str):
+        """
+        Remove files from the mirror.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM remote_file WHERE name = ?", [(name,) for name in names])
+
+    def refresh(self, full: Optional[bool] = None, page_size: int = 100) -> int:
+        """
+        Bring the mirror up to date.
+
+        Args:
+            full: Force (True) or prevent (False) a full listing. By default, a full listing
+                runs when the last one is older than `full_refresh_interval`.
+            page_size: Files requested per page.
+
+        Returns:
+            The number of files that were new or changed.
+        """
+        with self._refresh_lock:
+            with closing(self._connect()) as conn:
+                last_full = self._get_state(conn, "last_full_refresh")
+            if full is None:
+                full = last_full is None or time.time() - last_full > self.full_refresh_interval
+
+            started_at = time.time()
+            changed = 0
+            for page in self._gemini_client.iter_file_pages(page_size=page_size):
+                page_changed = self.upsert(page)
+                changed += page_changed
+                if not full and page_changed == 0:
+                    break
+
+            with closing(self._connect()) as conn, conn:
+                if full:
+                    # every live file was seen during the listing
+                    conn.execute("DELETE FROM remote_file WHERE seen_at < ?", (started_at,))
+                    self._set_state(conn, "last_full_refresh", started_at)
+                conn.execute("DELETE FROM remote_file WHERE expiration_time < ?", (time.time(),))
+            logger.info(f"[File Mirror] {'Full' if full else 'Incremental'} refresh, {changed} files changed")
+            return changed
+
+    def get(self, name: str) -> Optional[File]:
+        """
+        Look a file up by name, with or without the "files/" prefix.
+        """
+        name = name if name.startswith("files/") else f"files/{name}"
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM remote_file WHERE name = ?", (name,)).fetchone()
+        return File.model_validate_json(row[0]) if row else None
+
+    def find(
+            self,
+            name_prefix: Optional[str] = None,
+            mime_type: Optional[str] = None,
+            min_size: Optional[int] = None,
+            max_size: Optional[int] = None,
+            expires_within: Optional[float] = None,
+            limit: Optional[int] = None,
+    ) -> List[File]:
+        """
+        Query the mirror.
+
+        Args:
+            name_prefix: Name (with or without "files/") or display name prefix.
+            mime_type: MIME type, "*" wildcards allowed (e.g. "image/*").
+            min_size: Minimum size in bytes.
+            max_size: Maximum size in bytes.
+            expires_within: Only files expiring within this many seconds.
+            limit: Maximum number of files.
+
+        Returns:
+            The matching live files, newest first.
+        """
+        now = time.time()
+        clauses, params = ["(expiration_time IS NULL OR expiration_time >= ?)"], [now]
+        if name_prefix:
+            # escape the escape character first, so the escapes added below stay single
+            like = name_prefix.removeprefix("files/")
+            like = like.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_") + "%"
+            clauses.append(r"(name LIKE ? ESCAPE '\' OR display_name LIKE ? ESCAPE '\')")
+            params += [f"files/{like}", like]
+        if mime_type:
+            clauses.append("mime_type GLOB ?")
+            params.append(mime_type)
+        if min_size is not None:
+            clauses.append("size_bytes >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            clauses.append("size_bytes <= ?")
+            params.append(max_size)
+        if expires_within is not None:
+            clauses.append("expiration_time <= ?")
+            params.append(now + expires_within)
+
+        query = f"SELECT data FROM remote_file WHERE {' AND '.join(clauses)} ORDER BY update_time DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [File.model_validate_json(row[0]) for row in rows]
@@ -1,11 +1,22 @@
+import fnmatch
+import json
+import mimetypes
 import logging
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from time import sleep
-from typing import Any, Iterable, List, Optional, Union
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Literal, Optional, Union
+from urllib.parse import urlparse
 
 import tenacity
+import urllib3
+from diskcache import Cache
 from google import genai
+from google.genai.errors import APIError
 from google.genai.types import (
     Model,
     File,
@@ -13,14 +24,60 @@ from google.genai.types import (
     GenerateContentConfigOrDict,
     CountTokensConfig,
 )
+from pydantic import BaseModel
 from rich.console import Console
 from rich.table import Table
 from tqdm import tqdm
 
 from geminiplayground.utils import Singleton, LibUtils
+from .file_mirror import FileMirror
 
 logger = logging.getLogger("rich")
 
+DEFAULT_UPLOAD_BASE_URL = "https://generativelanguage.googleapis.com"
+# Host of the URIs of files uploaded with the Files API
+FILES_API_HOST = "generativelanguage.googleapis.com"
+# Chunks must be a multiple of 256 KiB, except for the last one
+UPLOAD_CHUNK_GRANULARITY = 256 * 1024
+UPLOAD_CHUNK_SIZE = 32 * UPLOAD_CHUNK_GRANULARITY
+UPLOAD_MIN_CHUNK_SIZE = 4 * UPLOAD_CHUNK_GRANULARITY
+UPLOAD_MAX_CHUNK_SIZE = 256 * UPLOAD_CHUNK_GRANULARITY
+# Adaptive chunks are sized so that sending one takes about this many seconds
+UPLOAD_CHUNK_TARGET_SECONDS = 5.0
+UPLOAD_MAX_RETRIES = 5
+# Files at least this large are uploaded with the resumable protocol
+RESUMABLE_UPLOAD_THRESHOLD = int(os.getenv("GEMINI_PLAYGROUND_RESUMABLE_UPLOAD_THRESHOLD", 64 * 1024 ** 2))
+# Upload sessions stay valid for about a week
+UPLOAD_SESSION_EXPIRE = 6 * 24 * 60 * 60
+
+UploadProgressCallback = Callable[[int, int], None]
+DELETE_MAX_WORKERS = 8
+DELETE_MAX_RETRIES = 5
+DELETE_BACKOFF_BASE = 1.0
+DELETE_BACKOFF_MAX = 60.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UploadError(IOError):
+    """
+    An upload request failed with an HTTP error.
+    """
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+class FileDeletionResult(BaseModel):
+    """
+    Outcome of deleting one file.
+    """
+
+    name: str
+    status: Literal["deleted", "not_found", "failed"]
+    attempts: int = 1
+    error: Optional[str] = None
+
 
 class GeminiClient(metaclass=Singleton):
     """A client wrapper for the Gemini API using the new Google Generative AI SDK."""
@@ -30,6 +87,10 @@ class GeminiClient(metaclass=Singleton):
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY must be provided.")
         self.api_client = genai.Client(api_key=self.api_key, *args, **kwargs)
+        self.upload_base_url = os.getenv("GEMINI_UPLOAD_BASE_URL", DEFAULT_UPLOAD_BASE_URL).rstrip("/")
+        self._http_pool = urllib3.PoolManager(maxsize=8)
+        self._file_mirror: Optional[FileMirror] = None
+        self._upload_sessions: Optional[Cache] = None
         self.console = Console()
 
     def _assert_model_exists(self, model: str) -> None:
@@ -51,9 +112,15 @@ class GeminiClient(metaclass=Singleton):
 
         self.console.print(table)
 
-    def print_files(self) -> None:
-        """Print uploaded Gemini files."""
-        files = self.query_files()
+    def print_files(self, limit: Optional[int] = None, **filters) -> None:
+        """
+        Print uploaded Gemini files.
+
+        Args:
+            limit: Maximum number of files to print.
+            filters: Filters accepted by `filter_files`.
+        """
+        files = self.iter_files(limit=limit, **filters)
         table = Table(title="Files")
         table.add_column("Name", style="cyan", no_wrap=True)
         table.add_column("Expiration Time", style="magenta")
@@ -81,17 +148,431 @@ class GeminiClient(metaclass=Singleton):
         config = ListFilesConfig(page_size=page_size)
         return self.api_client.files.list(config=config)
 
+    def iter_file_pages(self, page_size: int = 100) -> Iterator[List[File]]:
+        """
+        Lazily iterate over pages of uploaded files, newest first.
+
+        Each page is only requested when the previous one has been consumed, so callers can stop early.
+
+        Args:
+            page_size: Files requested per page.
+
+        Yields:
+            Lists of files.
+        """
+        pager = self.query_files(page_size=page_size)
+        while True:
+            yield list(pager.page)
+            if not pager.config.get("page_token"):
+                return
+            pager.next_page()
+
+    def iter_files(self, page_size: int = 100, limit: Optional[int] = None, **filters) -> Iterator[File]:
+        """
+        Lazily iterate over uploaded files, fetching pages on demand.
+
+        Args:
+            page_size: Files requested per page.
+            limit: Stop after this many matching files.
+            filters: Filters accepted by `filter_files` (name_prefix, mime_type, expires_within).
+
+        Yields:
+            The matching files.
+        """
+        count = 0
+        for page in self.iter_file_pages(page_size=page_size):
+            for f in self.filter_files(page, **filters) if filters else page:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield f
+
+    @property
+    def file_mirror(self) -> FileMirror:
+        """
+        The local mirror of the uploaded files metadata, created on first use.
+        """
+        if self._file_mirror is None:
+            self._file_mirror = FileMirror(self)
+        return self._file_mirror
+
     def get_file(self, file_name: str) -> File:
         """Retrieve file metadata."""
         return self.api_client.files.get(name=file_name)
 
+    def _get_file_or_none(self, file_name: str) -> Optional[File]:
+        try:
+            return self.get_file(file_name)
+        except APIError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def is_file_available(self, file_uri: str) -> bool:
+        """
+        Tell whether the file a URI refers to can still be sent to the model.
+
+        Only Files API files expire or get deleted; other URIs (e.g. public URLs or gs://
+        objects) are assumed available. Files are looked up in the local mirror first, then
+        with the API, and assumed available if that lookup fails for another reason than the
+        file being gone.
+
+        Args:
+            file_uri: The URI of the file, as found in file data parts.
+
+        Returns:
+            False if the file was deleted or has expired.
+        """
+        parsed = urlparse(file_uri)
+        if parsed.hostname != FILES_API_HOST or "/files/" not in parsed.path:
+            return True
+        name = "files/" + parsed.path.rsplit("/files/", 1)[-1]
+        file = self.file_mirror.get(name)
+        if file is None:
+            try:
+                file = self._get_file_or_none(name)
+            except Exception as e:
+                logger.warning(f"Failed to check {name}, assuming it is available: {e}")
+                return True
+            if file is None:
+                return False
+            self.file_mirror.upsert([file])
+        return not (file.expiration_time and file.expiration_time.timestamp() < time.time())
+
     def delete_file(self, file_name: str) -> None:
         """Delete a file from Gemini."""
         self.api_client.files.delete(name=file_name)
+        if self._file_mirror is not None:
+            self._file_mirror.remove(file_name)
+
+    def upload_file(
+            self,
+            file_path: Union[str, Path],
+            resumable: Optional[bool] = None,
+            progress_callback: Optional[UploadProgressCallback] = None,
+    ) -> File:
+        """
+        Upload a single file.
+
+        Args:
+            file_path: Path to the file.
+            resumable: Use the resumable protocol (see `upload_file_resumable`). By default, it is
+                used for files of at least `RESUMABLE_UPLOAD_THRESHOLD` bytes.
+            progress_callback: Called with (bytes sent, total bytes) during resumable uploads.
+
+        Returns:
+            The uploaded file.
+        """
+        if resumable is None:
+            resumable = os.path.getsize(file_path) >= RESUMABLE_UPLOAD_THRESHOLD
+        if resumable:
+            return self.upload_file_resumable(file_path, progress_callback=progress_callback)
+
+        uploaded_file = self.api_client.files.upload(file=file_path)
+        if self._file_mirror is not None:
+            self._file_mirror.upsert([uploaded_file])
+        return uploaded_file
+
+    def supports_uri_passthrough(self, uri: str, allow_urls: bool = False) -> bool:
+        """
+        Tell whether a remote URI can be referenced directly in a prompt, without uploading it.
+
+        Vertex AI reads gs:// objects directly. The Gemini Developer API only fetches public
+        http(s) URLs for some models and content types, so URLs are only passed through when
+        the caller opts in with `allow_urls`.
+
+        Args:
+            uri: The remote URI.
+            allow_urls: Whether the target model is known to fetch http(s) URLs itself.
+
+        Returns:
+            True if the URI can be sent as file data.
+        """
+        scheme = urlparse(uri).scheme
+        if scheme == "gs":
+            return bool(self.api_client.vertexai)
+        return allow_urls and scheme in ("http", "https") and not self.api_client.vertexai
+
+    def _upload_request(self, url: str, headers: dict, body: Union[bytes, str]) -> urllib3.BaseHTTPResponse:
+        headers = {"x-goog-api-key": self.api_key, **headers}
+        response = self._http_pool.request("POST", url, headers=headers, body=body)
+        if response.status >= 400:
+            raise UploadError(
+                f"Upload request failed with HTTP {response.status}: {response.data[:500]!r}", response.status
+            )
+        return response
+
+    def start_upload_session(self, size: Optional[int], mime_type: str, display_name: Optional[str] = None) -> str:
+        """
+        Open a resumable upload session with the Files API.
+
+        Args:
+            size: Total size of the file in bytes, or None if not known yet (e.g. while it is
+                still being received); the size is then fixed by the finalizing chunk.
+            mime_type: MIME type of the file.
+            display_name: Optional display name.
+
+        Returns:
+            The session upload URL.
+        """
+        metadata = {"file": {"display_name": display_name}} if display_name else {}
+        headers = {
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-Command": "start",
+            "X-Goog-Upload-Header-Content-Type": mime_type,
+            "Content-Type": "application/json",
+        }
+        if size is not None:
+            headers["X-Goog-Upload-Header-Content-Length"] = str(size)
+        response = self._upload_request(
+            f"{self.upload_base_url}/upload/v1beta/files",
+            headers=headers,
+            body=json.dumps(metadata),
+        )
+        upload_url = response.headers.get("X-Goog-Upload-URL")
+        if not upload_url:
+            raise KeyError("Upload URL was not returned by the upload session request.")
+        return upload_url
+
+    def upload_chunk(self, upload_url: str, data: bytes, offset: int, finalize: bool = False) -> Optional[File]:
+        """
+        Send one chunk of a resumable upload session.
+
+        Args:
+            upload_url: The session upload URL.
+            data: Chunk bytes, a multiple of 256 KiB unless `finalize` is set.
+            offset: Offset of the chunk within the file.
+            finalize: Whether this is the last chunk.
 
-    def upload_file(self, file_path: Union[str, Path]) -> File:
-        """Upload a single file."""
-        return self.api_client.files.upload(file=file_path)
+        Returns:
+            The uploaded file once finalized, None otherwise.
+        """
+        response = self._upload_request(
+            upload_url,
+            headers={
+                "Content-Length": str(len(data)),
+                "X-Goog-Upload-Offset": str(offset),
+                "X-Goog-Upload-Command": "upload, finalize" if finalize else "upload",
+            },
+            body=data,
+        )
+        if finalize:
+            return self._finalized_file(response)
+        return None
+
+    def _finalized_file(self, response: urllib3.BaseHTTPResponse) -> File:
+        uploaded_file = File.model_validate(json.loads(response.data)["file"])
+        if self._file_mirror is not None:
+            self._file_mirror.upsert([uploaded_file])
+        return uploaded_file
+
+    @staticmethod
+    def _read_chunk(stream: BinaryIO, size: int) -> bytes:
+        """
+        Read exactly `size` bytes from a stream, or less at end of stream.
+        """
+        buffer = bytearray()
+        while len(buffer) < size:
+            data = stream.read(size - len(buffer))
+            if not data:
+                break
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def query_upload_session(self, upload_url: str) -> Optional[int]:
+        """
+        Ask how many bytes of a resumable upload session the server has received.
+
+        Args:
+            upload_url: The session upload URL.
+
+        Returns:
+            The number of bytes received, or None if the session is gone or already finalized.
+        """
+        resume_point = self._query_resume_point(upload_url)
+        return resume_point if isinstance(resume_point, int) else None
+
+    def _query_resume_point(self, upload_url: str) -> Union[int, File, None]:
+        """
+        Ask where a resumable upload session stands.
+
+        Returns:
+            The number of bytes received while the session is active, the uploaded file once it
+            is finalized, or None if the session is gone.
+        """
+        try:
+            response = self._upload_request(upload_url, headers={"X-Goog-Upload-Command": "query"}, body=b"")
+        except UploadError as e:
+            if e.status in (404, 410):
+                return None
+            raise
+        status = response.headers.get("X-Goog-Upload-Status")
+        if status == "active":
+            return int(response.headers.get("X-Goog-Upload-Size-Received", 0))
+        if status == "final":
+            try:
+                return self._finalized_file(response)
+            except (ValueError, KeyError):
+                logger.warning(f"Finalized upload session did not return its file: {response.data[:500]!r}")
+        return None
+
+    @property
+    def upload_sessions(self) -> Cache:
+        """
+        The persisted resumable upload sessions, keyed by file fingerprint.
+        """
+        if self._upload_sessions is None:
+            self._upload_sessions = Cache(directory=str(LibUtils.get_lib_home().joinpath("upload_sessions")))
+        return self._upload_sessions
+
+    @staticmethod
+    def _upload_session_key(file_path: Path) -> tuple:
+        stat = file_path.stat()
+        return "upload-session", str(file_path.resolve()), stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def _next_chunk_size(chunk_size: int, sent: int, elapsed: float) -> int:
+        """
+        Size the next chunk from the measured throughput, in multiples of the upload granularity.
+        """
+        if elapsed <= 0:
+            return chunk_size
+        target = sent / elapsed * UPLOAD_CHUNK_TARGET_SECONDS
+        # grow or shrink by at most 2x per chunk to smooth out throughput noise
+        target = min(max(target, chunk_size / 2), chunk_size * 2)
+        target = int(target) // UPLOAD_CHUNK_GRANULARITY * UPLOAD_CHUNK_GRANULARITY
+        return min(max(target, UPLOAD_MIN_CHUNK_SIZE), UPLOAD_MAX_CHUNK_SIZE)
+
+    def upload_file_resumable(
+            self,
+            file_path: Union[str, Path],
+            mime_type: Optional[str] = None,
+            display_name: Optional[str] = None,
+            chunk_size: Optional[int] = None,
+            progress_callback: Optional[UploadProgressCallback] = None,
+            max_retries: int = UPLOAD_MAX_RETRIES,
+    ) -> File:
+        """
+        Upload a file in chunks with the resumable upload protocol.
+
+        The session URL is persisted in a diskcache, so an upload interrupted by a network error
+        or a process restart resumes from the last byte the server received. Failed chunks are
+        retried with exponential backoff, and a finalizing chunk whose response is lost returns
+        the file the server finalized. Unless `chunk_size` is given, chunk sizes adapt to the
+        measured bandwidth, so each chunk takes about `UPLOAD_CHUNK_TARGET_SECONDS` to send.
+
+        Args:
+            file_path: Path to the file.
+            mime_type: MIME type, guessed from the file name by default.
+            display_name: Display name, the file name by default.
+            chunk_size: Fixed chunk size, a multiple of 256 KiB.
+            progress_callback: Called with (bytes sent, total bytes) after every chunk.
+            max_retries: Maximum number of consecutive retries of a failing chunk.
+
+        Returns:
+            The uploaded file.
+
+        Raises:
+            UploadError, IOError: If the upload still fails after `max_retries` retries.
+        """
+        if chunk_size is not None and chunk_size % UPLOAD_CHUNK_GRANULARITY:
+            raise ValueError(f"chunk_size must be a multiple of {UPLOAD_CHUNK_GRANULARITY} bytes.")
+        file_path = Path(file_path)
+        size = file_path.stat().st_size
+        mime_type = mime_type or mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        session_key = self._upload_session_key(file_path)
+        adaptive = chunk_size is None
+        chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+
+        upload_url = self.upload_sessions.get(session_key)
+        offset = self._query_resume_point(upload_url) if upload_url else None
+        if isinstance(offset, File):
+            # a previous attempt finalized the upload but never got the response
+            self.upload_sessions.delete(session_key)
+            return offset
+        if offset is None:
+            upload_url = self.start_upload_session(size, mime_type, display_name or file_path.name)
+            self.upload_sessions.set(session_key, upload_url, expire=UPLOAD_SESSION_EXPIRE)
+            offset = 0
+        else:
+            logger.info(f"Resuming upload of {file_path} at byte {offset} of {size}")
+
+        retries = 0
+        with open(file_path, "rb") as f:
+            while True:
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+                finalize = offset + len(chunk) >= size
+                started_at = time.monotonic()
+                try:
+                    uploaded_file = self.upload_chunk(upload_url, chunk, offset, finalize=finalize)
+                except (IOError, urllib3.exceptions.HTTPError) as e:
+                    status = getattr(e, "status", None)
+                    if (status is not None and status < 500 and status != 429) or retries >= max_retries:
+                        raise
+                    retries += 1
+                    backoff = min(2 ** retries, 60) * random.uniform(0.5, 1.5)
+                    logger.warning(f"Upload chunk at byte {offset} failed ({e}), retrying in {backoff:.1f}s")
+                    sleep(backoff)
+                    # the server may have received part of the chunk, or finalized the upload
+                    resume_point = self._query_resume_point(upload_url)
+                    if resume_point is None:
+                        raise IOError(f"Upload session of {file_path} was lost.") from e
+                    if isinstance(resume_point, File):
+                        self.upload_sessions.delete(session_key)
+                        if progress_callback is not None:
+                            progress_callback(size, size)
+                        return resume_point
+                    offset = resume_point
+                    continue
+
+                retries = 0
+                offset += len(chunk)
+                if progress_callback is not None:
+                    progress_callback(offset, size)
+                if finalize:
+                    self.upload_sessions.delete(session_key)
+                    return uploaded_file
+                if adaptive:
+                    chunk_size = self._next_chunk_size(chunk_size, len(chunk), time.monotonic() - started_at)
+
+    def upload_stream(
+            self,
+            stream: BinaryIO,
+            size: int,
+            mime_type: str,
+            display_name: Optional[str] = None,
+            chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> File:
+        """
+        Upload a non-seekable binary stream, e.g. an HTTP response body, without buffering it on disk.
+
+        Args:
+            stream: A readable binary stream.
+            size: Total number of bytes the stream will produce.
+            mime_type: MIME type of the content.
+            display_name: Optional display name.
+            chunk_size: Bytes sent per request.
+
+        Returns:
+            The uploaded file.
+
+        Raises:
+            IOError: If the stream ends early or a request fails.
+        """
+        if chunk_size % UPLOAD_CHUNK_GRANULARITY:
+            raise ValueError(f"chunk_size must be a multiple of {UPLOAD_CHUNK_GRANULARITY} bytes.")
+        upload_url = self.start_upload_session(size, mime_type, display_name)
+        offset = 0
+        while True:
+            chunk = self._read_chunk(stream, chunk_size)
+            finalize = offset + len(chunk) >= size
+            if not chunk and not finalize:
+                raise IOError(f"Stream ended after {offset} of {size} bytes.")
+            uploaded_file = self.upload_chunk(upload_url, chunk, offset, finalize=finalize)
+            offset += len(chunk)
+            if finalize:
+                return uploaded_file
 
     def upload_files(self, *files: Union[str, Path], timeout: float = 0.0) -> List[File]:
         """Upload multiple files."""
@@ -101,12 +582,129 @@ class GeminiClient(metaclass=Singleton):
             if not sleep(timeout)
         ]
 
-    def delete_files(self, *files: Union[File, str], timeout: float = 0.5) -> None:
-        """Delete multiple files."""
-        names = [f.name if isinstance(f, File) else f for f in files]
-        for name in tqdm(names, desc="Removing files"):
-            sleep(timeout)
-            self.delete_file(name)
+    @staticmethod
+    def filter_files(
+            files: Iterable[Union[File, str]],
+            name_prefix: Optional[str] = None,
+            mime_type: Optional[str] = None,
+            expires_within: Optional[float] = None,
+    ) -> List[Union[File, str]]:
+        """
+        Filter files by name prefix, MIME type and expiry window.
+
+        Args:
+            files: Files or file names to filter. Names only carry a name, so they never match
+                the MIME type and expiry filters.
+            name_prefix: Keep files whose name (with or without "files/") or display name starts with this prefix.
+            mime_type: Keep files matching this MIME type, wildcards allowed (e.g. "image/*").
+            expires_within: Keep files expiring within this many seconds.
+
+        Returns:
+            The matching files.
+        """
+        selected = []
+        for f in files:
+            file = f if isinstance(f, File) else File(name=f)
+            if name_prefix and not (
+                    file.name.removeprefix("files/").startswith(name_prefix.removeprefix("files/"))
+                    or (file.display_name or "").startswith(name_prefix)
+            ):
+                continue
+            if mime_type and not fnmatch.fnmatch(file.mime_type or "", mime_type):
+                continue
+            if expires_within is not None and (
+                    file.expiration_time is None or LibUtils.get_uploaded_file_exp_date_delta_t(file) > expires_within
+            ):
+                continue
+            selected.append(f)
+        return selected
+
+    def delete_files(
+            self,
+            *files: Union[File, str],
+            all_files: bool = False,
+            name_prefix: Optional[str] = None,
+            mime_type: Optional[str] = None,
+            expires_within: Optional[float] = None,
+            max_workers: int = DELETE_MAX_WORKERS,
+            max_retries: int = DELETE_MAX_RETRIES,
+            show_progress: bool = True,
+    ) -> List[FileDeletionResult]:
+        """
+        Delete files concurrently.
+
+        Requests run on a bounded thread pool. Rate-limit (429) and transient server errors are
+        retried with exponential backoff and jitter, and pause every worker until the backoff
+        elapses, so a throttled burst doesn't keep hammering the API.
+
+        Args:
+            files: Files or file names to delete. Without files, nothing is deleted unless
+                `all_files` is set.
+            all_files: Consider every uploaded file instead of `files`, e.g. to clear an account
+                or, with the filters below, all the videos.
+            name_prefix: Only delete files whose name or display name starts with this prefix.
+            mime_type: Only delete files matching this MIME type, wildcards allowed (e.g. "video/*").
+            expires_within: Only delete files expiring within this many seconds.
+            max_workers: Maximum number of concurrent requests.
+            max_retries: Maximum number of retries per file.
+            show_progress: Whether to show a progress bar.
+
+        Returns:
+            One result per selected file, in the order the files were given.
+
+        Raises:
+            ValueError: If both `files` and `all_files` are given.
+        """
+        if files and all_files:
+            raise ValueError("Pass either files or all_files=True, not both")
+        candidates = list(self.iter_files()) if all_files else list(files)
+        if mime_type or expires_within is not None:
+            # only the metadata tells the MIME type and expiry of a bare name
+            candidates = [self._get_file_or_none(f) if isinstance(f, str) else f for f in candidates]
+            candidates = [f for f in candidates if f is not None]
+        candidates = self.filter_files(candidates, name_prefix, mime_type, expires_within)
+        names = list(dict.fromkeys(f.name if isinstance(f, File) else f for f in candidates))
+        if not names:
+            return []
+
+        resume_at = 0.0
+        resume_lock = threading.Lock()
+
+        def delete(name: str) -> FileDeletionResult:
+            nonlocal resume_at
+            for attempt in range(1, max_retries + 2):
+                wait = resume_at - time.monotonic()
+                if wait > 0:
+                    sleep(wait)
+                try:
+                    self.delete_file(name)
+                    return FileDeletionResult(name=name, status="deleted", attempts=attempt)
+                except APIError as e:
+                    if e.code == 404:
+                        return FileDeletionResult(name=name, status="not_found", attempts=attempt)
+                    if e.code not in RETRYABLE_STATUS_CODES or attempt > max_retries:
+                        return FileDeletionResult(name=name, status="failed", attempts=attempt, error=str(e))
+                    backoff = min(DELETE_BACKOFF_BASE * 2 ** (attempt - 1), DELETE_BACKOFF_MAX)
+                    backoff *= random.uniform(0.5, 1.5)
+                    logger.warning(f"Deleting {name} failed with HTTP {e.code}, retrying in {backoff:.1f}s")
+                    with resume_lock:
+                        resume_at = max(resume_at, time.monotonic() + backoff)
+                except Exception as e:
+                    return FileDeletionResult(name=name, status="failed", attempts=attempt, error=str(e))
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names)))) as executor:
+            futures = {executor.submit(delete, name): name for name in names}
+            progress = tqdm(total=len(names), desc="Removing files", disable=not show_progress)
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                progress.update()
+            progress.close()
+
+        outcomes = [results[name] for name in names]
+        failed = sum(r.status == "failed" for r in outcomes)
+        logger.info(f"Deleted {len(outcomes) - failed} of {len(outcomes)} files ({failed} failed)")
+        return outcomes
 
     @tenacity.retry(wait=tenacity.wait_fixed(2), stop=tenacity.stop_after_attempt(3))
     def count_tokens(
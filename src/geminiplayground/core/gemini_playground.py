@@ -3,22 +3,33 @@ import typing
 from pathlib import Path
 
 from google.genai.chats import Chat
-from google.genai.types import Tool, GenerateContentConfig
+from google.genai.types import (
+    AutomaticFunctionCallingConfig,
+    Content,
+    FunctionCallingConfig,
+    GenerateContentConfig,
+    Tool,
+    ToolConfig,
+)
 from pydantic import BaseModel
 
 from geminiplayground.utils import LibUtils
 from .gemini_client import GeminiClient
+from .history_compactor import HistoryCompactor
+from .tool_executor import ToolExecutor, TOOL_MAX_ROUNDS, TOOL_TIMEOUT
 
 logger = logging.getLogger("rich")
 
 
 class ToolCall(BaseModel):
     """
-    A message from the Gemini model.
+    A tool called by the Gemini model, with its result or error.
     """
 
     tool_name: typing.Any
     tool_result: typing.Any
+    tool_args: dict = {}
+    error: typing.Optional[str] = None
 
 
 class Message(BaseModel):
@@ -38,34 +49,107 @@ class ChatSession:
         self.model = model
         self.toolbox = toolbox
         self.history = history
-        self.gemini_client = kwargs.pop("gemini_client", GeminiClient(*args, **kwargs))
+        self.compactor: typing.Optional[HistoryCompactor] = kwargs.pop("compactor", None)
+        self.tool_executor = ToolExecutor(toolbox, timeout=kwargs.pop("tool_timeout", None) or TOOL_TIMEOUT)
+        # history size reported by the API after the last response
+        self.last_total_tokens: typing.Optional[int] = None
+        gemini_client = kwargs.pop("gemini_client", None)
+        self.gemini_client = gemini_client or GeminiClient(*args, **kwargs)
         self.chat: Chat = self._create_chat()
 
     def _create_chat(self) -> Chat:
         """
         Creates and initializes the Gemini Chat instance.
         """
-        tool_configs = list(self.toolbox.values())
-        return self.gemini_client.start_chat(
-            model=self.model,
-            history=self.history,
-            config=GenerateContentConfig(tools=tool_configs),
+        tools = None
+        if self.toolbox:
+            tools = [Tool(function_declarations=[LibUtils.func_to_tool(func) for func in self.toolbox.values()])]
+        # function calls are run by `send_message`, concurrently, rather than one at a time by the SDK
+        self.config = GenerateContentConfig(
+            tools=tools,
+            automatic_function_calling=AutomaticFunctionCallingConfig(disable=True),
         )
+        return self.gemini_client.start_chat(model=self.model, history=self.history, config=self.config)
 
     def reset_chat(self) -> None:
         """
         Resets the chat session, clearing history and tools.
         """
+        self.history = None
         self.chat = self._create_chat()
 
+    def get_history(self) -> list[Content]:
+        """
+        Return the valid turns of the conversation so far.
+        """
+        return self.chat.get_history(curated=True)
+
+    def set_history(self, history: list[Content]) -> None:
+        """
+        Replace the conversation history, e.g. with a restored or trimmed one.
+        """
+        self.history = history
+        self.last_total_tokens = None
+        self.chat = self._create_chat()
+
+    def compact_history(self) -> bool:
+        """
+        Summarize the older turns of the conversation if it exceeds the compactor budget.
+
+        Returns:
+            Whether the history was compacted.
+        """
+        if self.compactor is None:
+            return False
+        history = self.get_history()
+        compacted = self.compactor.compact(history, self.last_total_tokens)
+        if compacted is history:
+            return False
+        self.set_history(compacted)
+        return True
+
     def send_message(self, message: str, config: GenerateContentConfig = None) -> typing.Generator:
         """
         Send a message to the chat session.
+
+        When the model calls tools, the calls of each response run concurrently and their
+        results are sent back, until the model replies with text. After `TOOL_MAX_ROUNDS` rounds
+        of calls, the model must reply with text.
+
+        Yields:
+            `Message` chunks of the response text, and a `ToolCall` as each tool call completes.
         """
-        normalized_message = LibUtils.normalize_prompt(message)
-        response = self.chat.send_message_stream(normalized_message, config=config)
-        for chunk in response:
-            yield Message(text=chunk.text)
+        next_message = LibUtils.normalize_prompt(message)
+        # usually done right after the previous response, this only catches up if it wasn't
+        self.compact_history()
+        for tool_round in range(TOOL_MAX_ROUNDS + 1):
+            if tool_round == TOOL_MAX_ROUNDS:
+                logger.warning(f"[Tools] {TOOL_MAX_ROUNDS} rounds of function calls, asking for a reply")
+                config = (config or self.config).model_copy(
+                    update={"tool_config": ToolConfig(function_calling_config=FunctionCallingConfig(mode="NONE"))}
+                )
+            function_calls = []
+            for chunk in self.chat.send_message_stream(next_message, config=config):
+                if chunk.usage_metadata is not None and chunk.usage_metadata.total_token_count:
+                    self.last_total_tokens = chunk.usage_metadata.total_token_count
+                function_calls.extend(chunk.function_calls or [])
+                # read from the parts, as `chunk.text` warns about the function calls next to it
+                parts = chunk.candidates[0].content.parts if chunk.candidates and chunk.candidates[0].content else None
+                text = "".join(part.text for part in parts or [] if part.text and not part.thought)
+                if text:
+                    yield Message(text=text)
+            if not function_calls or tool_round == TOOL_MAX_ROUNDS:
+                return
+            next_message = []
+            for call, function_response in self.tool_executor.run(function_calls):
+                response = function_response.function_response.response
+                yield ToolCall(
+                    tool_name=call.name,
+                    tool_args=call.args or {},
+                    tool_result=response.get("result"),
+                    error=response.get("error"),
+                )
+                next_message.append(function_response)
 
 
 class GeminiPlayground:
@@ -103,6 +187,7 @@ class GeminiPlayground:
         if not LibUtils.has_complete_type_hints(func):
             raise ValueError(f"Function {func.__name__} must have complete type hints")
         self.toolbox[func.__name__] = func
+        return func
 
     def start_chat(self, history: list = None, **kwargs):
         """
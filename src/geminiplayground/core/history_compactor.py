@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+from google.genai.types import Content, GenerateContentConfig, Part
+
+from geminiplayground.catching import cache
+from geminiplayground.utils.prompts import HISTORY_SUMMARIZATION_SYSTEM_INSTRUCTION
+from .gemini_client import GeminiClient
+
+logger = logging.getLogger("rich")
+
+# Estimated history size above which older turns are summarized, 0 disables compaction
+HISTORY_TOKEN_BUDGET = int(os.environ.get("GEMINI_PLAYGROUND_HISTORY_TOKEN_BUDGET", 32_000))
+# Most recent messages always kept verbatim
+HISTORY_KEEP_RECENT = int(os.environ.get("GEMINI_PLAYGROUND_HISTORY_KEEP_RECENT", 8))
+HISTORY_SUMMARY_MODEL = os.environ.get("GEMINI_PLAYGROUND_HISTORY_SUMMARY_MODEL", "gemini-2.0-flash-lite")
+HISTORY_SUMMARY_EXPIRE = 7 * 24 * 60 * 60
+HISTORY_SUMMARY_PREFIX = "Summary of the earlier conversation:"
+HISTORY_SUMMARY_ACK = "Understood, I will continue the conversation from this summary."
+CHARS_PER_TOKEN = 4
+# Rough token costs of file parts, by MIME type prefix (one image, one minute of audio or
+# video, ten PDF pages)
+FILE_PART_TOKENS = {
+    "image/": 258,
+    "audio/": 1_920,
+    "video/": 15_780,
+    "application/pdf": 2_580,
+}
+DEFAULT_FILE_PART_TOKENS = 258
+# Files of the summarized turns kept attached to the summary, most recent first; they also
+# get at most half of the token budget, so they can't keep the history above it
+HISTORY_SUMMARY_MAX_FILES = int(os.environ.get("GEMINI_PLAYGROUND_HISTORY_SUMMARY_MAX_FILES", 4))
+
+
+class HistoryCompactor:
+    """
+    Keep the history of long chats within a token budget by summarizing older turns.
+
+    Once the estimated size of a history crosses `token_budget`, every message but the last
+    `keep_recent` ones is replaced with a summary written by a cheap model, so each turn re-sends
+    a bounded history and time-to-first-token stays flat. The files referenced by the summarized
+    turns stay attached to the summary as references, up to `max_files` of the most recent ones
+    that haven't expired; their bytes are never re-inlined.
+    Summaries are cached by the content of the turns they replace, so compacting the same
+    history again (e.g. after a restore, or in another process) doesn't call the model.
+    """
+
+    def __init__(
+            self,
+            token_budget: int = HISTORY_TOKEN_BUDGET,
+            keep_recent: int = HISTORY_KEEP_RECENT,
+            summary_model: str = HISTORY_SUMMARY_MODEL,
+            max_files: int = HISTORY_SUMMARY_MAX_FILES,
+            gemini_client: Optional[GeminiClient] = None,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary_model = summary_model
+        self.max_files = max_files
+        self._gemini_client = gemini_client
+
+    @property
+    def gemini_client(self) -> GeminiClient:
+        # resolved lazily, so compactors can be created while another singleton is being built
+        if self._gemini_client is None:
+            self._gemini_client = GeminiClient()
+        return self._gemini_client
+
+    @staticmethod
+    def _file_tokens(mime_type: Optional[str]) -> int:
+        mime_type = mime_type or ""
+        return next(
+            (cost for prefix, cost in FILE_PART_TOKENS.items() if mime_type.startswith(prefix)),
+            DEFAULT_FILE_PART_TOKENS,
+        )
+
+    @classmethod
+    def estimate_tokens(cls, content: Content) -> int:
+        """
+        Estimate the number of tokens of a message.
+        """
+        tokens = 0
+        for part in content.parts or []:
+            if part.text:
+                tokens += len(part.text) // CHARS_PER_TOKEN + 1
+            elif part.file_data is not None:
+                tokens += cls._file_tokens(part.file_data.mime_type)
+            elif part.inline_data is not None:
+                tokens += len(part.inline_data.data or b"") // CHARS_PER_TOKEN
+            else:
+                # function calls and responses
+                tokens += len(part.model_dump_json(exclude_none=True)) // CHARS_PER_TOKEN
+        return tokens
+
+    def needs_compaction(self, history: list[Content], known_tokens: Optional[int] = None) -> bool:
+        """
+        Whether a history exceeds the budget.
+
+        Args:
+            history: The chat history.
+            known_tokens: The size of the history reported by the API, if known.
+        """
+        if self.token_budget <= 0 or len(history) <= self.keep_recent:
+            return False
+        estimate = sum(self.estimate_tokens(content) for content in history)
+        return max(estimate, known_tokens or 0) > self.token_budget
+
+    @staticmethod
+    def is_summary(content: Content) -> bool:
+        """
+        Whether a message is a summary written by `compact`.
+        """
+        parts = content.parts or []
+        return content.role == "user" and bool(parts) and (parts[0].text or "").startswith(HISTORY_SUMMARY_PREFIX)
+
+    def _split_index(self, history: list[Content]) -> int:
+        """
+        Return where the kept part of a history starts: a user message that isn't a function
+        response, with at least `keep_recent` messages after it.
+        """
+        index = len(history) - self.keep_recent
+        while index > 0 and not (
+                history[index].role == "user"
+                and not any(part.function_response for part in history[index].parts or [])
+        ):
+            index -= 1
+        return index
+
+    @staticmethod
+    def _transcript(history: list[Content]) -> tuple[str, list[Part]]:
+        """
+        Render messages as text, collecting the file parts they reference, least recent first.
+        """
+        lines, files = [], {}
+        for content in history:
+            texts = []
+            for part in content.parts or []:
+                if part.text:
+                    texts.append(part.text)
+                elif part.file_data is not None:
+                    # ordered by their last reference
+                    files.pop(part.file_data.file_uri, None)
+                    files[part.file_data.file_uri] = part
+                    texts.append(f"[file {part.file_data.file_uri} ({part.file_data.mime_type})]")
+                elif part.function_call is not None:
+                    texts.append(f"[called {part.function_call.name}({json.dumps(part.function_call.args)})]")
+                elif part.function_response is not None:
+                    texts.append(f"[{part.function_response.name} returned {json.dumps(part.function_response.response)}]")
+            lines.append(f"{content.role}: {' '.join(texts)}")
+        return "\n".join(lines), list(files.values())
+
+    def _summary_files(self, files: list[Part]) -> list[Part]:
+        """
+        Select the file parts kept with a summary: the most recent available ones, within
+        `max_files` and half of the token budget.
+        """
+        kept, tokens = [], 0
+        for part in reversed(files):
+            if len(kept) >= self.max_files:
+                break
+            part_tokens = self._file_tokens(part.file_data.mime_type)
+            if tokens + part_tokens > self.token_budget // 2 or not self.gemini_client.is_file_available(part.file_data.file_uri):
+                continue
+            kept.append(part)
+            tokens += part_tokens
+        return kept[::-1]
+
+    def summarize(self, history: list[Content]) -> str:
+        """
+        Summarize messages with the summary model, using the cached summary if any.
+
+        Raises:
+            ValueError: If the model returned no summary, e.g. because it was blocked.
+        """
+        transcript, _ = self._transcript(history)
+        key = "history-summary:" + hashlib.sha256(f"{self.summary_model}\n{transcript}".encode()).hexdigest()
+        summary = cache.get(key)
+        if summary is None:
+            response = self.gemini_client.generate(
+                self.summary_model,
+                transcript,
+                config=GenerateContentConfig(system_instruction=HISTORY_SUMMARIZATION_SYSTEM_INSTRUCTION),
+            )
+            summary = (response.text or "").strip()
+            if not summary:
+                raise ValueError("The summary model returned no text")
+            cache.set(key, summary, expire=HISTORY_SUMMARY_EXPIRE)
+        return summary
+
+    def compact(self, history: list[Content], known_tokens: Optional[int] = None) -> list[Content]:
+        """
+        Summarize the older turns of a history if it exceeds the budget.
+
+        A previous summary is part of the older turns, so summaries roll forward. If the summary
+        model fails, the history is returned unchanged.
+
+        Args:
+            history: The chat history.
+            known_tokens: The size of the history reported by the API, if known.
+
+        Returns:
+            The compacted history, or `history` itself if nothing was compacted.
+        """
+        if not self.needs_compaction(history, known_tokens):
+            return history
+        index = self._split_index(history)
+        if index <= 0 or (index <= 2 and self.is_summary(history[0])):
+            # nothing older than the last summary
+            return history
+        older, recent = history[:index], history[index:]
+        try:
+            summary = self.summarize(older)
+        except Exception as e:
+            logger.warning(f"[History] Failed to summarize {len(older)} messages, keeping them: {e}")
+            return history
+
+        _, files = self._transcript(older)
+        kept_files = self._summary_files(files)
+        logger.info(
+            f"[History] Summarized {len(older)} messages, keeping {len(recent)} "
+            f"and {len(kept_files)} of {len(files)} files"
+        )
+        return [
+            Content(role="user", parts=[Part(text=f"{HISTORY_SUMMARY_PREFIX}\n{summary}"), *kept_files]),
+            Content(role="model", parts=[Part(text=HISTORY_SUMMARY_ACK)]),
+            *recent,
+        ]
@@ -0,0 +1,115 @@
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import os
+import threading
+import time
+import typing
+from typing import Optional
+
+from google.genai.types import FunctionCall, FunctionResponse, Part
+
+logger = logging.getLogger("rich")
+
+# Seconds a tool call may run before the model is told it timed out
+TOOL_TIMEOUT = float(os.environ.get("GEMINI_PLAYGROUND_TOOL_TIMEOUT", 30))
+# Threads running sync tools, shared by every chat
+TOOL_MAX_WORKERS = int(os.environ.get("GEMINI_PLAYGROUND_TOOL_MAX_WORKERS", 8))
+# Model responses with function calls answered per message, before the model must reply
+TOOL_MAX_ROUNDS = int(os.environ.get("GEMINI_PLAYGROUND_TOOL_MAX_ROUNDS", 8))
+
+
+class ToolExecutor:
+    """
+    Run the function calls of a model response concurrently.
+
+    Sync tools run in a shared thread pool and async tools as tasks of a background event loop,
+    so the calls of one response take as long as the slowest of them rather than their sum.
+    Each call gets `timeout` seconds; a timed-out async tool is cancelled, while a sync one
+    keeps its thread until it returns, as threads can't be interrupted. Errors, unknown tools
+    and timeouts become error responses for the model to handle, never exceptions.
+    """
+
+    _thread_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _lock = threading.Lock()
+
+    def __init__(self, toolbox: dict, timeout: float = TOOL_TIMEOUT):
+        self.toolbox = toolbox
+        self.timeout = timeout
+
+    @classmethod
+    def _get_thread_pool(cls) -> concurrent.futures.ThreadPoolExecutor:
+        with cls._lock:
+            if cls._thread_pool is None:
+                cls._thread_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="geminiplayground-tool"
+                )
+            return cls._thread_pool
+
+    @classmethod
+    def _get_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=cls._loop.run_forever, name="geminiplayground-tool-loop", daemon=True
+                ).start()
+            return cls._loop
+
+    def _submit(self, call: FunctionCall) -> concurrent.futures.Future:
+        func = self.toolbox.get(call.name)
+        if func is None:
+            future = concurrent.futures.Future()
+            future.set_exception(ValueError(f"Unknown tool: {call.name}"))
+            return future
+        args = dict(call.args or {})
+        if inspect.iscoroutinefunction(func):
+            try:
+                # binds the arguments on this thread, so bad ones fail here
+                coroutine = func(**args)
+            except Exception as e:
+                future = concurrent.futures.Future()
+                future.set_exception(e)
+                return future
+            return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+        return self._get_thread_pool().submit(func, **args)
+
+    @staticmethod
+    def _function_response(call: FunctionCall, future: Optional[concurrent.futures.Future]) -> Part:
+        if future is None:
+            response = {"error": f"{call.name} timed out"}
+        elif future.exception() is not None:
+            response = {"error": f"{type(future.exception()).__name__}: {future.exception()}"}
+        else:
+            response = {"result": future.result()}
+        return Part(function_response=FunctionResponse(id=call.id, name=call.name, response=response))
+
+    def run(self, calls: list[FunctionCall]) -> typing.Iterator[tuple[FunctionCall, Part]]:
+        """
+        Run function calls concurrently.
+
+        Args:
+            calls: The function calls of a model response.
+
+        Returns:
+            An iterator of `(call, function_response_part)`, in completion order, with the calls
+            that timed out last.
+        """
+        futures = {self._submit(call): call for call in calls}
+        deadline = time.monotonic() + self.timeout
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=max(deadline - time.monotonic(), 0),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for future in done:
+                yield futures[future], self._function_response(futures[future], future)
+        for future in pending:
+            future.cancel()
+            logger.warning(f"[Tools] {futures[future].name} timed out after {self.timeout}s")
+            yield futures[future], self._function_response(futures[future], None)
@@ -5,6 +5,8 @@ from .audio_part import AudioFile
 from .pdf_part import PdfFile
 from .video_part import VideoFile
 from .multimodal_part_factory import MultimodalPartFactory
+from .refresh_scheduler import RefreshScheduler
+from .reconciliation import RemoteFileReconciler, ReconciliationReport
 
 __all__ = [
     "GitRepo",
@@ -16,4 +18,7 @@ __all__ = [
     "VideoFile",
     "MultimodalPartFactory",
     "MultiModalPartFile",
+    "RefreshScheduler",
+    "RemoteFileReconciler",
+    "ReconciliationReport",
 ]
@@ -13,4 +13,4 @@ class AudioFile(MultiModalPartFile):
     """
 
     def __init__(self, file_path: typing.Union[str, Path], gemini_client=None, **kwargs):
-        super().__init__(file_path, gemini_client)
+        super().__init__(file_path, gemini_client, **kwargs)
@@ -67,7 +67,8 @@ class GitRepo(MultimodalPart):
         Args:
             repo_url: GitHub repo URL.
             branch: Branch name to clone.
-            kwargs: Optional config and custom repo path.
+            kwargs: Optional config, custom repo path and clone `progress_callback`, called with
+                the current Git operation and its completed fraction.
 
         Returns:
             GitRepo instance.
@@ -75,6 +76,7 @@ class GitRepo(MultimodalPart):
         Raises:
             GitRepoBranchNotFoundException: If the branch doesn't exist.
         """
+        progress_callback = kwargs.pop("progress_callback", None)
         repos_folder = Path(kwargs.get("repos_folder", LibUtils.get_lib_home() / "repos"))
         repos_folder.mkdir(parents=True, exist_ok=True)
 
@@ -94,7 +96,7 @@ class GitRepo(MultimodalPart):
                     url=repo_url,
                     to_path=repo_folder,
                     branch=branch,
-                    progress=GitRemoteProgress(),
+                    progress=GitRemoteProgress(progress_callback),
                 )
             except Exception as e:
                 logger.exception("Failed to clone repository.")
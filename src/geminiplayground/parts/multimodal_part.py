@@ -1,19 +1,25 @@
+import mimetypes
 import time
 import logging
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from yaspin import yaspin
-from google.genai.types import GenerateContentConfig, GenerateContentConfigOrDict
+from google.genai.types import File, GenerateContentConfig, GenerateContentConfigOrDict, Part
 
 from geminiplayground.core import GeminiClient
+from geminiplayground.core.gemini_client import UploadProgressCallback
 from geminiplayground.utils import FileUtils, LibUtils, Cacheable
 from geminiplayground.utils.prompts import SUMMARIZATION_SYSTEM_INSTRUCTION
 from geminiplayground.catching import cache
+from .refresh_scheduler import RefreshScheduler
 
 logger = logging.getLogger(__name__)
 
+# Re-upload in the background once a cached Gemini file gets this close (in seconds) to expiring
+REFRESH_BEFORE_EXPIRY = 10 * 60
+
 
 class MultimodalPart(ABC):
     """
@@ -67,11 +73,20 @@ class MultiModalPartFile(MultimodalPart):
     Concrete class for a single file input (image, audio, video, etc.).
 
     This class automatically uploads the file to Gemini and caches the upload result.
+
+    With `passthrough=True`, gs:// files are referenced by URI on Vertex AI, and other remote
+    files are piped from the HTTP response into the upload without touching disk. Public
+    http(s) URLs are only referenced by URI with `url_passthrough=True`, for models known to
+    fetch them.
     """
 
-    def __init__(self, file_path: Union[str, Path], gemini_client: GeminiClient = None):
+    def __init__(self, file_path: Union[str, Path], gemini_client: GeminiClient = None, **kwargs):
         super().__init__(gemini_client)
-        self._file_path = Path(file_path)
+        self._passthrough = kwargs.get("passthrough", False)
+        self._url_passthrough = kwargs.get("url_passthrough", False)
+        self._mime_type: Optional[str] = None
+        # Path() would collapse the "//" of remote URIs, so they are kept as strings
+        self._file_path = str(file_path) if FileUtils.is_remote_uri(file_path) else Path(file_path)
 
     @property
     def local_path(self) -> Path:
@@ -80,6 +95,39 @@ class MultiModalPartFile(MultimodalPart):
         """
         return self._file_path
 
+    @property
+    def mime_type(self) -> str:
+        """
+        Return the MIME type of the file: the Content-Type announced by the server for remote
+        files, or the one guessed from the file name.
+        """
+        if self._mime_type is None:
+            mime_type = self._remote_content_type() if self.is_remote else None
+            self._mime_type = mime_type or mimetypes.guess_type(str(self._file_path))[0] or "application/octet-stream"
+        return self._mime_type
+
+    def _remote_content_type(self) -> Optional[str]:
+        """
+        Return the Content-Type of a remote file from a HEAD request, if the server announces one.
+        """
+        http_url = FileUtils.normalize_url(self._file_path)
+        try:
+            response = FileUtils.get_http_pool().request("HEAD", http_url, retries=3)
+        except Exception as e:
+            logger.warning(f"Failed to get the content type of {http_url}: {e}")
+            return None
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if response.status >= 400 or content_type in ("", "application/octet-stream"):
+            return None
+        return content_type
+
+    @property
+    def is_remote(self) -> bool:
+        """
+        Whether the file is referenced by a remote URI.
+        """
+        return FileUtils.is_remote_uri(self._file_path)
+
     @property
     def remote_file(self):
         """
@@ -91,15 +139,45 @@ class MultiModalPartFile(MultimodalPart):
         Raises:
             Exception: If the upload fails.
         """
-        if self.in_cache(self._file_path):
-            logger.info(f"[Cache Hit] Using cached Gemini file for {self._file_path}")
-            return self.get_cache(self._file_path)
+        RefreshScheduler().track(self)
+        return self.get_or_set(
+            self._file_path,
+            self._upload_to_gemini,
+            expire=LibUtils.get_uploaded_file_exp_date_delta_t,
+            revalidate_within=REFRESH_BEFORE_EXPIRY,
+        )
+
+    def upload(self, progress_callback: Optional[UploadProgressCallback] = None):
+        """
+        Upload the file to Gemini and cache the result.
+
+        Args:
+            progress_callback: Called with (bytes sent, total bytes) during resumable uploads.
 
-        return self.upload()
+        Returns:
+            The uploaded file object from Gemini.
 
-    def upload(self):
+        Raises:
+            Exception: If the upload fails.
         """
-        Upload the file to Gemini and cache the result.
+        key = str(self._file_path)
+        cached_file = self.get_cache(key)
+        with Cacheable.key_lock(self._cache, key):
+            current_file = self.get_cache(key)
+            if current_file is not None and current_file.name != getattr(cached_file, "name", None):
+                # another thread or process uploaded the file while we waited for the lock
+                return current_file
+            uploaded_file = self._upload_to_gemini(progress_callback)
+            delta_t = LibUtils.get_uploaded_file_exp_date_delta_t(uploaded_file)
+            self.set_cache(key, uploaded_file, expire=delta_t)
+        return uploaded_file
+
+    def _upload_to_gemini(self, progress_callback: Optional[UploadProgressCallback] = None) -> File:
+        """
+        Upload the file to Gemini and wait until it is processed, without touching the cache.
+
+        Args:
+            progress_callback: Called with (bytes sent, total bytes) during resumable uploads.
 
         Returns:
             The uploaded file object from Gemini.
@@ -108,36 +186,103 @@ class MultiModalPartFile(MultimodalPart):
             Exception: If the upload fails.
         """
         with yaspin(text=f"Uploading file: {self._file_path}") as sp:
-            with FileUtils.solve_file_path(self._file_path) as path:
-                uploaded_file = self._gemini_client.upload_file(path)
+            uploaded_file = self._upload_remote_stream() if self._passthrough and self.is_remote else None
+            if uploaded_file is None:
+                with FileUtils.solve_file_path(self._file_path) as path:
+                    uploaded_file = self._gemini_client.upload_file(path, progress_callback=progress_callback)
 
-                while uploaded_file.state.name == "PROCESSING":
-                    logger.info(f"Waiting for Gemini to process file: {uploaded_file.name}")
-                    time.sleep(10)
-                    uploaded_file = self._gemini_client.get_file(uploaded_file.name)
+            try:
+                uploaded_file = self._wait_for_processing(uploaded_file)
+            except Exception:
+                sp.fail("❌")
+                raise
+            sp.ok("✅")
+            return uploaded_file
+
+    def _wait_for_processing(self, uploaded_file: File) -> File:
+        """
+        Poll an uploaded file until Gemini has processed it.
 
-                if uploaded_file.state.name == "FAILED":
-                    sp.fail("❌")
-                    raise Exception(f"Gemini failed to process file: {uploaded_file.name}")
+        Raises:
+            Exception: If processing fails.
+        """
+        while uploaded_file.state.name == "PROCESSING":
+            logger.info(f"Waiting for Gemini to process file: {uploaded_file.name}")
+            time.sleep(10)
+            uploaded_file = self._gemini_client.get_file(uploaded_file.name)
+
+        if uploaded_file.state.name == "FAILED":
+            raise Exception(f"Gemini failed to process file: {uploaded_file.name}")
 
-                delta_t = LibUtils.get_uploaded_file_exp_date_delta_t(uploaded_file)
-                self.set_cache(self._file_path, uploaded_file, expire=delta_t)
-                sp.ok("✅")
-                logger.info(f"Upload complete: {uploaded_file.name} (expires in {delta_t:.0f}s)")
-                return uploaded_file
+        delta_t = LibUtils.get_uploaded_file_exp_date_delta_t(uploaded_file)
+        logger.info(f"Upload complete: {uploaded_file.name} (expires in {delta_t:.0f}s)")
+        return uploaded_file
+
+    def adopt_upload(self, uploaded_file: File) -> File:
+        """
+        Cache a file uploaded by other means (e.g. while it was still being received) as the
+        upload of this part, once Gemini has processed it.
+
+        Args:
+            uploaded_file: The uploaded file object from Gemini.
+
+        Returns:
+            The processed file object.
+        """
+        uploaded_file = self._wait_for_processing(uploaded_file)
+        delta_t = LibUtils.get_uploaded_file_exp_date_delta_t(uploaded_file)
+        with Cacheable.key_lock(self._cache, str(self._file_path)):
+            self.set_cache(self._file_path, uploaded_file, expire=delta_t)
+        return uploaded_file
+
+    def _upload_remote_stream(self) -> Optional[File]:
+        """
+        Pipe a remote file from its HTTP response straight into a Gemini upload.
+
+        Returns:
+            The uploaded file, or None if the server does not announce the content length,
+            in which case the caller falls back to a regular download.
+        """
+        http_url = FileUtils.normalize_url(self._file_path)
+        response = FileUtils.get_http_pool().request(
+            "GET",
+            http_url,
+            headers={"Accept-Encoding": "identity"},
+            preload_content=False,
+            decode_content=False,
+        )
+        try:
+            FileUtils.raise_for_status(response.status, http_url)
+            content_length = response.headers.get("Content-Length")
+            if content_length is None:
+                logger.info(f"No Content-Length for {http_url}, falling back to download")
+                return None
+
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if not content_type or content_type == "application/octet-stream":
+                content_type = self.mime_type
+            return self._gemini_client.upload_stream(
+                response,
+                int(content_length),
+                content_type,
+                display_name=FileUtils.get_file_name_from_path(http_url),
+            )
+        finally:
+            response.release_conn()
 
     def delete(self):
         """
         Delete the uploaded file from Gemini and clear local cache.
         """
-        if self.in_cache(self._file_path):
-            cached_file = self.get_cache(self._file_path)
+        cached_file = self.get_cache(self._file_path)
+        if cached_file is not None:
             try:
                 self._gemini_client.delete_file(cached_file.name)
                 logger.info(f"Deleted file from Gemini: {cached_file.name}")
             except Exception as e:
                 logger.warning(f"Failed to delete file from Gemini: {e}")
 
+        RefreshScheduler().untrack(self)
         self.clear_cache()
         logger.info(f"Cleared cache for: {self._file_path}")
 
@@ -146,6 +291,10 @@ class MultiModalPartFile(MultimodalPart):
         Return this file as a content part for a Gemini prompt.
 
         Returns:
-            A list containing the uploaded file.
+            A list containing the uploaded file, or a file-data part referencing the remote URI.
         """
+        if self._passthrough and self.is_remote and self._gemini_client.supports_uri_passthrough(
+                self._file_path, allow_urls=self._url_passthrough
+        ):
+            return [Part.from_uri(file_uri=self._file_path, mime_type=self.mime_type)]
         return [self.remote_file]
@@ -1,14 +1,107 @@
 import logging
 import typing
 
+from PIL import Image as PILImage
+
+from geminiplayground.utils import FileUtils, PDFUtils
 from ..multimodal_part import MultiModalPartFile
 from pathlib import Path
 
+logger = logging.getLogger("rich")
+
+PDF_MODES = {"file", "text", "images", "text-first"}
+
 
 class PdfFile(MultiModalPartFile):
     """
     Pdf file part implementation
+
+    Supported modes:
+        - "file": upload the whole PDF to Gemini (default).
+        - "text": send the extracted text of each page, much cheaper when layout doesn't matter.
+        - "images": send each page rendered as an image.
+        - "text-first": send the text of text-rich pages and render only low-text
+          (scanned or figure-heavy) pages as images.
+
+    A page selection (see `PDFUtils.parse_page_range`) restricts the content to those pages;
+    in "file" mode it implies "images", since only whole documents are uploaded.
     """
 
     def __init__(self, file_path: typing.Union[str, Path], gemini_client=None, **kwargs):
-        super().__init__(file_path, gemini_client)
+        super().__init__(file_path, gemini_client, **kwargs)
+        self._mode = kwargs.get("mode", "file")
+        self._pages = kwargs.get("pages", None)
+        self._zoom = kwargs.get("zoom", 2.0)
+        self._min_text_chars = kwargs.get("min_text_chars", 200)
+        self._max_image_coverage = kwargs.get("max_image_coverage", 0.5)
+
+        if self._mode not in PDF_MODES:
+            raise ValueError(f"Invalid PDF mode: '{self._mode}'. Supported modes: {sorted(PDF_MODES)}.")
+
+    def _text_parts(self, pdf_path: str, pages) -> list:
+        texts = PDFUtils.extract_pages_text(pdf_path, pages)
+        return [f"[Page {page_index + 1}]\n{text}" for page_index, text in texts.items() if text.strip()]
+
+    def _image_parts(self, pdf_path: str, pages) -> list:
+        images = PDFUtils.render_pages(pdf_path, pages, zoom=self._zoom)
+        parts = []
+        for image_path in images.values():
+            with PILImage.open(image_path) as image:
+                image.load()
+                parts.append(image)
+        return parts
+
+    def _text_first_parts(self, pdf_path: str, pages) -> list:
+        """
+        Build a mixed list where consecutive text pages are merged into a single text part
+        and only low-text pages are sent as rendered images.
+        """
+        stats = PDFUtils.analyze_pages(pdf_path, pages)
+        image_pages = [
+            page_index
+            for page_index, page_stats in stats.items()
+            if PDFUtils.is_low_text_page(page_stats, self._min_text_chars, self._max_image_coverage)
+        ]
+        texts = PDFUtils.extract_pages_text(pdf_path, [i for i in stats if i not in image_pages])
+        images = dict(zip(image_pages, self._image_parts(pdf_path, image_pages))) if image_pages else {}
+        logger.info(f"PDF text-first: {len(texts)} text pages, {len(images)} image pages")
+
+        parts = []
+        text_block = []
+        for page_index in stats:
+            if page_index in images:
+                text_block.append(f"[Page {page_index + 1}]")
+                parts.append("\n\n".join(text_block))
+                parts.append(images[page_index])
+                text_block = []
+            elif texts[page_index].strip():
+                text_block.append(f"[Page {page_index + 1}]\n{texts[page_index]}")
+        if text_block:
+            parts.append("\n\n".join(text_block))
+        return parts
+
+    def content_parts(self, **kwargs) -> list:
+        """
+        Return this PDF as content parts for a Gemini prompt.
+
+        Args:
+            mode: Overrides the mode given at construction.
+            pages: Overrides the page selection given at construction.
+
+        Returns:
+            A list of content parts.
+        """
+        mode = kwargs.get("mode", self._mode)
+        pages = kwargs.get("pages", self._pages)
+        if mode not in PDF_MODES:
+            raise ValueError(f"Invalid PDF mode: '{mode}'. Supported modes: {sorted(PDF_MODES)}.")
+
+        if mode == "file" and pages is None:
+            return super().content_parts()
+
+        with FileUtils.solve_file_path(self._file_path) as pdf_path:
+            if mode == "text":
+                return self._text_parts(pdf_path, pages)
+            if mode == "text-first":
+                return self._text_first_parts(pdf_path, pages)
+            return self._image_parts(pdf_path, pages)
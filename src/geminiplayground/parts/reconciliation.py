@@ -0,0 +1,137 @@
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+from google.genai.types import File
+from pydantic import BaseModel, Field
+
+from geminiplayground.core import GeminiClient
+from geminiplayground.utils import FileUtils, LibUtils
+from .multimodal_part import MultiModalPartFile
+
+logger = logging.getLogger("rich")
+
+RECONCILE_PAGE_SIZE = 100
+RECONCILE_LAST_RUN_KEY = "reconcile:last-run"
+
+
+class ReconciliationReport(BaseModel):
+    """
+    Outcome of a reconciliation run.
+    """
+
+    checked: int = 0
+    remote_files: int = 0
+    evicted: list[str] = Field(default_factory=list)
+    refreshed: list[str] = Field(default_factory=list)
+    failed: list[str] = Field(default_factory=list)
+
+
+class RemoteFileReconciler:
+    """
+    Reconcile the cached Gemini uploads of `MultiModalPartFile` with the files that actually exist remotely.
+
+    Cache entries only expire with the Gemini file TTL, so files deleted remotely (e.g. with
+    `GeminiClient.delete_files`) would otherwise be served from cache until then. A run brings the
+    local `FileMirror` up to date, evicts every cache entry whose file is gone or failed, and
+    optionally re-uploads files about to expire.
+    """
+
+    def __init__(self, gemini_client: Optional[GeminiClient] = None):
+        self._gemini_client = gemini_client or GeminiClient()
+        self._cache = MultiModalPartFile._cache
+        self._memory_cache = MultiModalPartFile._memory_cache
+
+    def cached_files(self) -> dict[str, File]:
+        """
+        Return the cached uploads, keyed by the file path or URI of their part.
+        """
+        cached = {}
+        for key in list(self._cache):
+            if not isinstance(key, str) or key.startswith("lock:"):
+                continue
+            value = self._cache.get(key)
+            if isinstance(value, File):
+                cached[key] = value
+        return cached
+
+    def remote_files(self) -> dict[str, File]:
+        """
+        Bring the local file mirror up to date and return its files.
+
+        Always a full listing: only a full listing drops the files deleted by other processes
+        from the mirror, and missing those is what reconciliation is for.
+        """
+        mirror = self._gemini_client.file_mirror
+        mirror.refresh(full=True, page_size=RECONCILE_PAGE_SIZE)
+        return {f.name: f for f in mirror.find()}
+
+    def _evict(self, key: str):
+        if self._memory_cache is not None:
+            self._memory_cache.delete(key)
+        self._cache.delete(key)
+
+    def _refresh(self, key: str) -> File:
+        file_path = key if FileUtils.is_remote_uri(key) else Path(key)
+        if isinstance(file_path, Path) and not file_path.exists():
+            raise FileNotFoundError(f"Path does not exist: {file_path}")
+        return MultiModalPartFile(file_path, self._gemini_client).upload()
+
+    def reconcile(self, refresh_within: Optional[float] = None, dry_run: bool = False) -> ReconciliationReport:
+        """
+        Evict cache entries of files that no longer exist in Gemini.
+
+        Args:
+            refresh_within: Re-upload files expiring within this many seconds. None disables refreshing.
+            dry_run: Only report what would be evicted or refreshed.
+
+        Returns:
+            A report of the run.
+        """
+        cached = self.cached_files()
+        # listing first: if it fails, nothing is evicted
+        remote = self.remote_files()
+        report = ReconciliationReport(checked=len(cached), remote_files=len(remote))
+
+        for key, cached_file in cached.items():
+            remote_file = remote.get(cached_file.name)
+            if remote_file is None or (remote_file.state and remote_file.state.name == "FAILED"):
+                logger.info(f"[Reconcile] Evicting {key} ({cached_file.name} no longer exists)")
+                report.evicted.append(key)
+                if not dry_run:
+                    self._evict(key)
+                continue
+
+            if refresh_within is not None and LibUtils.get_uploaded_file_exp_date_delta_t(remote_file) <= refresh_within:
+                report.refreshed.append(key)
+                if dry_run:
+                    continue
+                try:
+                    self._refresh(key)
+                    logger.info(f"[Reconcile] Refreshed {key}")
+                except Exception as e:
+                    logger.warning(f"[Reconcile] Failed to refresh {key}: {e}")
+                    report.refreshed.remove(key)
+                    report.failed.append(key)
+
+        logger.info(
+            f"[Reconcile] {report.checked} cached, {report.remote_files} remote, "
+            f"{len(report.evicted)} evicted, {len(report.refreshed)} refreshed, {len(report.failed)} failed"
+        )
+        return report
+
+    def reconcile_if_due(self, interval: float, **kwargs) -> Optional[ReconciliationReport]:
+        """
+        Run `reconcile` unless a run already happened in any process within `interval` seconds.
+
+        Args:
+            interval: Minimum number of seconds between two runs.
+            kwargs: Forwarded to `reconcile`.
+
+        Returns:
+            The report, or None if the run was skipped.
+        """
+        if not self._cache.add(RECONCILE_LAST_RUN_KEY, time.time(), expire=interval):
+            return None
+        return self.reconcile(**kwargs)
@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from geminiplayground.utils import Cacheable, Singleton
+
+logger = logging.getLogger("rich")
+
+# Re-upload files expiring within this many seconds
+REFRESH_LEAD_TIME = float(os.environ.get("GEMINI_PLAYGROUND_REFRESH_LEAD_TIME", 60 * 60))
+# Only parts used within this many seconds are refreshed
+REFRESH_HOT_WINDOW = float(os.environ.get("GEMINI_PLAYGROUND_REFRESH_HOT_WINDOW", 6 * 60 * 60))
+REFRESH_POLL_INTERVAL = 60.0
+
+
+class RefreshScheduler(metaclass=Singleton):
+    """
+    Re-upload hot `MultiModalPartFile` uploads in the background before they expire.
+
+    Parts register themselves whenever their remote file is used while the scheduler runs, so
+    library users who never start it don't keep every part alive. Once started, a daemon thread
+    wakes up before the earliest upload reaches `lead_time` seconds from expiry and re-uploads
+    every due part used within `hot_window` seconds, most recently used first, so requests never
+    pay the upload and processing latency of an expired file. Parts that weren't used recently
+    are left to expire.
+    """
+
+    def __init__(
+            self,
+            lead_time: float = REFRESH_LEAD_TIME,
+            hot_window: float = REFRESH_HOT_WINDOW,
+            max_workers: int = 2,
+            poll_interval: float = REFRESH_POLL_INTERVAL,
+    ):
+        self.lead_time = lead_time
+        self.hot_window = hot_window
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._parts = {}
+        self._last_used: dict[str, float] = {}
+        # failed or contended refreshes are retried after `poll_interval`
+        self._retry_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _part_key(part) -> str:
+        return str(part._file_path)
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the background thread is running.
+        """
+        return self._thread is not None and self._thread.is_alive() and not self._stopped.is_set()
+
+    def track(self, part):
+        """
+        Register a part and mark it as just used, if the scheduler is running.
+
+        Args:
+            part: A `MultiModalPartFile`.
+        """
+        if not self.running:
+            return
+        key = self._part_key(part)
+        with self._lock:
+            is_new = key not in self._parts
+            self._parts[key] = part
+            self._last_used[key] = time.time()
+        if is_new:
+            # a new part may expire before the current wake-up time
+            self._wakeup.set()
+
+    def untrack(self, part):
+        """
+        Stop refreshing a part, e.g. after it has been deleted.
+        """
+        key = self._part_key(part)
+        with self._lock:
+            self._parts.pop(key, None)
+            self._last_used.pop(key, None)
+            self._retry_at.pop(key, None)
+
+    def _expire_at(self, part) -> Optional[float]:
+        _, expire_at = part._cache.get(self._part_key(part), expire_time=True)
+        return expire_at
+
+    def due(self, now: Optional[float] = None) -> list:
+        """
+        Return the hot parts that expire within `lead_time`, most recently used first.
+
+        Parts whose upload is no longer cached at all are due as well.
+        """
+        now = now or time.time()
+        with self._lock:
+            # forget parts that went cold, so the registry doesn't grow unbounded
+            for key in [key for key, last_used in self._last_used.items() if now - last_used > self.hot_window]:
+                self._parts.pop(key, None)
+                self._last_used.pop(key, None)
+                self._retry_at.pop(key, None)
+            candidates = [
+                (last_used, self._parts[key])
+                for key, last_used in self._last_used.items()
+                if self._retry_at.get(key, 0) <= now
+            ]
+        due = []
+        for last_used, part in candidates:
+            expire_at = self._expire_at(part)
+            if expire_at is None or expire_at - now <= self.lead_time:
+                due.append((last_used, part))
+        return [part for _, part in sorted(due, key=lambda item: item[0], reverse=True)]
+
+    def _next_wakeup(self, now: float) -> float:
+        """
+        Return how long to sleep until the next hot part becomes due, capped at `poll_interval`.
+        """
+        with self._lock:
+            parts = [self._parts[key] for key, last_used in self._last_used.items() if now - last_used <= self.hot_window]
+        delay = self.poll_interval
+        for part in parts:
+            expire_at = self._expire_at(part)
+            if expire_at is not None:
+                delay = min(delay, expire_at - self.lead_time - now)
+        return max(delay, 1.0)
+
+    def _refresh(self, part) -> bool:
+        key = self._part_key(part)
+        # shares the key lock of uploads and background revalidation, so a file is never
+        # uploaded twice; `upload()` re-enters it on this thread
+        with Cacheable.key_lock(part._cache, key, blocking=False) as locked:
+            if not locked:
+                return False
+            try:
+                logger.info(f"[Refresh] Re-uploading {key} before it expires")
+                part.upload()
+                return True
+            except Exception as e:
+                logger.warning(f"[Refresh] Failed to re-upload {key}: {e}")
+                return False
+
+    def run_once(self) -> list[str]:
+        """
+        Refresh every due part, in priority order.
+
+        Returns:
+            The keys of the refreshed parts.
+        """
+        parts = self.due()
+        if not parts:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="refresh") as executor:
+            results = list(executor.map(self._refresh, parts))
+        retry_at = time.time() + self.poll_interval
+        with self._lock:
+            for part, refreshed in zip(parts, results):
+                if refreshed:
+                    self._retry_at.pop(self._part_key(part), None)
+                else:
+                    self._retry_at[self._part_key(part)] = retry_at
+        return [self._part_key(part) for part, refreshed in zip(parts, results) if refreshed]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"[Refresh] Scheduler iteration failed: {e}")
+            self._wakeup.wait(self._next_wakeup(time.time()))
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Start the background thread, if not already running.
+        """
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Refresh scheduler started")
+
+    def shutdown(self):
+        """
+        Stop the background thread.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._parts.clear()
+            self._last_used.clear()
+            self._retry_at.clear()
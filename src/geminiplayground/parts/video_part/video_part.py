@@ -27,7 +27,7 @@ class VideoFile(MultiModalPartFile):
     """
 
     def __init__(self, file_path: Union[str, Path], gemini_client=None, **kwargs):
-        super().__init__(file_path, gemini_client)
+        super().__init__(file_path, gemini_client, **kwargs)
 
     def extract_keyframes(
             self,
@@ -6,7 +6,10 @@ from .file_utils import FileUtils
 from .lib_utils import LibUtils
 from .video_utils import VideoUtils
 from .pdf_utils import PDFUtils
+from .memory_cache import MemoryCache
+from .redis_cache import RedisCache
 from .cacheable import Cacheable
+from .download_cache import DownloadCache
 
 __all__ = [
     "GitRemoteProgress",
@@ -17,6 +20,9 @@ __all__ = [
     "LibUtils",
     "VideoUtils",
     "PDFUtils",
+    "MemoryCache",
+    "RedisCache",
     "Cacheable",
+    "DownloadCache",
 
 ]
@@ -1,14 +1,95 @@
+import dataclasses
 import functools
+import hashlib
 import logging
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Callable, Iterator, Optional, Union
+
 from diskcache import Cache
 
+from pydantic import BaseModel
+
+from .memory_cache import MemoryCache
+
 logger = logging.getLogger("rich")
 
+_MISSING = object()
+
+# Upper bound on how long a crashed process can hold a per-key compute lock
+LOCK_EXPIRE = 30 * 60
+# Backoff bounds, in seconds, while waiting for a per-key lock held by another process
+LOCK_POLL_MIN = 0.01
+LOCK_POLL_MAX = 1.0
+
+Expire = Union[None, float, Callable[[Any], Optional[float]]]
+
+_PRIMITIVES = (type(None), bool, int, float, str, bytes)
+_MAX_CANONICAL_DEPTH = 16
+
+
+def _canonical_sort_key(value) -> bytes:
+    return pickle.dumps(value, protocol=4)
+
+
+def _canonicalize(value: Any, depth: int = 0) -> Any:
+    """
+    Convert a value into a structure of primitives and tuples that pickles deterministically.
+
+    Containers are tagged with their kind and unordered ones are sorted, so equal arguments map to
+    equal structures regardless of insertion order. Only value types are accepted: other objects
+    must define a `__cache_key__()` method returning a value that identifies them.
+
+    Raises:
+        TypeError: For objects without a canonical form or a `__cache_key__` method.
+        ValueError: For structures nested deeper than `_MAX_CANONICAL_DEPTH`.
+    """
+    if isinstance(value, _PRIMITIVES):
+        return value
+    if depth > _MAX_CANONICAL_DEPTH:
+        raise ValueError(f"Cache key arguments are nested deeper than {_MAX_CANONICAL_DEPTH} levels")
+
+    depth += 1
+    cache_key = getattr(value, "__cache_key__", None)
+    if cache_key is not None and not isinstance(value, type):
+        return type(value).__qualname__, _canonicalize(cache_key(), depth)
+    if isinstance(value, PurePath):
+        return "path", value.as_posix()
+    if isinstance(value, Enum):
+        return type(value).__qualname__, _canonicalize(value.value, depth)
+    if isinstance(value, dict):
+        items = ((_canonicalize(k, depth), _canonicalize(v, depth)) for k, v in value.items())
+        return "dict", tuple(sorted(items, key=_canonical_sort_key))
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_canonicalize(v, depth) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return "set", tuple(sorted((_canonicalize(v, depth) for v in value), key=_canonical_sort_key))
+    if isinstance(value, BaseModel):
+        return type(value).__qualname__, _canonicalize(value.model_dump(), depth)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return type(value).__qualname__, _canonicalize(dataclasses.asdict(value), depth)
+    raise TypeError(
+        f"Cannot derive a cache key from {type(value).__qualname__} objects, "
+        f"define a __cache_key__() method returning a value that identifies them"
+    )
+
 
 class Cacheable:
     """
     A class decorator to make methods and objects cache-aware using `diskcache.Cache`.
 
+    Lookups go through a bounded in-process LRU (L1) before reaching the disk cache (L2).
+    L1 entries never outlive their L2 counterpart: their TTL is the smaller of `memory_ttl`
+    and the time left before the L2 entry expires. Since L1 is per process, `memory_ttl`
+    also bounds how long another process' deletions can go unnoticed.
+
     Usage:
         @Cacheable(cache, "tag_attr")
         class MyClass:
@@ -18,21 +99,284 @@ class Cacheable:
                 ...
     """
 
-    def __init__(self, cache: Cache, cache_tag_attr: str):
+    _func_stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+    _func_stats_lock = threading.Lock()
+    # in-process halves of the per-key locks, with the number of threads using each
+    _key_locks: dict[tuple[int, str], list] = {}
+    _key_locks_guard = threading.Lock()
+    _held_key_locks = threading.local()
+    _tag_indexed_caches: set[int] = set()
+
+    def __init__(
+            self,
+            cache: Cache,
+            cache_tag_attr: str,
+            memory_cache_size: int = 256,
+            memory_ttl: float = 60.0,
+    ):
         """
         Initialize a cacheable class wrapper.
 
         Args:
             cache: A `diskcache.Cache` instance.
             cache_tag_attr: Name of the instance attribute used to tag cache entries.
+            memory_cache_size: Maximum number of L1 entries, 0 disables the L1 layer.
+            memory_ttl: Maximum lifetime in seconds of an L1 entry.
         """
         self._cache = cache
         self._cache_tag_attr = cache_tag_attr
+        self._memory_ttl = memory_ttl
+        self._memory_cache = MemoryCache(max_size=memory_cache_size) if memory_cache_size else None
+
+    @staticmethod
+    def make_key(namespace: str, *args, **kwargs) -> str:
+        """
+        Derive a short, stable cache key from call arguments.
+
+        Arguments are canonicalized (see `_canonicalize`), pickled and hashed with BLAKE2b,
+        so keys have a fixed length and don't depend on object identity or reprs. Arguments
+        other than primitives, containers, paths, enums, pydantic models and dataclasses must
+        define a `__cache_key__()` method.
+
+        Args:
+            namespace: Human-readable key prefix, e.g. "Class:method".
+            args: Positional arguments.
+            kwargs: Keyword arguments.
+
+        Returns:
+            A key of the form "<namespace>:<32 hex chars>".
+
+        Raises:
+            TypeError: If an argument has no canonical form.
+        """
+        canonical = _canonicalize((args, kwargs))
+        digest = hashlib.blake2b(pickle.dumps(canonical, protocol=4), digest_size=16).hexdigest()
+        return f"{namespace}:{digest}"
+
+    @staticmethod
+    def _ensure_tag_index(cache):
+        """
+        Create the tag index on first use, so `evict(tag)` only visits the entries of that tag.
+
+        Done lazily rather than at decoration time, to avoid touching the cache on import.
+        """
+        if id(cache) in Cacheable._tag_indexed_caches:
+            return
+        create_tag_index = getattr(cache, "create_tag_index", None)
+        if create_tag_index is not None:
+            create_tag_index()
+        Cacheable._tag_indexed_caches.add(id(cache))
+
+    @staticmethod
+    def _record_func_stat(name: str, hit: bool):
+        with Cacheable._func_stats_lock:
+            Cacheable._func_stats[name]["hits" if hit else "misses"] += 1
+
+    @staticmethod
+    def get_func_stats() -> dict[str, dict]:
+        """
+        Return hit/miss counters of every `cache_func`-decorated method in this process.
+
+        Returns:
+            A mapping of "Class.method" to its hits, misses and hit rate.
+        """
+        with Cacheable._func_stats_lock:
+            return {
+                name: {**stats, "hit_rate": stats["hits"] / max(stats["hits"] + stats["misses"], 1)}
+                for name, stats in Cacheable._func_stats.items()
+            }
+
+    @staticmethod
+    def _memory_set(obj, key: str, value, expire_at: Optional[float], tag: Optional[str]):
+        """
+        Mirror an L2 entry into L1 with a TTL that never outlives it.
+        """
+        if obj._memory_cache is None:
+            return
+        ttl = obj._memory_ttl
+        if expire_at is not None:
+            ttl = min(ttl, expire_at - time.time())
+        if ttl > 0:
+            obj._memory_cache.set(key, value, expire=ttl, tag=tag)
+
+    @staticmethod
+    def _two_tier_get(obj, key: str, default=None):
+        """
+        Look a key up in L1, then in L2, promoting L2 hits to L1.
+        """
+        if obj._memory_cache is not None:
+            value = obj._memory_cache.get(key, default=_MISSING)
+            if value is not _MISSING:
+                return value
+
+        value, expire_at, tag = obj._cache.get(key, default=_MISSING, expire_time=True, tag=True)
+        if value is _MISSING:
+            return default
+        Cacheable._memory_set(obj, key, value, expire_at, tag)
+        return value
+
+    @staticmethod
+    def _two_tier_set(obj, key: str, value, expire: Optional[float] = None, tag: Optional[str] = None, **kwargs):
+        if tag is not None:
+            Cacheable._ensure_tag_index(obj._cache)
+        obj._cache.set(key, value, expire=expire, tag=tag, **kwargs)
+        expire_at = None if expire is None else time.time() + expire
+        Cacheable._memory_set(obj, key, value, expire_at, tag)
+
+    @staticmethod
+    def _compute_and_set(obj, key: str, compute: Callable[[], Any], expire: Expire, tag: Optional[str]):
+        value = compute()
+        ttl = expire(value) if callable(expire) else expire
+        Cacheable._two_tier_set(obj, key, value, expire=ttl, tag=tag)
+        return value
+
+    @staticmethod
+    def _acquire_lease(cache: Cache, lease_key: str, blocking: bool = True) -> Optional[str]:
+        """
+        Take a cross-process lease stored in the cache, backing off exponentially while it is taken.
+
+        Returns:
+            The token of the lease, or None if it is taken and `blocking` is False.
+        """
+        token = uuid.uuid4().hex
+        delay = LOCK_POLL_MIN
+        while not cache.add(lease_key, token, expire=LOCK_EXPIRE):
+            if not blocking:
+                return None
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, LOCK_POLL_MAX)
+        return token
+
+    @staticmethod
+    def _release_lease(cache: Cache, lease_key: str, token: str):
+        """
+        Release a lease, unless it expired and was taken over by someone else.
+        """
+        if cache.get(lease_key) == token:
+            cache.delete(lease_key)
+
+    @staticmethod
+    @contextmanager
+    def key_lock(cache: Cache, key: str, blocking: bool = True) -> Iterator[bool]:
+        """
+        Hold the per-key lock that serializes computing and storing a cache entry.
+
+        Threads of this process wait on an in-process lock, and only its holder competes with
+        other processes for the `lock:{key}` lease, so only cross-process contention is polled,
+        with exponential backoff. The lock is reentrant within a thread.
+
+        Args:
+            cache: The disk cache holding the key.
+            key: The cache key.
+            blocking: Whether to wait for the lock, or give up at once if it is taken.
+
+        Yields:
+            Whether the lock is held, always True when blocking.
+        """
+        lock_id = (id(cache), str(key))
+        depths = Cacheable._held_key_locks.__dict__.setdefault("depths", {})
+        if depths.get(lock_id):
+            depths[lock_id] += 1
+            try:
+                yield True
+            finally:
+                depths[lock_id] -= 1
+            return
+
+        with Cacheable._key_locks_guard:
+            entry = Cacheable._key_locks.setdefault(lock_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(blocking=blocking):
+                yield False
+                return
+            try:
+                lease_key = f"lock:{key}"
+                token = Cacheable._acquire_lease(cache, lease_key, blocking)
+                if token is None:
+                    yield False
+                    return
+                depths[lock_id] = 1
+                try:
+                    yield True
+                finally:
+                    del depths[lock_id]
+                    Cacheable._release_lease(cache, lease_key, token)
+            finally:
+                entry[0].release()
+        finally:
+            with Cacheable._key_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del Cacheable._key_locks[lock_id]
+
+    @staticmethod
+    def _revalidate_in_background(obj, key: str, compute: Callable[[], Any], expire: Expire, tag: Optional[str]):
+        """
+        Recompute a soon-to-expire entry in a daemon thread, unless another thread or process already is.
+        """
+        lease_key = f"lock:{key}"
+        token = Cacheable._acquire_lease(obj._cache, lease_key, blocking=False)
+        if token is None:
+            return
+
+        def revalidate():
+            try:
+                logger.info(f"[Cache Revalidate] {key}")
+                Cacheable._compute_and_set(obj, key, compute, expire, tag)
+            except Exception as e:
+                logger.warning(f"[Cache Revalidate] Failed for {key}: {e}")
+            finally:
+                Cacheable._release_lease(obj._cache, lease_key, token)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    @staticmethod
+    def _get_or_set(
+            obj,
+            key: str,
+            compute: Callable[[], Any],
+            expire: Expire = None,
+            tag: Optional[str] = None,
+            revalidate_within: Optional[float] = None,
+    ):
+        """
+        Atomically return a cached value or compute, store and return it.
+
+        Misses are detected with a sentinel, so cached None values are hits. On a miss, the
+        `key_lock` of the key makes concurrent threads and processes wait for a single
+        computation instead of repeating it. With `revalidate_within`, entries closer than that
+        many seconds to expiry are returned as is while being recomputed in the background.
+        """
+        if obj._memory_cache is not None:
+            value, expire_at = obj._memory_cache.get(key, default=_MISSING, expire_time=True)
+            if value is not _MISSING and (revalidate_within is None or expire_at is None
+                                          or expire_at - time.time() > revalidate_within):
+                return value
+
+        value, expire_at, _ = obj._cache.get(key, default=_MISSING, expire_time=True, tag=True)
+        if value is not _MISSING:
+            Cacheable._memory_set(obj, key, value, expire_at, tag)
+            if revalidate_within is not None and expire_at is not None and expire_at - time.time() <= revalidate_within:
+                Cacheable._revalidate_in_background(obj, key, compute, expire, tag)
+            return value
+
+        with Cacheable.key_lock(obj._cache, key):
+            # another thread or process may have computed the value while we waited
+            value, expire_at, _ = obj._cache.get(key, default=_MISSING, expire_time=True, tag=True)
+            if value is not _MISSING:
+                Cacheable._memory_set(obj, key, value, expire_at, tag)
+                return value
+            return Cacheable._compute_and_set(obj, key, compute, expire, tag)
 
     @staticmethod
     def cache_func(func):
         """
-        Method decorator for caching function outputs based on arguments and instance tag.
+        Method decorator for caching function outputs based on arguments and instance identity.
+
+        The instance is identified by its `__cache_key__()` if it defines one, or else by its
+        tag attribute, so instances sharing a class don't share results. Entries are tagged
+        with the instance tag, so `clear_cache()` drops them.
 
         Args:
             func: The method to cache.
@@ -49,19 +393,20 @@ class Cacheable:
             )
 
             # Generate a stable key
-            sorted_kwargs = tuple(sorted(kwargs.items()))
-            cache_key = f"{self.__class__.__name__}:{func.__name__}:{args}:{sorted_kwargs}"
+            func_name = f"{self.__class__.__name__}.{func.__name__}"
             cache_tag = str(getattr(self, self._cache_tag_attr))
+            instance_key = self.__cache_key__() if hasattr(self, "__cache_key__") else cache_tag
+            cache_key = Cacheable.make_key(func_name.replace(".", ":"), instance_key, *args, **kwargs)
+            computed = False
 
-            # Attempt to retrieve cached result
-            entry = self._cache.get(cache_key, tag=cache_tag)
-            if entry is not None:
-                logger.info(f"[Cache Hit] {cache_key}")
-                return entry
+            def compute():
+                nonlocal computed
+                computed = True
+                logger.info(f"[Cache Miss] {cache_key} — computing and caching result.")
+                return func(self, *args, **kwargs)
 
-            logger.info(f"[Cache Miss] {cache_key} — computing and caching result.")
-            result = func(self, *args, **kwargs)
-            self._cache.set(cache_key, result, tag=cache_tag)
+            result = Cacheable._get_or_set(self, cache_key, compute, tag=cache_tag)
+            Cacheable._record_func_stat(func_name, hit=not computed)
             return result
 
         return decorator
@@ -70,7 +415,8 @@ class Cacheable:
         """
         Wrap the class with cache-aware methods and attributes.
 
-        Adds instance methods: clear_cache, set_cache, get_cache, del_cache, in_cache.
+        Adds instance methods: clear_cache, set_cache, get_cache, del_cache, in_cache, get_or_set,
+        cache_stats.
 
         Args:
             cls: The class to decorate.
@@ -83,19 +429,24 @@ class Cacheable:
             """Clear all cache entries tagged with this instance's tag."""
             tag = str(getattr(self, self._cache_tag_attr))
             logger.info(f"[Cache Clear] Tag: {tag}")
+            Cacheable._ensure_tag_index(self._cache)
             self._cache.evict(tag=tag)
+            if self._memory_cache is not None:
+                self._memory_cache.evict(tag=tag)
 
         def set_cache(self, key, value, **kwargs):
             """Manually set a value in cache under the given key."""
             tag = str(getattr(self, self._cache_tag_attr))
-            self._cache.set(str(key), value, tag=tag, **kwargs)
+            Cacheable._two_tier_set(self, str(key), value, tag=tag, **kwargs)
 
         def get_cache(self, key):
             """Retrieve a value from cache."""
-            return self._cache.get(str(key))
+            return Cacheable._two_tier_get(self, str(key))
 
         def del_cache(self, key):
             """Remove a value from the cache."""
+            if self._memory_cache is not None:
+                self._memory_cache.delete(str(key))
             try:
                 del self._cache[str(key)]
             except KeyError:
@@ -103,15 +454,39 @@ class Cacheable:
 
         def in_cache(self, key):
             """Check if a value is cached."""
+            if self._memory_cache is not None and str(key) in self._memory_cache:
+                return True
             return str(key) in self._cache
 
+        def get_or_set(self, key, compute, expire=None, revalidate_within=None):
+            """
+            Atomically return the cached value of a key, or compute and cache it.
+
+            Args:
+                key: Cache key.
+                compute: Zero-argument callable producing the value on a miss.
+                expire: TTL in seconds, or a callable deriving it from the computed value.
+                revalidate_within: Recompute in the background when the entry expires within
+                    this many seconds, while still returning the current value.
+            """
+            tag = str(getattr(self, self._cache_tag_attr))
+            return Cacheable._get_or_set(self, str(key), compute, expire, tag, revalidate_within)
+
+        def cache_stats(self):
+            """Return the hit/miss statistics of the in-memory layer."""
+            return self._memory_cache.stats() if self._memory_cache is not None else {}
+
         # Attach cache methods and attributes
         cls.clear_cache = clear_cache
         cls.set_cache = set_cache
         cls.get_cache = get_cache
         cls.del_cache = del_cache
         cls.in_cache = in_cache
+        cls.get_or_set = get_or_set
+        cls.cache_stats = cache_stats
         setattr(cls, "_cache", self._cache)
         setattr(cls, "_cache_tag_attr", self._cache_tag_attr)
+        setattr(cls, "_memory_cache", self._memory_cache)
+        setattr(cls, "_memory_ttl", self._memory_ttl)
 
         return cls
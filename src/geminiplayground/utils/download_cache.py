@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from diskcache import Cache, Lock
+
+from .file_utils import FileUtils, ProgressCallback
+from .lib_utils import LibUtils
+from .singleton import Singleton
+
+logger = logging.getLogger("rich")
+
+DEFAULT_SIZE_LIMIT = int(os.environ.get("GEMINI_PLAYGROUND_DOWNLOAD_CACHE_SIZE", 2 * 1024 ** 3))
+DEFAULT_MAX_AGE = int(os.environ.get("GEMINI_PLAYGROUND_DOWNLOAD_CACHE_MAX_AGE", 3600))
+
+
+class DownloadCache(metaclass=Singleton):
+    """
+    A persistent, content-addressed cache of downloaded URLs.
+
+    Downloads are stored once per content digest under `<lib home>/downloads/blobs`, and a
+    diskcache index maps each URL to its blob and validators (ETag, Last-Modified). Fresh
+    entries are served without any network access, stale ones are revalidated with a
+    conditional GET, and the least recently used blobs are evicted above `size_limit`.
+    Downloads go through `FileUtils.fetch_file`, so they resume after dropped connections.
+    """
+
+    def __init__(
+            self,
+            directory: Optional[Union[str, Path]] = None,
+            size_limit: int = DEFAULT_SIZE_LIMIT,
+            max_age: int = DEFAULT_MAX_AGE,
+    ):
+        self.directory = Path(directory or LibUtils.get_lib_home().joinpath("downloads"))
+        self.blobs_dir = self.directory.joinpath("blobs")
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.checkouts_dir = self.directory.joinpath("checkouts")
+        self.size_limit = size_limit
+        self.max_age = max_age
+        self._index = Cache(directory=str(self.directory.joinpath("index")))
+
+    @staticmethod
+    def _entry_key(url: str) -> tuple:
+        return "entry", url
+
+    def _entries(self) -> list[dict]:
+        entries = []
+        for key in self._index.iterkeys():
+            if isinstance(key, tuple) and key[0] == "entry":
+                entry = self._index.get(key)
+                if entry is not None:
+                    entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+        if not cache_control:
+            return None
+        if "no-cache" in cache_control or "no-store" in cache_control:
+            return 0
+        match = re.search(r"max-age=(\d+)", cache_control)
+        return int(match.group(1)) if match else None
+
+    def _is_fresh(self, entry: dict) -> bool:
+        max_age = entry.get("max_age")
+        max_age = self.max_age if max_age is None else max_age
+        return time.time() - entry["fetched_at"] < max_age
+
+    def _touch(self, url: str, entry: dict, **updates) -> dict:
+        entry.update(updates, last_access=time.time())
+        self._index.set(self._entry_key(url), entry)
+        return entry
+
+    def _download(
+            self, url: str, headers: dict, progress_callback: Optional[ProgressCallback] = None
+    ) -> Optional[dict]:
+        """
+        Download a URL into the blob store, with the resume and retries of `FileUtils.fetch_file`.
+
+        Returns:
+            The new entry, or None if the server answered the conditional `headers` with a 304.
+        """
+        ext = Path(FileUtils.get_file_name_from_path(url)).suffix
+        tmp_path = self.blobs_dir.joinpath(f".{os.getpid()}-{time.time_ns()}.part")
+        try:
+            response_headers = FileUtils.fetch_file(
+                url, tmp_path, progress_callback=progress_callback, headers=headers
+            )
+            if response_headers is None:
+                return None
+            size = tmp_path.stat().st_size
+            blob_name = f"{FileUtils.get_file_digest(tmp_path)}{ext}"
+            os.replace(tmp_path, self.blobs_dir.joinpath(blob_name))
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        now = time.time()
+        return {
+            "url": url,
+            "blob": blob_name,
+            "size": size,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "max_age": self._parse_max_age(response_headers.get("Cache-Control")),
+            "fetched_at": now,
+            "last_access": now,
+        }
+
+    def get(self, url: str, progress_callback: Optional[ProgressCallback] = None) -> Path:
+        """
+        Return the local path of a URL, downloading or revalidating it only when needed.
+
+        Stale entries are revalidated with a conditional GET, so an unchanged file is never
+        transferred again.
+
+        Args:
+            url: URL to the file (gs:// URLs are converted to HTTPS).
+            progress_callback: Called with (downloaded bytes, total bytes or None) while downloading.
+
+        Returns:
+            Path to the cached blob. It is owned by the cache, must not be modified and may be
+            evicted at any time: use `checkout` to keep it while it is in use.
+
+        Raises:
+            FileNotFoundError, PermissionError, IOError: For HTTP errors.
+        """
+        http_url = FileUtils.normalize_url(url)
+        key = self._entry_key(http_url)
+
+        with Lock(self._index, ("lock", http_url), expire=3600):
+            entry = self._index.get(key)
+            if entry is not None and not self.blobs_dir.joinpath(entry["blob"]).exists():
+                entry = None
+
+            if entry is not None and self._is_fresh(entry):
+                logger.info(f"[Download Cache Hit] {http_url}")
+                return self.blobs_dir.joinpath(self._touch(http_url, entry)["blob"])
+
+            headers = {}
+            if entry is not None:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            new_entry = self._download(http_url, headers, progress_callback)
+            if new_entry is None:
+                logger.info(f"[Download Cache Revalidated] {http_url}")
+                return self.blobs_dir.joinpath(self._touch(http_url, entry, fetched_at=time.time())["blob"])
+            logger.info(f"[Download Cache Miss] {http_url}")
+            entry = new_entry
+            self._index.set(key, entry)
+
+        self.evict(keep=entry["blob"])
+        return self.blobs_dir.joinpath(entry["blob"])
+
+    @contextmanager
+    def checkout(self, url: str, progress_callback: Optional[ProgressCallback] = None) -> Iterator[Path]:
+        """
+        Get a URL like `get`, keeping the file available until the context exits.
+
+        The blob is hardlinked (or copied, on filesystems without hardlinks) to a private path,
+        so evicting it, from this process or another one, doesn't affect the caller.
+
+        Yields:
+            Path to a private copy of the cached file.
+        """
+        self.checkouts_dir.mkdir(parents=True, exist_ok=True)
+        for attempt in range(2):
+            blob_path = self.get(url, progress_callback)
+            checkout_path = self.checkouts_dir.joinpath(f"{os.getpid()}-{time.time_ns()}-{blob_path.name}")
+            try:
+                os.link(blob_path, checkout_path)
+            except FileNotFoundError:
+                # evicted between get and link: fetch it again, once
+                if attempt:
+                    raise
+                continue
+            except OSError:
+                shutil.copyfile(blob_path, checkout_path)
+            break
+        try:
+            yield checkout_path
+        finally:
+            checkout_path.unlink(missing_ok=True)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Evict least recently used entries until the cache fits in `size_limit`.
+
+        Args:
+            keep: A blob name that must not be evicted (typically the one just downloaded).
+
+        Returns:
+            The number of bytes freed.
+        """
+        entries = self._entries()
+        blob_sizes = {entry["blob"]: entry["size"] for entry in entries}
+        total = sum(blob_sizes.values())
+        if total <= self.size_limit:
+            return 0
+
+        ref_counts = Counter(entry["blob"] for entry in entries)
+        freed = 0
+        for entry in sorted(entries, key=lambda e: e["last_access"]):
+            if total - freed <= self.size_limit:
+                break
+            if entry["blob"] == keep:
+                continue
+            self._index.delete(self._entry_key(entry["url"]))
+            # blobs are content-addressed and may be shared by several URLs
+            ref_counts[entry["blob"]] -= 1
+            if ref_counts[entry["blob"]] == 0:
+                self.blobs_dir.joinpath(entry["blob"]).unlink(missing_ok=True)
+                freed += blob_sizes[entry["blob"]]
+            logger.info(f"[Download Cache Evict] {entry['url']}")
+        return freed
+
+    def clear(self):
+        """
+        Remove every cached download.
+        """
+        self._index.clear()
+        FileUtils.clear_folder(self.blobs_dir)
@@ -1,18 +1,31 @@
+import hashlib
+import logging
 import os
 import ssl
 import shutil
 import tempfile
-import urllib.request
 from pathlib import Path
-from typing import Any, Generator, ContextManager, Union
+from threading import Lock
+from typing import Any, Callable, Generator, ContextManager, Optional, Union
 from contextlib import contextmanager
-from urllib.error import HTTPError
 from urllib.parse import urlparse
 
+import urllib3
 import validators
+from tqdm import tqdm
+from urllib3 import HTTPHeaderDict
+from urllib3.exceptions import InsecureRequestWarning, ProtocolError, ReadTimeoutError
+
+logger = logging.getLogger("rich")
 
 # Disable SSL verification globally (not ideal in production)
 ssl._create_default_https_context = ssl._create_unverified_context
+urllib3.disable_warnings(InsecureRequestWarning)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_MAX_RETRIES = 3
+
+ProgressCallback = Callable[[int, Optional[int]], None]
 
 
 class FileUtils:
@@ -22,6 +35,27 @@ class FileUtils:
     and size formatting.
     """
 
+    _http_pool: Optional[urllib3.PoolManager] = None
+    _http_pool_lock: Lock = Lock()
+
+    @classmethod
+    def get_http_pool(cls) -> urllib3.PoolManager:
+        """
+        Return the shared HTTP connection pool used for downloads.
+
+        Returns:
+            A process-wide `urllib3.PoolManager`, created on first use.
+        """
+        with cls._http_pool_lock:
+            if cls._http_pool is None:
+                cls._http_pool = urllib3.PoolManager(
+                    num_pools=16,
+                    maxsize=8,
+                    cert_reqs=ssl.CERT_NONE,
+                    timeout=urllib3.Timeout(connect=10, read=30),
+                )
+        return cls._http_pool
+
     @classmethod
     def clear_folder(cls, path: Path | str) -> None:
         """
@@ -93,14 +127,142 @@ class FileUtils:
             return url
         raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
 
+    @staticmethod
+    def raise_for_status(status: int, url: str) -> None:
+        """
+        Translate an HTTP error status into the matching Python exception.
+
+        Args:
+            status: HTTP status code.
+            url: The requested URL, used in error messages.
+
+        Raises:
+            FileNotFoundError: For 404.
+            PermissionError: For 403 and 406.
+            IOError: For any other error status.
+        """
+        if status == 404:
+            raise FileNotFoundError("File not found (404).")
+        elif status in (403, 406):
+            raise PermissionError("Access to the file is forbidden.")
+        elif status >= 400:
+            raise IOError(f"Failed to download {url}: HTTP {status}")
+
+    @classmethod
+    def download_file(
+            cls,
+            url: str,
+            dest_path: Union[str, Path],
+            chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+            max_retries: int = DOWNLOAD_MAX_RETRIES,
+            progress_callback: Optional[ProgressCallback] = None,
+            show_progress: bool = False,
+    ) -> Path:
+        """
+        Stream a URL to disk in fixed-size chunks over pooled connections.
+
+        If `dest_path` already holds a partial download, or the connection drops midway,
+        the transfer resumes from the current size with a Range request. Servers that
+        ignore Range restart the download from scratch.
+
+        Args:
+            url: HTTP(S) URL to download.
+            dest_path: Destination file.
+            chunk_size: Number of bytes copied per write.
+            max_retries: Number of resume attempts after a dropped connection.
+            progress_callback: Called with (downloaded bytes, total bytes or None) after each chunk.
+            show_progress: Whether to display a progress bar.
+
+        Returns:
+            The destination path.
+
+        Raises:
+            FileNotFoundError, PermissionError, IOError: For HTTP errors.
+        """
+        cls.fetch_file(url, dest_path, chunk_size, max_retries, progress_callback, show_progress)
+        return Path(dest_path)
+
+    @classmethod
+    def fetch_file(
+            cls,
+            url: str,
+            dest_path: Union[str, Path],
+            chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+            max_retries: int = DOWNLOAD_MAX_RETRIES,
+            progress_callback: Optional[ProgressCallback] = None,
+            show_progress: bool = False,
+            headers: Optional[dict] = None,
+    ) -> Optional[HTTPHeaderDict]:
+        """
+        Download a URL like `download_file`, optionally as a conditional request.
+
+        Args:
+            headers: Extra headers of the initial request, e.g. If-None-Match.
+            (see `download_file` for the other arguments)
+
+        Returns:
+            The headers of the response, or None if the server answered 304 Not Modified, in
+            which case nothing is written.
+
+        Raises:
+            FileNotFoundError, PermissionError, IOError: For HTTP errors.
+        """
+        dest_path = Path(dest_path)
+        pool = cls.get_http_pool()
+        offset = dest_path.stat().st_size if dest_path.exists() else 0
+        response_headers = None
+
+        for attempt in range(max_retries + 1):
+            request_headers = {"Range": f"bytes={offset}-"} if offset else dict(headers or {})
+            response = pool.request("GET", url, headers=request_headers, preload_content=False, retries=3)
+            try:
+                if response.status == 304 and not offset and headers:
+                    return None
+                if response.status == 416 and offset:
+                    # the requested range starts at the end of the file: already complete
+                    break
+                cls.raise_for_status(response.status, url)
+                if response_headers is None:
+                    response_headers = response.headers
+
+                if response.status != 206:
+                    offset = 0
+                content_length = response.headers.get("Content-Length")
+                total = offset + int(content_length) if content_length else None
+
+                with open(dest_path, "ab" if offset else "wb") as f, tqdm(
+                        total=total,
+                        initial=offset,
+                        unit="B",
+                        unit_scale=True,
+                        desc=f"Downloading {cls.get_file_name_from_path(url)}",
+                        disable=not show_progress,
+                ) as pbar:
+                    for chunk in response.stream(chunk_size):
+                        f.write(chunk)
+                        offset += len(chunk)
+                        pbar.update(len(chunk))
+                        if progress_callback:
+                            progress_callback(offset, total)
+                break
+            except (ProtocolError, ReadTimeoutError) as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"Download of {url} interrupted at {offset} bytes ({e}), resuming...")
+            finally:
+                response.release_conn()
+
+        return response_headers if response_headers is not None else HTTPHeaderDict()
+
     @classmethod
     @contextmanager
-    def get_path_from_url(cls, url: str) -> Generator[str, None, None]:
+    def get_path_from_url(cls, url: str, use_cache: bool = True) -> Generator[str, None, None]:
         """
-        Download a file from a URL to a temporary file.
+        Download a file from a URL, through the persistent download cache by default.
 
         Args:
             url: URL to the file.
+            use_cache: Whether to use the download cache instead of a temporary file.
 
         Yields:
             Path to the downloaded file.
@@ -112,22 +274,20 @@ class FileUtils:
         if not validators.url(http_url):
             raise ValueError("Invalid URL")
 
-        try:
-            response = urllib.request.urlopen(http_url, timeout=30)
-            filename = cls.get_file_name_from_path(url)
-            stem, ext = Path(filename).stem, Path(filename).suffix
-
-            with cls.temporary_file(prefix=stem, suffix=ext) as temp_file:
-                with open(temp_file.name, "wb") as f:
-                    f.write(response.read())
-                yield temp_file.name
-
-        except HTTPError as e:
-            if e.code == 404:
-                raise FileNotFoundError("File not found (404).")
-            elif e.code in (403, 406):
-                raise PermissionError("Access to the file is forbidden.")
-            raise
+        if use_cache:
+            from .download_cache import DownloadCache
+
+            with DownloadCache().checkout(http_url) as path:
+                yield str(path)
+            return
+
+        filename = cls.get_file_name_from_path(url)
+        stem, ext = Path(filename).stem, Path(filename).suffix
+
+        with cls.temporary_file(prefix=stem, suffix=ext) as temp_file:
+            temp_file.close()
+            cls.download_file(http_url, temp_file.name)
+            yield temp_file.name
 
     @staticmethod
     @contextmanager
@@ -143,6 +303,19 @@ class FileUtils:
         """
         yield str(path)
 
+    @staticmethod
+    def is_remote_uri(path_or_uri: Path | str) -> bool:
+        """
+        Tell whether a path is a remote URI (http, https or gs) rather than a local path.
+
+        Args:
+            path_or_uri: Local path or remote URI.
+
+        Returns:
+            True for remote URIs.
+        """
+        return urlparse(str(path_or_uri)).scheme in ("http", "https", "gs")
+
     @classmethod
     def solve_file_path(cls, path_or_uri: Path | str) -> ContextManager[str]:
         """
@@ -155,7 +328,7 @@ class FileUtils:
             A context manager yielding the usable file path.
         """
         path_or_uri = str(path_or_uri)
-        return cls.get_path_from_url(path_or_uri) if validators.url(path_or_uri) else cls.get_path_from_local(
+        return cls.get_path_from_url(path_or_uri) if cls.is_remote_uri(path_or_uri) else cls.get_path_from_local(
             path_or_uri)
 
     @staticmethod
@@ -186,6 +359,25 @@ class FileUtils:
         """
         return os.path.getsize(file_path)
 
+    @staticmethod
+    def get_file_digest(file_path: Path | str, algorithm: str = "sha256", chunk_size: int = 1024 * 1024) -> str:
+        """
+        Compute the hex digest of a file's content without loading it fully into memory.
+
+        Args:
+            file_path: Path to file.
+            algorithm: Any algorithm name supported by `hashlib`.
+            chunk_size: Number of bytes read per iteration.
+
+        Returns:
+            The hex digest of the file content.
+        """
+        digest = hashlib.new(algorithm)
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     @staticmethod
     def humanize_file_size(size_in_bytes: float) -> str:
         """
@@ -1,3 +1,5 @@
+from typing import Callable, Optional
+
 import git
 from alive_progress import alive_bar
 
@@ -5,6 +7,8 @@ from alive_progress import alive_bar
 class GitRemoteProgress(git.RemoteProgress):
     """
     A custom Git progress reporter that uses alive_progress for terminal visualization.
+
+    An optional callback also receives the current operation name and its completed fraction.
     """
 
     OP_CODES = [
@@ -22,8 +26,9 @@ class GitRemoteProgress(git.RemoteProgress):
         getattr(git.RemoteProgress, code): code for code in OP_CODES
     }
 
-    def __init__(self) -> None:
+    def __init__(self, callback: Optional[Callable[[str, float], None]] = None) -> None:
         super().__init__()
+        self.callback = callback
         self.alive_bar_instance = None
         self.bar = None
         self.curr_op = ""
@@ -66,6 +71,9 @@ class GitRemoteProgress(git.RemoteProgress):
             self.bar(cur_count / max_count)
             self.bar.text(message)
 
+        if self.callback and max_count and max_count > 0:
+            self.callback(self.curr_op, cur_count / max_count)
+
         if op_code & self.END:
             self._stop_bar()
 
@@ -2,14 +2,18 @@ import inspect
 import os
 import re
 import typing
+import weakref
 from datetime import datetime, timezone
 from pathlib import Path
 
 from PIL.Image import Image
-from google.genai.types import File, FunctionDeclaration
+from google.genai.types import File, FunctionDeclaration, Part
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field, create_model
 
+# Function declarations of tools, dropped with their function
+_tool_declarations: "weakref.WeakKeyDictionary[typing.Callable, FunctionDeclaration]" = weakref.WeakKeyDictionary()
+
 
 class LibUtils:
     """
@@ -139,8 +143,15 @@ class LibUtils:
             func: The target function.
 
         Returns:
-            A FunctionDeclaration object.
+            A FunctionDeclaration object, built once per function.
         """
+        declaration = _tool_declarations.get(func)
+        if declaration is None:
+            declaration = _tool_declarations[func] = cls._build_function_declaration(func)
+        return declaration
+
+    @classmethod
+    def _build_function_declaration(cls, func: typing.Callable) -> FunctionDeclaration:
         schema = cls.func_to_pydantic(func).schema()
         properties = schema.get("properties", {})
 
@@ -165,7 +176,7 @@ class LibUtils:
         Normalize prompt inputs into a consistent list format.
 
         Args:
-            prompt: Can be a string, Document, File, Image, or a custom MultimodalPart.
+            prompt: Can be a string, Document, File, Part, Image, or a custom MultimodalPart.
 
         Returns:
             A list of normalized prompt components.
@@ -187,7 +198,7 @@ class LibUtils:
                 normalized.extend(LibUtils.normalize_prompt(part.content_parts()))
             elif isinstance(part, Document):
                 normalized.append(part.page_content)
-            elif isinstance(part, (File, Image)):
+            elif isinstance(part, (File, Part, Image)):
                 normalized.append(part)
             else:
                 raise ValueError(f"Unsupported prompt part: {part}")
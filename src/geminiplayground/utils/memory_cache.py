@@ -0,0 +1,226 @@
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Hashable, Iterator, Optional
+
+
+class MemoryCache:
+    """
+    A bounded, thread-safe, in-process LRU cache with per-entry TTL and tags.
+
+    It mirrors the subset of the `diskcache.Cache` API used in this package, so it can sit
+    in front of a disk cache or stand in for one.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries before the least recently used one is dropped.
+            default_ttl: TTL in seconds applied to entries set without `expire`. None means no TTL.
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float], Optional[str]]] = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Hashable):
+        _, _, tag = self._data.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _lookup(self, key: Hashable):
+        """
+        Return the live entry for a key, dropping it if expired. Must be called with the lock held.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expire_at = entry[1]
+        if expire_at is not None and expire_at <= time.time():
+            self._drop(key)
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None, expire_time: bool = False, tag: bool = False) -> Any:
+        """
+        Retrieve a value, following the `diskcache.Cache.get` return conventions.
+
+        Args:
+            key: Cache key.
+            default: Value returned on a miss.
+            expire_time: Also return the expiry timestamp (or None).
+            tag: Also return the tag (or None).
+
+        Returns:
+            The value, or a tuple with the expiry and/or tag when requested.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                value, expire_at, entry_tag = default, None, None
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                value, expire_at, entry_tag = entry
+
+        if expire_time and tag:
+            return value, expire_at, entry_tag
+        if expire_time:
+            return value, expire_at
+        if tag:
+            return value, entry_tag
+        return value
+
+    def set(self, key: Hashable, value: Any, expire: Optional[float] = None, tag: Optional[str] = None) -> bool:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            expire: TTL in seconds, defaults to `default_ttl`.
+            tag: Optional tag used for bulk eviction.
+
+        Returns:
+            True.
+        """
+        ttl = self.default_ttl if expire is None else expire
+        expire_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, expire_at, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_size:
+                self._drop(next(iter(self._data)))
+        return True
+
+    def add(
+            self, key: Hashable, value: Any, expire: Optional[float] = None, tag: Optional[str] = None, retry: bool = False
+    ) -> bool:
+        """
+        Store a value only if the key is missing.
+
+        Returns:
+            True if the value was stored.
+        """
+        with self._lock:
+            if self._lookup(key) is not None:
+                return False
+            return self.set(key, value, expire=expire, tag=tag)
+
+    def touch(self, key: Hashable, expire: Optional[float] = None) -> bool:
+        """
+        Update the TTL of an entry.
+
+        Returns:
+            True if the key was found.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return False
+            self._data[key] = (entry[0], None if expire is None else time.time() + expire, entry[2])
+            return True
+
+    def delete(self, key: Hashable, retry: bool = False) -> bool:
+        """
+        Remove a key.
+
+        Returns:
+            True if the key was found.
+        """
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._drop(key)
+            return True
+
+    def evict(self, tag: str) -> int:
+        """
+        Remove every entry with the given tag.
+
+        Returns:
+            The number of removed entries.
+        """
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> int:
+        """
+        Remove every entry.
+
+        Returns:
+            The number of removed entries.
+        """
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self._tags.clear()
+            return count
+
+    def create_tag_index(self):
+        """
+        No-op: tags are always indexed in memory.
+        """
+
+    def iterkeys(self) -> Iterator[Hashable]:
+        """
+        Iterate over a snapshot of the keys, from least to most recently used.
+        """
+        with self._lock:
+            keys = list(self._data)
+        return iter(keys)
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "max_size": self.max_size,
+            }
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return self.iterkeys()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                raise KeyError(key)
+            return entry[0]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
+    def __delitem__(self, key: Hashable):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
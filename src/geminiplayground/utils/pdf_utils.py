@@ -1,9 +1,99 @@
+import functools
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Optional, Union
+
 from PIL import Image as PILImage
 from PIL.Image import Image as PILImageType
 import fitz  # PyMuPDF
 
+from .file_utils import FileUtils
+from .lib_utils import LibUtils
+
+PageRange = Union[str, Iterable[int], None]
+
+# Below this number of uncached pages, spawning worker processes costs more than it saves.
+MIN_PAGES_PER_WORKER = 8
+
+
+def _page_text_path(cache_dir: Path, page_index: int) -> Path:
+    return cache_dir / f"page_{page_index:05d}.txt"
+
+
+def _page_image_path(cache_dir: Path, page_index: int, zoom: float) -> Path:
+    return cache_dir / f"page_{page_index:05d}_z{zoom:g}.png"
+
+
+def _page_stats_path(cache_dir: Path, page_index: int) -> Path:
+    return cache_dir / f"page_{page_index:05d}.json"
+
+
+def _write_atomic(path: Path, content: str):
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+@functools.lru_cache(maxsize=128)
+def _document_hash(pdf_path: str, mtime_ns: int, size: int) -> str:
+    return FileUtils.get_file_digest(pdf_path)
+
+
+def _extract_text_worker(pdf_path: str, page_indices: list[int], cache_dir: str) -> dict[int, str]:
+    """
+    Extract and cache the text of a batch of pages. Runs inside a worker process.
+    """
+    texts = {}
+    with fitz.open(pdf_path) as document:
+        for page_index in page_indices:
+            text = document[page_index].get_text("text")
+            _write_atomic(_page_text_path(Path(cache_dir), page_index), text)
+            texts[page_index] = text
+    return texts
+
+
+def _analyze_worker(pdf_path: str, page_indices: list[int], cache_dir: str) -> dict[int, dict]:
+    """
+    Measure text density and image coverage of a batch of pages, caching the page text on the way.
+    Runs inside a worker process.
+    """
+    stats = {}
+    with fitz.open(pdf_path) as document:
+        for page_index in page_indices:
+            page = document[page_index]
+            text = page.get_text("text")
+            page_area = abs(page.rect) or 1.0
+            image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+            page_stats = {
+                "text_chars": len("".join(text.split())),
+                "image_coverage": min(image_area / page_area, 1.0),
+            }
+            _write_atomic(_page_text_path(Path(cache_dir), page_index), text)
+            _write_atomic(_page_stats_path(Path(cache_dir), page_index), json.dumps(page_stats))
+            stats[page_index] = page_stats
+    return stats
+
+
+def _render_worker(pdf_path: str, page_indices: list[int], zoom: float, cache_dir: str) -> dict[int, str]:
+    """
+    Render and cache a batch of pages as PNG images. Runs inside a worker process.
+    """
+    images = {}
+    matrix = fitz.Matrix(zoom, zoom)
+    with fitz.open(pdf_path) as document:
+        for page_index in page_indices:
+            pix = document[page_index].get_pixmap(matrix=matrix)
+            image_path = _page_image_path(Path(cache_dir), page_index, zoom)
+            tmp_path = image_path.with_suffix(f".{os.getpid()}.tmp")
+            pix.save(str(tmp_path), output="png")
+            os.replace(tmp_path, image_path)
+            images[page_index] = str(image_path)
+    return images
+
 
 class PDFUtils:
     """
@@ -51,6 +141,226 @@ class PDFUtils:
         except Exception as e:
             raise RuntimeError(f"Failed to create PDF thumbnail: {e}") from e
 
+    @staticmethod
+    def get_page_count(pdf_path: Union[str, Path]) -> int:
+        """
+        Get the number of pages in a PDF.
+
+        Args:
+            pdf_path: Path to the PDF file.
+
+        Returns:
+            The page count.
+        """
+        with fitz.open(pdf_path) as document:
+            return len(document)
+
+    @staticmethod
+    def get_pages_cache_dir(pdf_path: Union[str, Path]) -> Path:
+        """
+        Get the page cache folder of a PDF, keyed by the hash of its content.
+
+        The hash is memoized per path, modification time and size, so repeated calls don't re-read the file.
+
+        Args:
+            pdf_path: Path to the PDF file.
+
+        Returns:
+            Path to the (existing) cache folder.
+        """
+        stat = os.stat(pdf_path)
+        document_hash = _document_hash(str(Path(pdf_path).resolve()), stat.st_mtime_ns, stat.st_size)
+        cache_dir = LibUtils.get_lib_home().joinpath("pdf_pages", document_hash)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir
+
+    @staticmethod
+    def parse_page_range(pages: PageRange, page_count: int) -> list[int]:
+        """
+        Normalize a page selection into a sorted list of 0-based page indices.
+
+        Args:
+            pages: None for all pages, an iterable of 0-based indices, or a
+                1-based string such as "1-3,7" as used in print dialogs.
+            page_count: Number of pages in the document.
+
+        Returns:
+            Sorted, de-duplicated 0-based page indices.
+
+        Raises:
+            ValueError: If a page is out of range or the string is malformed.
+        """
+        if pages is None:
+            return list(range(page_count))
+
+        if isinstance(pages, str):
+            indices = set()
+            for chunk in filter(None, (c.strip() for c in pages.split(","))):
+                start, _, end = chunk.partition("-")
+                try:
+                    start, end = int(start), int(end or start)
+                except ValueError:
+                    raise ValueError(f"Invalid page range: '{chunk}'")
+                indices.update(range(start - 1, end))
+        else:
+            indices = set(pages)
+
+        out_of_range = [i for i in indices if not 0 <= i < page_count]
+        if out_of_range:
+            raise ValueError(f"Pages out of range (document has {page_count} pages): {sorted(out_of_range)}")
+        return sorted(indices)
+
+    @staticmethod
+    def _run_in_workers(worker, pdf_path: Path, page_indices: list[int], *args, max_workers: Optional[int] = None):
+        """
+        Split pages into contiguous batches and run them across processes.
+
+        Small batches run in-process to avoid the cost of spawning workers.
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        n_workers = min(max_workers, math.ceil(len(page_indices) / MIN_PAGES_PER_WORKER))
+        if n_workers <= 1:
+            return worker(str(pdf_path), page_indices, *args)
+
+        batch_size = math.ceil(len(page_indices) / n_workers)
+        batches = [page_indices[i:i + batch_size] for i in range(0, len(page_indices), batch_size)]
+        results = {}
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(worker, str(pdf_path), batch, *args) for batch in batches]
+            for future in futures:
+                results.update(future.result())
+        return results
+
+    @classmethod
+    def extract_pages_text(
+            cls,
+            pdf_path: Union[str, Path],
+            pages: PageRange = None,
+            max_workers: Optional[int] = None,
+    ) -> dict[int, str]:
+        """
+        Extract the text of PDF pages, in parallel and cached per page.
+
+        Args:
+            pdf_path: Path to the PDF file.
+            pages: Page selection, see `parse_page_range`.
+            max_workers: Maximum number of worker processes.
+
+        Returns:
+            A mapping of 0-based page index to page text, in page order.
+        """
+        pdf_path = Path(pdf_path)
+        cache_dir = cls.get_pages_cache_dir(pdf_path)
+        page_indices = cls.parse_page_range(pages, cls.get_page_count(pdf_path))
+
+        texts = {}
+        missing = []
+        for page_index in page_indices:
+            text_path = _page_text_path(cache_dir, page_index)
+            if text_path.exists():
+                texts[page_index] = text_path.read_text(encoding="utf-8")
+            else:
+                missing.append(page_index)
+
+        if missing:
+            texts.update(
+                cls._run_in_workers(_extract_text_worker, pdf_path, missing, str(cache_dir), max_workers=max_workers)
+            )
+        return {page_index: texts[page_index] for page_index in page_indices}
+
+    @classmethod
+    def render_pages(
+            cls,
+            pdf_path: Union[str, Path],
+            pages: PageRange = None,
+            zoom: float = 2.0,
+            max_workers: Optional[int] = None,
+    ) -> dict[int, Path]:
+        """
+        Render PDF pages to PNG images, in parallel and cached per page.
+
+        Args:
+            pdf_path: Path to the PDF file.
+            pages: Page selection, see `parse_page_range`.
+            zoom: Zoom factor applied to the 72 dpi page size.
+            max_workers: Maximum number of worker processes.
+
+        Returns:
+            A mapping of 0-based page index to the rendered image path, in page order.
+        """
+        pdf_path = Path(pdf_path)
+        cache_dir = cls.get_pages_cache_dir(pdf_path)
+        page_indices = cls.parse_page_range(pages, cls.get_page_count(pdf_path))
+
+        images = {}
+        missing = []
+        for page_index in page_indices:
+            image_path = _page_image_path(cache_dir, page_index, zoom)
+            if image_path.exists():
+                images[page_index] = image_path
+            else:
+                missing.append(page_index)
+
+        if missing:
+            rendered = cls._run_in_workers(_render_worker, pdf_path, missing, zoom, str(cache_dir),
+                                           max_workers=max_workers)
+            images.update({page_index: Path(path) for page_index, path in rendered.items()})
+        return {page_index: images[page_index] for page_index in page_indices}
+
+    @classmethod
+    def analyze_pages(
+            cls,
+            pdf_path: Union[str, Path],
+            pages: PageRange = None,
+            max_workers: Optional[int] = None,
+    ) -> dict[int, dict]:
+        """
+        Measure the text density of PDF pages, in parallel and cached per page.
+
+        Args:
+            pdf_path: Path to the PDF file.
+            pages: Page selection, see `parse_page_range`.
+            max_workers: Maximum number of worker processes.
+
+        Returns:
+            A mapping of 0-based page index to a dict with the number of non-whitespace
+            characters (`text_chars`) and the fraction of the page covered by images
+            (`image_coverage`), in page order.
+        """
+        pdf_path = Path(pdf_path)
+        cache_dir = cls.get_pages_cache_dir(pdf_path)
+        page_indices = cls.parse_page_range(pages, cls.get_page_count(pdf_path))
+
+        stats = {}
+        missing = []
+        for page_index in page_indices:
+            stats_path = _page_stats_path(cache_dir, page_index)
+            if stats_path.exists():
+                stats[page_index] = json.loads(stats_path.read_text(encoding="utf-8"))
+            else:
+                missing.append(page_index)
+
+        if missing:
+            stats.update(
+                cls._run_in_workers(_analyze_worker, pdf_path, missing, str(cache_dir), max_workers=max_workers)
+            )
+        return {page_index: stats[page_index] for page_index in page_indices}
+
+    @staticmethod
+    def is_low_text_page(page_stats: dict, min_text_chars: int = 200, max_image_coverage: float = 0.5) -> bool:
+        """
+        Tell whether a page needs to be seen rather than read, e.g. a scan or a figure.
+
+        Args:
+            page_stats: Page statistics as returned by `analyze_pages`.
+            min_text_chars: Pages with fewer characters are considered low-text.
+            max_image_coverage: Pages with more image coverage are considered figure-heavy.
+
+        Returns:
+            True if the page should be sent as an image.
+        """
+        return page_stats["text_chars"] < min_text_chars or page_stats["image_coverage"] > max_image_coverage
+
 
 if __name__ == '__main__':
     pdf_path = "./../../../data/vis-language-model.pdf"
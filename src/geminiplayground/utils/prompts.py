@@ -4,3 +4,11 @@ SUMMARIZATION_SYSTEM_INSTRUCTION = """
  make sure you detailed describe the content of the file and expand on the details. \
 Only describe what you see, hear or read in the file. 
  """
+
+HISTORY_SUMMARIZATION_SYSTEM_INSTRUCTION = """
+ you are an assistant tasked with condensing the beginning of a conversation between a user and \
+ an AI model, so the conversation can continue without it. Write a concise summary that keeps \
+ every fact, decision, constraint, open question, name, number and code identifier the rest of \
+ the conversation may rely on. Refer to attached files by their [file ...] labels. \
+Do not add anything that was not said.
+ """
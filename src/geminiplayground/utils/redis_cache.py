@@ -0,0 +1,154 @@
+import pickle
+import time
+from typing import Any, Hashable, Iterator, Optional
+
+
+class RedisCache:
+    """
+    A Redis-backed cache mirroring the subset of the `diskcache.Cache` API used in this package.
+
+    Lets several nodes share cache entries through any Redis-compatible server. Requires the
+    optional `redis` package (`pip install geminiplayground[redis]`).
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "geminiplayground:"):
+        """
+        Initialize the cache.
+
+        Args:
+            url: Redis connection URL.
+            prefix: Prefix of every key written by this cache.
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis cache backend requires the 'redis' package: pip install geminiplayground[redis]"
+            ) from e
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix.encode()
+
+    def _key(self, key: Hashable) -> bytes:
+        return self._prefix + b"k:" + pickle.dumps(key, protocol=4)
+
+    def _tag_key(self, tag: str) -> bytes:
+        return self._prefix + b"t:" + tag.encode()
+
+    def _scan(self) -> Iterator[bytes]:
+        return self._client.scan_iter(match=self._prefix + b"k:*", count=1000)
+
+    def get(self, key: Hashable, default: Any = None, expire_time: bool = False, tag: bool = False) -> Any:
+        """
+        Retrieve a value, following the `diskcache.Cache.get` return conventions.
+        """
+        redis_key = self._key(key)
+        with self._client.pipeline() as pipe:
+            raw, ttl_ms = pipe.get(redis_key).pttl(redis_key).execute()
+
+        if raw is None:
+            value, expire_at, entry_tag = default, None, None
+        else:
+            value, entry_tag = pickle.loads(raw)
+            expire_at = time.time() + ttl_ms / 1000 if ttl_ms >= 0 else None
+
+        if expire_time and tag:
+            return value, expire_at, entry_tag
+        if expire_time:
+            return value, expire_at
+        if tag:
+            return value, entry_tag
+        return value
+
+    def _write(self, key: Hashable, value: Any, expire: Optional[float], tag: Optional[str], nx: bool) -> bool:
+        redis_key = self._key(key)
+        px = max(int(expire * 1000), 1) if expire is not None else None
+        stored = self._client.set(redis_key, pickle.dumps((value, tag), protocol=4), px=px, nx=nx)
+        if stored and tag is not None:
+            self._client.sadd(self._tag_key(tag), redis_key)
+        return bool(stored)
+
+    def set(self, key: Hashable, value: Any, expire: Optional[float] = None, tag: Optional[str] = None) -> bool:
+        """
+        Store a value, with an optional TTL in seconds and tag.
+        """
+        return self._write(key, value, expire, tag, nx=False)
+
+    def add(
+            self, key: Hashable, value: Any, expire: Optional[float] = None, tag: Optional[str] = None, retry: bool = False
+    ) -> bool:
+        """
+        Store a value only if the key is missing (atomic).
+        """
+        return self._write(key, value, expire, tag, nx=True)
+
+    def touch(self, key: Hashable, expire: Optional[float] = None) -> bool:
+        """
+        Update the TTL of an entry.
+        """
+        redis_key = self._key(key)
+        if expire is None:
+            return bool(self._client.persist(redis_key)) or bool(self._client.exists(redis_key))
+        return bool(self._client.pexpire(redis_key, max(int(expire * 1000), 1)))
+
+    def delete(self, key: Hashable, retry: bool = False) -> bool:
+        """
+        Remove a key.
+        """
+        return bool(self._client.delete(self._key(key)))
+
+    def evict(self, tag: str) -> int:
+        """
+        Remove every entry with the given tag.
+        """
+        tag_key = self._tag_key(tag)
+        redis_keys = self._client.smembers(tag_key)
+        removed = self._client.delete(*redis_keys) if redis_keys else 0
+        self._client.delete(tag_key)
+        return removed
+
+    def clear(self) -> int:
+        """
+        Remove every entry written by this cache.
+        """
+        removed = 0
+        for pattern in (b"k:*", b"t:*"):
+            redis_keys = list(self._client.scan_iter(match=self._prefix + pattern, count=1000))
+            if redis_keys:
+                removed += self._client.delete(*redis_keys)
+        return removed
+
+    def create_tag_index(self):
+        """
+        No-op: tags are always indexed with Redis sets.
+        """
+
+    def iterkeys(self) -> Iterator[Hashable]:
+        """
+        Iterate over the keys.
+        """
+        offset = len(self._prefix) + 2
+        for redis_key in self._scan():
+            yield pickle.loads(redis_key[offset:])
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return self.iterkeys()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return bool(self._client.exists(self._key(key)))
+
+    def __getitem__(self, key: Hashable) -> Any:
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            raise KeyError(key)
+        return pickle.loads(raw)[0]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
+    def __delitem__(self, key: Hashable):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._scan())
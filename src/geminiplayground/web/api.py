@@ -1,8 +1,9 @@
+import asyncio
 import logging
 import os
 import shutil
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 
 import validators
 from fastapi import (
@@ -11,14 +12,12 @@ from fastapi import (
     Request,
     BackgroundTasks,
     HTTPException,
-    UploadFile,
-    File,
 )
 from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from google.genai.types import Model
-from sqlalchemy import select, delete
+from fastapi.responses import JSONResponse, StreamingResponse
+from google.genai.types import Model, File as GeminiFile
+from sqlalchemy import select, delete, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from geminiplayground.core import GeminiClient
@@ -27,12 +26,22 @@ from geminiplayground.parts import (
     GitRepo,
     MultimodalPartFactory,
 )
-from geminiplayground.parts import MultiModalPartFile
-from geminiplayground.utils import (
-    GitUtils, VideoUtils, ImageUtils, PDFUtils, LibUtils, FileUtils
+from geminiplayground.parts import MultiModalPartFile, RefreshScheduler
+from geminiplayground.utils import GitUtils, LibUtils, FileUtils
+from .db.models import MultimodalPartEntry as MultimodalPartDBModel, EntryStatus, JobStatus
+from .db.session_manager import get_db_session, sessionmanager
+from .events import event_bus, publish_part_event, EVENTS_HEARTBEAT_INTERVAL
+from .jobs import job_queue, JobContext
+from .listings import (
+    ListingCache,
+    InvalidListingQueryError,
+    check_limit,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
 )
-from .db.models import MultimodalPartEntry as MultimodalPartDBModel, EntryStatus
-from .db.session_manager import get_db_session
+from .thumbnails import thumbnail_service
+from .uploads import receive_upload, UnsupportedUploadError, UploadTooLargeError
 
 logger = logging.getLogger("rich")
 
@@ -47,11 +56,23 @@ api.add_middleware(
 
 gemini_client = GeminiClient()
 
-THUMBNAIL_SIZE = (64, 64)
 PLAYGROUND_HOME_DIR = LibUtils.get_lib_home()
+# Shown for files whose thumbnail couldn't be created, or isn't created yet
+DEFAULT_THUMBNAIL = "thumbnail_default.png"
 
 DBSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
 
+UPLOAD_CONTENT_TYPES = {
+    "image/png": "image",
+    "image/jpeg": "image",
+    "image/jpg": "image",
+    "video/mp4": "video",
+    "audio/mpeg": "audio",
+    "audio/mp3": "audio",
+    "application/pdf": "pdf",
+}
+EAGER_UPLOAD = os.environ.get("GEMINI_PLAYGROUND_EAGER_UPLOAD", "false").lower() in ("1", "true", "yes")
+
 
 @api.get("/")
 async def hello_handler() -> dict:
@@ -75,222 +96,359 @@ async def get_models_handler() -> list[Model]:
     return models
 
 
+PART_FIELDS = [column.name for column in MultimodalPartDBModel.__table__.columns]
+TAG_FIELDS = ["value", "name", "description", "icon", "type"]
+parts_listing_cache = ListingCache(MultimodalPartDBModel.__tablename__, name="parts")
+tags_listing_cache = ListingCache(MultimodalPartDBModel.__tablename__, name="tags")
+
+
+async def select_parts_page(
+        db_session: AsyncSession,
+        columns: list,
+        after: Optional[int],
+        limit: Optional[int],
+        *where,
+):
+    """
+    Select a page of parts in insertion order, as plain rows
+    :return: The rows and the cursor of the next page, if any
+    """
+    # plain rows skip the ORM identity map, which dominates the cost of large listings
+    rowid = literal_column("part.rowid")
+    query = select(rowid.label("_rowid"), *columns).where(*where).order_by(rowid)
+    if after is not None:
+        query = query.where(rowid > after)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    result = await db_session.execute(query)
+    rows = list(result.mappings())
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(str(rows[-1]["_rowid"]))
+    return rows, next_cursor
+
+
 @api.get("/parts")
 async def get_parts_handler(
-        request: Request, db_session: DBSessionDep, background_tasks: BackgroundTasks
+        request: Request,
+        db_session: DBSessionDep,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[str] = None,
 ):
     """
-    Get tags
+    Get parts
+    :param cursor: The X-Next-Cursor header of the previous page
+    :param limit: The page size, all parts by default
+    :param fields: Comma-separated fields to return
     :return:
     """
-    query = select(MultimodalPartDBModel)
-    result = await db_session.execute(query)
-    rows = result.scalars().all()
-    return rows
+    try:
+        check_limit(limit)
+        selected = parse_fields(fields, PART_FIELDS)
+        after = int(decode_cursor(cursor)) if cursor is not None else None
+    except (InvalidListingQueryError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    async def render():
+        columns = [MultimodalPartDBModel.__table__.columns[field] for field in selected]
+        rows, next_cursor = await select_parts_page(db_session, columns, after, limit)
+        items = [
+            {field: getattr(row[field], "value", row[field]) for field in selected}
+            for row in rows
+        ]
+        return items, next_cursor
+
+    return await parts_listing_cache.respond(
+        request, db_session, (after, limit, tuple(selected)), render
+    )
+
+
+@api.get("/events")
+async def get_events_handler(request: Request):
+    """
+    Stream part events (creation, status transitions, progress, deletion) as server-sent events
+    :return:
+    """
+
+    async def event_stream():
+        with event_bus.subscribe() as queue:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    # keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.get("/cacheStats")
+async def get_cache_stats_handler() -> dict:
+    """
+    Get the in-memory cache statistics of the uploaded files
+    :return:
+    """
+    memory_cache = MultiModalPartFile._memory_cache
+    return memory_cache.stats() if memory_cache is not None else {}
 
 
 @api.delete("/deleteAllFiles")
 async def delete_all_files_handler(request: Request, db_session: DBSessionDep):
     """
-    Delete all files
+    Delete all files, along with their uploads to Gemini
     :return:
     """
+    result = await db_session.execute(select(MultimodalPartDBModel))
+    entries = result.scalars().all()
+    parts = [
+        MultiModalPartFile(PLAYGROUND_HOME_DIR.joinpath(entry.name), gemini_client)
+        for entry in entries
+        if entry.content_type != "repo"
+    ]
+    uploaded_files = [f for f in (part.get_cache(part.local_path) for part in parts) if f is not None]
+    results = []
+    if uploaded_files:
+        results = await run_in_threadpool(gemini_client.delete_files, *uploaded_files, show_progress=False)
+    for part in parts:
+        RefreshScheduler().untrack(part)
+        part.clear_cache()
+
     query = delete(MultimodalPartDBModel)
     await db_session.execute(query)
     await db_session.commit()
-    thumbnail_files = Path(os.environ["FILES_DIR"]).glob("thumbnail_*.jpg")
-    for thumbnail_file in thumbnail_files:
-        thumbnail_file.unlink()
-    return JSONResponse(content={"content": "All files deleted"})
+    thumbnail_service.clear()
+    for entry in entries:
+        await publish_part_event(entry.name, "deleted")
+    return JSONResponse(
+        content={
+            "content": "All files deleted",
+            "results": [r.model_dump() for r in results],
+        }
+    )
 
 
-async def upload_file_task(file_path: Path, content_type: str):
+async def get_part_entry(session: AsyncSession, part_name: str):
     """
-    Upload a file asynchronously with optimized session handling and thumbnail generation.
+    Get the database entry of a part
     """
-    try:
-        async for session in get_db_session():
-            await upload_file(session, file_path, content_type)
-    except Exception as e:
-        logger.error(f"Failed to process file {file_path}: {str(e)}")
+    query = select(MultimodalPartDBModel).filter(MultimodalPartDBModel.name == part_name)
+    result = await session.execute(query)
+    return result.scalars().first()
+
+
+async def set_part_ready(part_name: str):
+    """
+    Mark a part as ready and publish the transition
+    """
+    async with sessionmanager.session() as session:
+        part = await get_part_entry(session, part_name)
+        if part is None:
+            return
+        part.status = EntryStatus.READY
+        part.status_message = None
+        await session.commit()
+    await publish_part_event(part_name, "status", status=EntryStatus.READY, progress=100)
+
+
+async def thumbnail_failed(payload: dict, context: JobContext, error: BaseException):
+    """
+    Fall back to the default thumbnail: a part is usable without its thumbnail
+    """
+    async with sessionmanager.session() as session:
+        part = await get_part_entry(session, context.part_name)
+        if part is not None and not part.thumbnail:
+            part.thumbnail = DEFAULT_THUMBNAIL
+            await session.commit()
+            await publish_part_event(context.part_name, "thumbnail", thumbnail=part.thumbnail)
 
 
-async def upload_file(session: AsyncSession, file_path: Path, content_type: str):
+@job_queue.register("thumbnail", on_failure=thumbnail_failed)
+async def thumbnail_job(payload: dict, context: JobContext):
     """
-    Upload a file handler
-    @param session: The database session
-    @param file_path: The file path
-    @param content_type: The content type
-    @return:
+    Create the thumbnail of a file part
     """
-    files_dir = Path(os.environ["FILES_DIR"])
-    file_name = file_path.name
-    query = select(MultimodalPartDBModel).filter(
-        MultimodalPartDBModel.name == file_name
+    thumbnail_name = await thumbnail_service.create(
+        payload["file_path"], payload["content_type"], digest=payload.get("digest")
     )
-    result = await session.execute(query)
-    part = result.scalars().first()
-    if part is None:
-        logger.error("No database entry found for the file.")
-        return
+    async with sessionmanager.session() as session:
+        part = await get_part_entry(session, context.part_name)
+        if part is not None:
+            part.thumbnail = f"thumbnails/{thumbnail_name}"
+            await session.commit()
+            await publish_part_event(context.part_name, "thumbnail", thumbnail=part.thumbnail)
 
-    try:
-        thumbnail_func = {
-            "image": ImageUtils.create_image_thumbnail,
-            "video": VideoUtils.create_video_thumbnail,
-            "pdf": PDFUtils.create_pdf_thumbnail,
-        }.get(content_type, None)
-
-        if thumbnail_func:
-            thumbnail_img = thumbnail_func(file_path, THUMBNAIL_SIZE)
-            thumbnail_path = files_dir / f"thumbnail_{file_path.stem}.jpg"
-            thumbnail_img.save(thumbnail_path)
-        elif content_type == "audio":
-            thumbnail_path = files_dir / "thumbnail_audio.png"
+
+@job_queue.register("upload_file")
+async def upload_file_job(payload: dict, context: JobContext):
+    """
+    Upload a file part to Gemini
+    """
+    file_path = Path(payload["file_path"])
+    async with sessionmanager.session() as session:
+        if await get_part_entry(session, context.part_name) is None:
+            logger.error("No database entry found for the file.")
+            return
+
+    await context.progress("Uploading to Gemini")
+    multimodal_part = MultimodalPartFactory.from_path(file_path)
+    if isinstance(multimodal_part, MultiModalPartFile):
+        multimodal_part.clear_cache()
+        remote_file = payload.get("remote_file")
+        if remote_file is not None and context.attempt == 1:
+            await run_in_threadpool(multimodal_part.adopt_upload, GeminiFile.model_validate(remote_file))
         else:
-            raise Exception(f"Unknown content type: {content_type}")
+            progress_callback = context.progress_callback("Uploading to Gemini")
+            await run_in_threadpool(multimodal_part.upload, progress_callback)
 
-        multimodal_part = MultimodalPartFactory.from_path(file_path)
-        if isinstance(multimodal_part, MultiModalPartFile):
-            multimodal_part.clear_cache()
-            await run_in_threadpool(multimodal_part.upload)
-
-        logger.info(f"Uploaded file {file_path}")
-        part.status = EntryStatus.READY
-        part.thumbnail = thumbnail_path.name
-        part.status_message = None
-    except Exception as e:
-        logger.error(f"Error processing file {file_path}: {str(e)}")
-        part.status = EntryStatus.ERROR
-        error_message = getattr(e, "reason", getattr(e, "message", str(e)))
-        part.status_message = error_message
-    finally:
-        await session.commit()
+    logger.info(f"Uploaded file {file_path}")
+    await set_part_ready(context.part_name)
 
 
 @api.post("/uploadFile")
 async def upload_file_handler(
         request: Request,
-        background_tasks: BackgroundTasks,
-        upload_file: UploadFile = File(alias="file"),
         db_session: AsyncSession = Depends(get_db_session),
+        eager: bool = EAGER_UPLOAD,
 ):
     """
-    Hello endpoint
+    Upload a file, streaming it to disk
+    :param eager: Also upload the file to Gemini while it is being received
     :return:
     """
     try:
-        mime_type = upload_file.content_type
-        supported_content_types = [
-            "image/png",
-            "image/jpeg",
-            "image/jpg",
-            "video/mp4",
-            "audio/mpeg",
-            "audio/mp3",
-            "application/pdf",
-        ]
+        received = await receive_upload(
+            request,
+            Path(PLAYGROUND_HOME_DIR),
+            set(UPLOAD_CONTENT_TYPES),
+            gemini_client=gemini_client if eager else None,
+        )
+    except UnsupportedUploadError as e:
+        return JSONResponse(content={"error": str(e)})
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-        logger.info(f"Content type: {mime_type}")
-        if mime_type not in supported_content_types:
-            return JSONResponse(
-                content={"error": f"Unsupported content type: {mime_type}"}
-            )
-        content_type = {
-            "image/png": "image",
-            "image/jpeg": "image",
-            "image/jpg": "image",
-            "video/mp4": "video",
-            "audio/mpeg": "audio",
-            "audio/mp3": "audio",
-            "application/pdf": "pdf",
-        }[mime_type]
-
-        file_name = upload_file.filename
-
-        file_path = Path(PLAYGROUND_HOME_DIR).joinpath(file_name)
-        with open(file_path, "wb") as file:
-            file_bytes = await upload_file.read()
-            file.write(file_bytes)
+    try:
+        logger.info(f"Content type: {received.content_type}, size: {received.size} bytes")
+        content_type = UPLOAD_CONTENT_TYPES[received.content_type]
+        file_name = received.path.name
 
         # save file to db
         new_part = MultimodalPartDBModel(name=file_name, content_type=content_type)
+        if content_type == "audio":
+            new_part.thumbnail = "thumbnail_audio.png"
         await db_session.merge(new_part)
         await db_session.commit()
-        background_tasks.add_task(upload_file_task, file_path, content_type)
+        await publish_part_event(
+            file_name, "created", status=EntryStatus.PENDING, thumbnail=new_part.thumbnail
+        )
+
+        file_payload = {"file_path": str(received.path), "content_type": content_type, "digest": received.sha256}
+        if content_type in ("image", "video", "pdf"):
+            await job_queue.enqueue(
+                "thumbnail",
+                file_payload,
+                dedup_key=f"thumbnail:{file_name}:{received.sha256}",
+                part_name=file_name,
+                priority=10,
+            )
+        remote_file = received.remote_file.model_dump(mode="json") if received.remote_file else None
+        await job_queue.enqueue(
+            "upload_file",
+            {**file_payload, "remote_file": remote_file},
+            dedup_key=f"upload:{file_name}:{received.sha256}",
+            part_name=file_name,
+        )
         return JSONResponse(content={"content": "File uploaded"})
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail=repr(e))
 
 
-async def clone_repo_task(repo_name: str, repo_path: str, repo_branch: str):
+@job_queue.register("clone_repo")
+async def clone_repo_job(payload: dict, context: JobContext):
     """
     Clone a repository
     """
-    async for session in get_db_session():
-        query = select(MultimodalPartDBModel).filter(
-            MultimodalPartDBModel.name == repo_name
+    repo_name, repo_path, repo_branch = context.part_name, payload["repo_path"], payload["repo_branch"]
+    await context.progress(f"Cloning {repo_path} ({repo_branch})")
+    progress_callback = context.progress_callback("Cloning")
+    try:
+        await run_in_threadpool(
+            GitRepo.from_url,
+            repo_path,
+            branch=repo_branch,
+            progress_callback=lambda op, fraction: progress_callback(fraction, 1, op),
         )
-        result = await session.execute(query)
-        part = result.scalars().first()
-        try:
-            await run_in_threadpool(GitRepo.from_url, repo_path, branch=repo_branch)
-            logger.info(
-                f"Cloned repository {repo_name} from {repo_path} branch {repo_branch}"
-            )
-            part.status = EntryStatus.READY
-        except GitRepoBranchNotFoundException as e:
-            part.status = EntryStatus.ERROR
-            part.status_message = str(e)
-            logger.error(
-                f"Error cloning repository {repo_name} from {repo_path} branch {repo_branch}: {e}"
-            )
-        except Exception as e:
+    except GitRepoBranchNotFoundException as e:
+        # retrying would not help
+        logger.error(
+            f"Error cloning repository {repo_name} from {repo_path} branch {repo_branch}: {e}"
+        )
+        async with sessionmanager.session() as session:
+            part = await get_part_entry(session, repo_name)
             part.status = EntryStatus.ERROR
             part.status_message = str(e)
-        finally:
             await session.commit()
+        await publish_part_event(repo_name, "status", status=EntryStatus.ERROR, message=str(e))
+        return
+    logger.info(
+        f"Cloned repository {repo_name} from {repo_path} branch {repo_branch}"
+    )
+    await set_part_ready(repo_name)
 
 
-async def copy_repo_task(repo_name: str, repo_path: str, repo_target_folder: str):
+@job_queue.register("copy_repo")
+async def copy_repo_job(payload: dict, context: JobContext):
     """
-    Clone a repository
+    Copy a local repository
     """
-    async for session in get_db_session():
-        query = select(MultimodalPartDBModel).filter(
-            MultimodalPartDBModel.name == repo_name
-        )
-        result = await session.execute(query)
-        part = result.scalars().first()
-        try:
-            if Path(repo_target_folder).exists():
-                shutil.rmtree(repo_target_folder)
-
-            await run_in_threadpool(shutil.copytree, repo_path, repo_target_folder)
-            logger.info(
-                f"Copied repository {repo_name} from {repo_path} to {repo_target_folder}"
-            )
-            part.status = EntryStatus.READY
-        except GitRepoBranchNotFoundException as e:
-            part.status = EntryStatus.ERROR
-            part.status_message = str(e)
-            logger.error(
-                f"Error copying repository {repo_name} from {repo_path} to {repo_target_folder}: {e}"
-            )
-        except Exception as e:
-            part.status = EntryStatus.ERROR
-            part.status_message = str(e)
-            logger.error(
-                f"Error copying repository {repo_name} from {repo_path} to {repo_target_folder}: {e}"
-            )
-        finally:
-            await session.commit()
+    repo_name, repo_path, repo_target_folder = context.part_name, payload["repo_path"], payload["target_folder"]
+    await context.progress(f"Copying {repo_path}")
+    if Path(repo_target_folder).exists():
+        await run_in_threadpool(shutil.rmtree, repo_target_folder)
+
+    await run_in_threadpool(shutil.copytree, repo_path, repo_target_folder)
+    logger.info(
+        f"Copied repository {repo_name} from {repo_path} to {repo_target_folder}"
+    )
+    await set_part_ready(repo_name)
+
+
+@api.get("/jobs")
+async def get_jobs_handler(status: Optional[JobStatus] = None):
+    """
+    List the background jobs
+    :param status: Only list jobs with this status
+    :return:
+    """
+    jobs = await job_queue.jobs(status)
+    return [
+        {
+            "id": job.id,
+            "kind": job.kind,
+            "part": job.part_name,
+            "status": job.status.value,
+            "priority": job.priority,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "run_at": job.run_at,
+            "error": job.error,
+        }
+        for job in jobs
+    ]
 
 
 @api.post("/uploadRepo")
 async def upload_repo_handler(
-        request: Request, background_tasks: BackgroundTasks, db_session: DBSessionDep
+        request: Request, db_session: DBSessionDep
 ):
     """
     Hello endpoint
@@ -319,15 +477,25 @@ async def upload_repo_handler(
         new_part = MultimodalPartDBModel(name=repo_name, content_type="repo")
         new_part.thumbnail = "thumbnail_github.png"
         db_session.add(new_part)
-        
+        await db_session.commit()
+        await publish_part_event(
+            repo_name, "created", status=EntryStatus.PENDING, thumbnail=new_part.thumbnail
+        )
+
         if validators.url(repo_path):
-            background_tasks.add_task(
-                clone_repo_task, repo_name, repo_path, repo_branch
+            await job_queue.enqueue(
+                "clone_repo",
+                {"repo_path": repo_path, "repo_branch": repo_branch},
+                dedup_key=f"clone:{repo_name}:{repo_branch}",
+                part_name=repo_name,
             )
         else:
             repo_target_folder = PLAYGROUND_HOME_DIR.joinpath("repos").joinpath(repo_name)
-            background_tasks.add_task(
-                copy_repo_task, repo_name, repo_path, str(repo_target_folder)
+            await job_queue.enqueue(
+                "copy_repo",
+                {"repo_path": repo_path, "target_folder": str(repo_target_folder)},
+                dedup_key=f"copy:{repo_name}",
+                part_name=repo_name,
             )
     except Exception as e:
         if new_part:
@@ -362,7 +530,6 @@ async def delete_part_handler(
     :return:
     """
     try:
-        public_files_dir = Path(os.environ["FILES_DIR"])
         repo_folder = PLAYGROUND_HOME_DIR.joinpath("repos")
         logger.info(f"Deleting part {part_id}")
         query = select(MultimodalPartDBModel).filter(
@@ -386,13 +553,21 @@ async def delete_part_handler(
                 file = PLAYGROUND_HOME_DIR.joinpath(part_id)
                 if file.exists():
                     file.unlink()
-                thumbnail_file = public_files_dir.joinpath(
-                    f"thumbnail_{Path(part_id).stem}.jpg"
-                )
-                if thumbnail_file.exists():
-                    thumbnail_file.unlink()
+                thumbnail = multimodal_part_db_entry.thumbnail or ""
+                if thumbnail.startswith("thumbnails/"):
+                    # thumbnails are content-addressed, so they can be shared with other parts,
+                    # possibly in other sizes
+                    digest = Path(thumbnail).stem.split("_")[0]
+                    query = select(MultimodalPartDBModel.name).filter(
+                        MultimodalPartDBModel.thumbnail.startswith(f"thumbnails/{digest}_"),
+                        MultimodalPartDBModel.name != part_id,
+                    )
+                    result = await db_session.execute(query)
+                    if result.first() is None:
+                        thumbnail_service.delete(digest)
             await db_session.delete(multimodal_part_db_entry)
             await db_session.commit()
+            await publish_part_event(part_id, "deleted")
         return JSONResponse(content={"content": "Part deleted"})
     except Exception as e:
         logger.error(e)
@@ -400,26 +575,53 @@ async def delete_part_handler(
 
 
 @api.get("/tags")
-async def get_tags_handler(request: Request, db_session: DBSessionDep):
+async def get_tags_handler(
+        request: Request,
+        db_session: DBSessionDep,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[str] = None,
+):
     """
     Get tags
+    :param cursor: The X-Next-Cursor header of the previous page
+    :param limit: The page size, all tags by default
+    :param fields: Comma-separated fields to return
     :return:
     """
-    base_url = request.url._url.split("/api")[0]
+    try:
+        check_limit(limit)
+        selected = parse_fields(fields, TAG_FIELDS)
+        after = int(decode_cursor(cursor)) if cursor is not None else None
+    except (InvalidListingQueryError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    # the api is mounted under its root path, the files are served next to it
+    base_url = str(request.base_url).rstrip("/").removesuffix(request.scope.get("root_path", ""))
     files_url = f"{base_url}/files"
-    query = select(MultimodalPartDBModel).where(
-        MultimodalPartDBModel.status == EntryStatus.READY
+
+    async def render():
+        columns = [
+            MultimodalPartDBModel.name,
+            MultimodalPartDBModel.thumbnail,
+            MultimodalPartDBModel.content_type,
+        ]
+        rows, next_cursor = await select_parts_page(
+            db_session, columns, after, limit, MultimodalPartDBModel.status == EntryStatus.READY
+        )
+        tags = []
+        for part in rows:
+            tag = {
+                "value": part["name"],
+                "name": part["name"],
+                "description": "",
+                # the thumbnail of a part is only set once its thumbnail job finished
+                "icon": f"{files_url}/{part['thumbnail'] or DEFAULT_THUMBNAIL}",
+                "type": part["content_type"],
+            }
+            tags.append({field: tag[field] for field in selected})
+        return tags, next_cursor
+
+    return await tags_listing_cache.respond(
+        request, db_session, (files_url, after, limit, tuple(selected)), render
     )
-    result = await db_session.execute(query)
-    parts = result.scalars().all()
-    tags = [
-        {
-            "value": part.name,
-            "name": part.name,
-            "description": "",
-            "icon": f"{files_url}/{part.thumbnail}",
-            "type": part.content_type,
-        }
-        for part in parts
-    ]
-    return tags
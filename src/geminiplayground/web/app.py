@@ -1,19 +1,29 @@
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from geminiplayground.parts import RefreshScheduler, RemoteFileReconciler
 from .api import api
+from .chat_sessions import chat_sessions
 from .db.models import *  # noqa: F401, F403
 from .db.session_manager import sessionmanager
+from .events import event_bus
+from .jobs import job_queue
+from .thumbnails import thumbnail_service
 from .web import web
 
 logger = logging.getLogger("rich")
 
+RECONCILE_INTERVAL = float(os.environ.get("GEMINI_PLAYGROUND_RECONCILE_INTERVAL", 3600))
+RECONCILE_REFRESH_WITHIN = os.environ.get("GEMINI_PLAYGROUND_RECONCILE_REFRESH_WITHIN")
+
 
 def mount_apps(app: FastAPI):
     apps = {
@@ -29,6 +39,27 @@ async def initialize_db():
     logger.info("DB initialized")
 
 
+async def reconcile_periodically():
+    """
+    Evict cached uploads of files deleted from Gemini, and delete expired chat sessions, every
+    `RECONCILE_INTERVAL` seconds.
+
+    With several workers, only one of them reconciles the files per interval.
+    """
+    reconciler = RemoteFileReconciler()
+    refresh_within = float(RECONCILE_REFRESH_WITHIN) if RECONCILE_REFRESH_WITHIN else None
+    while True:
+        try:
+            await run_in_threadpool(reconciler.reconcile_if_due, RECONCILE_INTERVAL, refresh_within=refresh_within)
+        except Exception as e:
+            logger.warning(f"Remote file reconciliation failed: {e}")
+        try:
+            await chat_sessions.expire()
+        except Exception as e:
+            logger.warning(f"Chat session expiry failed: {e}")
+        await asyncio.sleep(RECONCILE_INTERVAL)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -38,8 +69,19 @@ async def lifespan(app: FastAPI):
     logger.info("app is starting")
     await initialize_db()
     mount_apps(app)
+    event_bus.start()
+    # GEMINI_PLAYGROUND_JOB_WORKERS=0 leaves the jobs to `geminiplayground worker`
+    job_queue.start()
+    RefreshScheduler().start()
+    reconcile_task = asyncio.create_task(reconcile_periodically()) if RECONCILE_INTERVAL > 0 else None
     yield
     logger.info("app is shutting down")
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    await job_queue.stop()
+    await event_bus.stop()
+    RefreshScheduler().shutdown()
+    thumbnail_service.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from google.genai.types import Content, Part
+from sqlalchemy import delete
+
+from geminiplayground.core import GeminiClient, GeminiPlayground, HistoryCompactor
+from geminiplayground.core.gemini_playground import ChatSession
+from geminiplayground.utils import Singleton
+from .db.models import ChatSessionEntry
+from .db.session_manager import sessionmanager
+
+logger = logging.getLogger("rich")
+
+# Chat sessions kept in memory; the least recently used ones are dropped first
+CHAT_MAX_SESSIONS = int(os.environ.get("GEMINI_PLAYGROUND_CHAT_MAX_SESSIONS", 64))
+# Sessions unused for this many seconds are dropped from memory
+CHAT_IDLE_TIMEOUT = float(os.environ.get("GEMINI_PLAYGROUND_CHAT_IDLE_TIMEOUT", 30 * 60))
+# Sessions not updated for this many seconds are deleted from the database, 0 keeps them forever
+CHAT_SESSION_TTL = float(os.environ.get("GEMINI_PLAYGROUND_CHAT_SESSION_TTL", 30 * 24 * 60 * 60))
+# Messages (user and model turns) kept per session
+CHAT_MAX_HISTORY = int(os.environ.get("GEMINI_PLAYGROUND_CHAT_MAX_HISTORY", 100))
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def serialize_history(history: list[Content]) -> str:
+    """
+    Serialize a chat history to JSON.
+    """
+    return json.dumps([content.model_dump(mode="json", exclude_none=True) for content in history])
+
+
+def deserialize_history(data: str) -> list[Content]:
+    """
+    Load a chat history serialized with `serialize_history`.
+    """
+    return [Content.model_validate(content) for content in json.loads(data or "[]")]
+
+
+def compact_history(history: list[Content], max_length: int = CHAT_MAX_HISTORY) -> tuple[list[Content], bool]:
+    """
+    Bound the size of a chat history.
+
+    Inline bytes (e.g. images sent as data) are replaced with a short text note, uploaded files
+    are kept as references, and only the last `max_length` messages are kept, starting with a
+    user message.
+
+    Returns:
+        The compacted history and whether it differs from the given one.
+    """
+    changed = False
+    compacted = []
+    for content in history:
+        if not any(part.inline_data is not None for part in content.parts or []):
+            compacted.append(content)
+            continue
+        parts = [
+            Part(text=f"[{part.inline_data.mime_type} attachment not kept in history]")
+            if part.inline_data is not None else part
+            for part in content.parts
+        ]
+        compacted.append(content.model_copy(update={"parts": parts}))
+        changed = True
+
+    if len(compacted) > max_length:
+        start = len(compacted) - max_length
+        # a history must start with a user message that isn't a function response
+        while start < len(compacted) and not (
+                compacted[start].role == "user"
+                and not any(part.function_response for part in compacted[start].parts or [])
+        ):
+            start += 1
+        compacted = compacted[start:]
+        changed = True
+    return compacted, changed
+
+
+def history_messages(history: list[Content]) -> list[dict]:
+    """
+    Return the text of a chat history, e.g. to display a restored conversation.
+    """
+    messages = []
+    for content in history:
+        text = " ".join(part.text for part in content.parts or [] if part.text)
+        if text:
+            messages.append({"role": content.role, "text": text})
+    return messages
+
+
+class ChatSessionStore(metaclass=Singleton):
+    """
+    Chat sessions shared across websocket connections, persisted to the app database.
+
+    Sessions are identified by an id the client keeps, so a reconnect, a page reload or another
+    worker process picks the conversation up where it stopped, and switching models keeps the
+    history. Histories are saved after every turn, with uploaded files as references and inline
+    bytes dropped, and bounded to `max_history` messages. At most `max_sessions` sessions stay
+    in memory, and idle ones are dropped after `idle_timeout` seconds; they are restored from
+    the database on their next use. Sessions not updated for `session_ttl` seconds are deleted
+    by `expire`. Turns of a session run one at a time (see `turn`), even when several
+    websockets share it.
+    """
+
+    def __init__(
+            self,
+            max_sessions: int = CHAT_MAX_SESSIONS,
+            idle_timeout: float = CHAT_IDLE_TIMEOUT,
+            max_history: int = CHAT_MAX_HISTORY,
+            session_ttl: float = CHAT_SESSION_TTL,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_history = max_history
+        self.session_ttl = session_ttl
+        self.compactor = HistoryCompactor()
+        self._sessions: OrderedDict[str, tuple[ChatSession, float]] = OrderedDict()
+        # turn locks, with the number of turns holding or waiting for each
+        self._turn_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @staticmethod
+    def session_id(requested: Optional[str] = None) -> str:
+        """
+        Return the requested session id if it is valid, or a new one.
+        """
+        if requested and SESSION_ID_PATTERN.match(requested):
+            return requested
+        return uuid.uuid4().hex
+
+    @contextlib.asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Hold the turn of a session, waiting for the turn in progress, if any, to end.
+
+        Wrap everything from `get` to `save` in it, so the turns of two websockets sharing the
+        session don't interleave or overwrite each other's history.
+        """
+        lock, waiters = self._turn_locks.get(session_id, (asyncio.Lock(), 0))
+        self._turn_locks[session_id] = (lock, waiters + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiters = self._turn_locks[session_id]
+            if waiters == 1:
+                del self._turn_locks[session_id]
+            else:
+                self._turn_locks[session_id] = (lock, waiters - 1)
+
+    def _evict(self):
+        now = time.time()
+        for session_id, (_, last_used) in list(self._sessions.items()):
+            if now - last_used > self.idle_timeout:
+                del self._sessions[session_id]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    @staticmethod
+    def _drop_unavailable_files(history: list[Content]) -> list[Content]:
+        """
+        Replace references to Gemini files that expired or were deleted with a text note.
+        """
+        gemini_client = GeminiClient()
+        available: dict[str, bool] = {}
+
+        def is_available(file_uri: str) -> bool:
+            if file_uri not in available:
+                available[file_uri] = gemini_client.is_file_available(file_uri)
+            return available[file_uri]
+
+        restored = []
+        for content in history:
+            parts = []
+            for part in content.parts or []:
+                if part.file_data is not None and part.file_data.file_uri and not is_available(part.file_data.file_uri):
+                    parts.append(Part(text=f"[{part.file_data.mime_type} file no longer available]"))
+                    continue
+                parts.append(part)
+            restored.append(content.model_copy(update={"parts": parts}))
+        return restored
+
+    async def history(self, session_id: str) -> list[Content]:
+        """
+        Return the history of a session, from memory or from the database.
+        """
+        if session_id in self._sessions:
+            return self._sessions[session_id][0].get_history()
+        async with sessionmanager.session() as session:
+            entry = await session.get(ChatSessionEntry, session_id)
+        return deserialize_history(entry.history) if entry is not None else []
+
+    async def get(self, session_id: str, model: str) -> ChatSession:
+        """
+        Return the chat of a session for a model, restoring its history if needed.
+        """
+        self._evict()
+        if session_id in self._sessions:
+            chat, _ = self._sessions.pop(session_id)
+            if chat.model != model:
+                chat = GeminiPlayground(model=model).start_chat(
+                    history=chat.get_history(), compactor=self.compactor
+                )
+        else:
+            history = await self.history(session_id)
+            if history:
+                history = await run_in_threadpool(self._drop_unavailable_files, history)
+                logger.info(f"[Chat] Restored session {session_id} with {len(history)} messages")
+            chat = GeminiPlayground(model=model).start_chat(history=history, compactor=self.compactor)
+        self._sessions[session_id] = (chat, time.time())
+        self._evict()
+        return chat
+
+    async def save(self, session_id: str, chat: ChatSession):
+        """
+        Compact the history of a chat and persist it.
+
+        Long histories are summarized in the threadpool, ahead of the next turn.
+        """
+        await run_in_threadpool(chat.compact_history)
+        history, changed = compact_history(chat.get_history(), self.max_history)
+        if changed:
+            chat.set_history(history)
+        async with sessionmanager.session() as session:
+            await session.merge(
+                ChatSessionEntry(
+                    id=session_id,
+                    model=chat.model,
+                    history=serialize_history(history),
+                    updated_at=time.time(),
+                )
+            )
+            await session.commit()
+        if session_id in self._sessions:
+            self._sessions[session_id] = (chat, time.time())
+            self._sessions.move_to_end(session_id)
+
+    async def reset(self, session_id: str):
+        """
+        Clear the history of a session, once the turn in progress, if any, ended.
+        """
+        async with self.turn(session_id):
+            if session_id in self._sessions:
+                self._sessions[session_id][0].reset_chat()
+            async with sessionmanager.session() as session:
+                await session.execute(delete(ChatSessionEntry).where(ChatSessionEntry.id == session_id))
+                await session.commit()
+
+    async def expire(self, ttl: Optional[float] = None) -> int:
+        """
+        Delete the sessions not updated for `ttl` seconds, `session_ttl` by default.
+
+        Returns:
+            The number of deleted sessions.
+        """
+        ttl = self.session_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return 0
+        cutoff = time.time() - ttl
+        async with sessionmanager.session() as session:
+            result = await session.execute(
+                delete(ChatSessionEntry)
+                .where(ChatSessionEntry.updated_at < cutoff)
+                .returning(ChatSessionEntry.id)
+            )
+            expired = list(result.scalars().all())
+            await session.commit()
+        for session_id in expired:
+            # or its next turn would save it back; sessions in the middle of a turn are in use
+            if session_id not in self._turn_locks:
+                self._sessions.pop(session_id, None)
+        if expired:
+            logger.info(f"[Chat] Deleted {len(expired)} sessions unused for {ttl:.0f}s")
+        return len(expired)
+
+
+chat_sessions = ChatSessionStore()
@@ -1,13 +1,31 @@
 import os
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from geminiplayground.utils import LibUtils
 
 
 class Settings(BaseSettings):
+    """
+    Web database configuration, tunable with `GEMINI_PLAYGROUND_DB_*` environment variables.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="GEMINI_PLAYGROUND_DB_")
+
     database_url: str
     echo_sql: bool = True
+    # connections kept open per process, 0 disables pooling
+    pool_size: int = 5
+    max_overflow: int = 10
+    # WAL lets readers proceed while a writer commits
+    journal_mode: str = "WAL"
+    # NORMAL is durable across application crashes in WAL mode, only a power loss may drop the last commits
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    # negative values are in KiB
+    cache_size: int = -16000
+    # prepared statements kept per connection
+    cached_statements: int = 256
 
 
 playground_home = LibUtils.get_lib_home()
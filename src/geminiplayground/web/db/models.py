@@ -1,6 +1,7 @@
 from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
 
 from .registry import mapper_registry as reg
@@ -16,20 +17,57 @@ class EntryStatus(Enum):
     ERROR = "error"
 
 
+class JobStatus(Enum):
+    """
+    Background job status enum.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class Base(DeclarativeBase):
     registry = reg
 
 
+def change_counter_triggers(table_name: str) -> list[str]:
+    """
+    Triggers bumping the `change_counter` row of a table on every write to it.
+    """
+    bump = (
+        f"INSERT INTO change_counter (name, version) VALUES ('{table_name}', 1) "
+        f"ON CONFLICT (name) DO UPDATE SET version = version + 1"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_after_{op.lower()} AFTER {op} ON {table_name} BEGIN {bump}; END"
+        for op in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+class ChangeCounter(Base):
+    """
+    Version of a table, bumped by triggers on every write, whichever process makes it.
+    """
+
+    __tablename__ = "change_counter"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(default=0)
+
+
 class MultimodalPartEntry(Base):
     """
     Multimodal part model.
     """
 
     __tablename__ = "part"
+    __table_args__ = ({"info": {"triggers": change_counter_triggers("part")}},)
 
     name: Mapped[str] = mapped_column(primary_key=True)
-    content_type: Mapped[str] = mapped_column()
-    status: Mapped[EntryStatus] = mapped_column(default=EntryStatus.PENDING)
+    content_type: Mapped[str] = mapped_column(index=True)
+    status: Mapped[EntryStatus] = mapped_column(default=EntryStatus.PENDING, index=True)
     status_message: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
     thumbnail: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
 
@@ -43,4 +81,63 @@ class MultimodalPartEntry(Base):
         return f"<{self.__class__.__name__}({self.name}, {self.name})>"
 
 
-__all__ = ["MultimodalPartEntry", "EntryStatus"]
+class Job(Base):
+    """
+    Durable background job model.
+    """
+
+    __tablename__ = "job"
+    __table_args__ = (Index("ix_job_claim", "status", "priority", "run_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column()
+    payload: Mapped[str] = mapped_column(Text, default="{}")
+    dedup_key: Mapped[Optional[str]] = mapped_column(unique=True, nullable=True, default=None)
+    part_name: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+    priority: Mapped[int] = mapped_column(default=0)
+    status: Mapped[JobStatus] = mapped_column(default=JobStatus.QUEUED)
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=3)
+    run_at: Mapped[float] = mapped_column(default=0.0)
+    locked_by: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+    locked_at: Mapped[Optional[float]] = mapped_column(nullable=True, default=None)
+    error: Mapped[Optional[str]] = mapped_column(nullable=True, default=None)
+    created_at: Mapped[float] = mapped_column(default=0.0)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.id}, {self.kind}, {self.status})>"
+
+
+class PartEventEntry(Base):
+    """
+    Part event shared between worker processes.
+    """
+
+    __tablename__ = "part_event"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    payload: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[float] = mapped_column(index=True)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.id})>"
+
+
+class ChatSessionEntry(Base):
+    """
+    Persisted chat session history.
+    """
+
+    __tablename__ = "chat_session"
+
+    id: Mapped[str] = mapped_column(primary_key=True)
+    model: Mapped[str] = mapped_column()
+    # JSON list of google.genai Content, with file references instead of inline bytes
+    history: Mapped[str] = mapped_column(Text, default="[]")
+    updated_at: Mapped[float] = mapped_column(default=0.0, index=True)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.id}, {self.model})>"
+
+
+__all__ = ["MultimodalPartEntry", "EntryStatus", "Job", "JobStatus", "PartEventEntry", "ChangeCounter", "ChatSessionEntry"]
@@ -1,7 +1,7 @@
 import contextlib
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Optional
 
-from sqlalchemy import event, NullPool
+from sqlalchemy import event, AsyncAdaptedQueuePool, NullPool
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncSession,
@@ -23,6 +23,7 @@ class SessionManager(metaclass=Singleton):
             self,
             url: str,
             enable_foreign_keys: bool = True,
+            pragmas: Optional[dict[str, Any]] = None,
             autocommit: bool = False,
             autflush: bool = False,
             expire_on_commit: bool = False,
@@ -32,10 +33,15 @@ class SessionManager(metaclass=Singleton):
             engine_kwargs = {}
 
         self._engine = create_async_engine(url, **engine_kwargs)
+        pragmas = dict(pragmas or {})
         if enable_foreign_keys:
-            @event.listens_for(self._engine.sync_engine, "connect")
-            def _fk_pragma_on_connect(dbapi_con, con_record):
-                dbapi_con.execute("pragma foreign_keys=ON")
+            pragmas["foreign_keys"] = "ON"
+
+        @event.listens_for(self._engine.sync_engine, "connect")
+        def _set_pragmas_on_connect(dbapi_con, con_record):
+            # pooled connections keep these for their whole life
+            for name, value in pragmas.items():
+                dbapi_con.execute(f"pragma {name}={value}")
 
         self._session_maker = async_sessionmaker(
             autocommit=autocommit,
@@ -54,8 +60,19 @@ class SessionManager(metaclass=Singleton):
             if drop_all:
                 await conn.run_sync(mapper_registry.metadata.drop_all)
             await conn.run_sync(mapper_registry.metadata.create_all)
+            # create_all skips the indexes of tables that already exist
+            await conn.run_sync(self._create_missing_indexes_and_triggers)
         return self
 
+    @staticmethod
+    def _create_missing_indexes_and_triggers(conn):
+        for table in mapper_registry.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+            # statements declared in `__table_args__` info, expected to be idempotent
+            for trigger in table.info.get("triggers", []):
+                conn.exec_driver_sql(trigger)
+
     async def close(self):
         """
         Close the database
@@ -99,12 +116,29 @@ class SessionManager(metaclass=Singleton):
             await session.close()
 
 
+# a pool size of 0 opens a new connection per session
+pool_kwargs = (
+    {"poolclass": AsyncAdaptedQueuePool, "pool_size": settings.pool_size, "max_overflow": settings.max_overflow}
+    if settings.pool_size > 0
+    else {"poolclass": NullPool}
+)
 sessionmanager = SessionManager(
     url=settings.database_url,
+    pragmas={
+        "journal_mode": settings.journal_mode,
+        "synchronous": settings.synchronous,
+        "busy_timeout": settings.busy_timeout_ms,
+        "cache_size": settings.cache_size,
+        "temp_store": "MEMORY",
+    },
     engine_kwargs={
         "echo": settings.echo_sql,
-        "poolclass": NullPool,
+        **pool_kwargs,
         "pool_recycle": 3600,
+        "connect_args": {
+            "timeout": settings.busy_timeout_ms / 1000,
+            "cached_statements": settings.cached_statements,
+        },
         "future": True,
     },
 )
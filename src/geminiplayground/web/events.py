@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field
+from sqlalchemy import select, delete, func
+
+from geminiplayground.utils import Singleton
+from .db.models import EntryStatus, PartEventEntry
+from .db.session_manager import sessionmanager
+
+logger = logging.getLogger("rich")
+
+# "local" only reaches subscribers of the same process, "sqlite" and "redis" reach all workers
+EVENTS_FANOUT = os.environ.get("GEMINI_PLAYGROUND_EVENTS_FANOUT", "sqlite")
+EVENTS_REDIS_URL = os.environ.get("GEMINI_PLAYGROUND_EVENTS_REDIS_URL", "redis://localhost:6379/0")
+EVENTS_REDIS_CHANNEL = "geminiplayground:part-events"
+EVENTS_POLL_INTERVAL = 0.5
+# Events shared through SQLite are only kept this many seconds
+EVENTS_RETENTION = 60.0
+# Events buffered per subscriber; a slow subscriber loses the oldest ones
+EVENTS_QUEUE_SIZE = 256
+EVENTS_HEARTBEAT_INTERVAL = 15.0
+
+
+class PartEvent(BaseModel):
+    """
+    A change of a multimodal part.
+
+    `type` is one of "created", "status", "progress", "thumbnail" or "deleted".
+    """
+
+    part: str
+    type: str
+    status: Optional[EntryStatus] = None
+    message: Optional[str] = None
+    progress: Optional[float] = None
+    thumbnail: Optional[str] = None
+    timestamp: float = Field(default_factory=time.time)
+
+
+class PartEventBus(metaclass=Singleton):
+    """
+    In-process publish/subscribe of part events, with optional fanout across worker processes.
+
+    Subscribers get a bounded queue of events. With the "sqlite" fanout, published events are
+    written to the `part_event` table of the app database and every process polls it; with
+    "redis", they go through a Redis channel. Either way, a process delivers events to its own
+    subscribers only once they come back from the shared channel, so none is delivered twice.
+    """
+
+    def __init__(self, fanout: str = EVENTS_FANOUT):
+        if fanout not in ("local", "sqlite", "redis"):
+            raise ValueError(f"Unknown event fanout: {fanout}")
+        self.fanout = fanout
+        self._subscribers: set[asyncio.Queue] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self._redis = None
+
+    @contextlib.contextmanager
+    def subscribe(self, maxsize: int = EVENTS_QUEUE_SIZE) -> Iterator[asyncio.Queue]:
+        """
+        Subscribe to the events published from now on.
+
+        Yields:
+            A queue receiving `PartEvent` objects.
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def _dispatch(self, event: PartEvent):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def publish(self, event: PartEvent):
+        """
+        Publish an event to the subscribers of every process.
+        """
+        try:
+            if self.fanout == "sqlite":
+                async with sessionmanager.session() as session:
+                    session.add(PartEventEntry(payload=event.model_dump_json(), created_at=event.timestamp))
+                    await session.commit()
+            elif self.fanout == "redis":
+                await self._redis_client().publish(EVENTS_REDIS_CHANNEL, event.model_dump_json())
+            else:
+                self._dispatch(event)
+        except Exception as e:
+            # events are a convenience: clients can always fall back to /parts
+            logger.warning(f"[Events] Failed to publish {event.type} event of {event.part}: {e}")
+
+    def _redis_client(self):
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise ImportError(
+                    "The redis event fanout requires the redis package, install it with "
+                    "`pip install geminiplayground[redis]`"
+                )
+            self._redis = redis.from_url(EVENTS_REDIS_URL)
+        return self._redis
+
+    async def _poll_sqlite(self):
+        async with sessionmanager.session() as session:
+            last_id = (await session.execute(select(func.max(PartEventEntry.id)))).scalar() or 0
+        last_prune = 0.0
+        while True:
+            try:
+                async with sessionmanager.session() as session:
+                    result = await session.execute(
+                        select(PartEventEntry).where(PartEventEntry.id > last_id).order_by(PartEventEntry.id)
+                    )
+                    for entry in result.scalars():
+                        last_id = entry.id
+                        self._dispatch(PartEvent.model_validate_json(entry.payload))
+                    if time.time() - last_prune > EVENTS_RETENTION:
+                        last_prune = time.time()
+                        await session.execute(
+                            delete(PartEventEntry).where(PartEventEntry.created_at < last_prune - EVENTS_RETENTION)
+                        )
+                        await session.commit()
+            except Exception as e:
+                logger.warning(f"[Events] Failed to poll events: {e}")
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    async def _listen_redis(self):
+        pubsub = self._redis_client().pubsub()
+        await pubsub.subscribe(EVENTS_REDIS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    self._dispatch(PartEvent.model_validate_json(message["data"]))
+        finally:
+            await pubsub.aclose()
+
+    def start(self):
+        """
+        Start receiving the events of the shared channel on the running event loop.
+        """
+        if self.fanout == "sqlite":
+            self._listener = asyncio.create_task(self._poll_sqlite())
+        elif self.fanout == "redis":
+            self._listener = asyncio.create_task(self._listen_redis())
+
+    async def stop(self):
+        """
+        Stop receiving the events of the shared channel.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+async def publish_part_event(part: str, type: str, **kwargs):
+    """
+    Publish a `PartEvent` on the process-wide bus.
+    """
+    await event_bus.publish(PartEvent(part=part, type=type, **kwargs))
+
+
+event_bus = PartEventBus()
@@ -0,0 +1,378 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from geminiplayground.utils import Singleton
+from .db.models import Job, JobStatus, MultimodalPartEntry, EntryStatus
+from .db.session_manager import sessionmanager
+from .events import publish_part_event
+
+logger = logging.getLogger("rich")
+
+JOB_WORKERS = int(os.environ.get("GEMINI_PLAYGROUND_JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = 1.0
+# A running job whose lease wasn't renewed within this many seconds is assumed dead
+JOB_LEASE = 60.0
+JOB_LEASE_RENEW_INTERVAL = JOB_LEASE / 4
+JOB_BACKOFF_BASE = 5.0
+JOB_BACKOFF_MAX = 10 * 60.0
+PROGRESS_MIN_INTERVAL = 1.0
+
+JobHandler = Callable[[dict, "JobContext"], Awaitable[None]]
+JobFailureHandler = Callable[[dict, "JobContext", BaseException], Awaitable[None]]
+
+
+class JobContext:
+    """
+    What a job handler knows about the job it runs.
+    """
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.part_name = job.part_name
+        self.attempt = job.attempts
+
+    async def progress(self, message: str, percent: Optional[float] = None):
+        """
+        Report progress in the status message of the job's part, and publish it as an event.
+        """
+        if self.part_name is None:
+            return
+        if percent is not None:
+            message = f"{message} ({percent:.0f}%)"
+        async with sessionmanager.session() as session:
+            await session.execute(
+                update(MultimodalPartEntry)
+                .where(MultimodalPartEntry.name == self.part_name)
+                .values(status_message=message)
+            )
+            await session.commit()
+        await publish_part_event(self.part_name, "progress", message=message, progress=percent)
+
+    def progress_callback(
+            self, message: str, min_interval: float = PROGRESS_MIN_INTERVAL
+    ) -> Callable[..., None]:
+        """
+        Make a `(done, total, message=None)` callback reporting progress from a worker thread.
+
+        Reports are throttled to one every `min_interval` seconds, plus the final one.
+        """
+        loop = asyncio.get_running_loop()
+        last_report = 0.0
+
+        def callback(done: float, total: Optional[float], step_message: Optional[str] = None):
+            nonlocal last_report
+            now = time.monotonic()
+            if not total or (now - last_report < min_interval and done < total):
+                return
+            last_report = now
+            asyncio.run_coroutine_threadsafe(self.progress(step_message or message, 100 * done / total), loop)
+
+        return callback
+
+
+class JobQueue(metaclass=Singleton):
+    """
+    A durable job queue stored in the `job` table of the app database.
+
+    Jobs survive restarts and are claimed atomically, so each one runs once even with several
+    uvicorn workers or standalone worker processes (`geminiplayground worker`). A worker renews
+    the lease of its running job every `JOB_LEASE_RENEW_INTERVAL` seconds, and jobs whose lease
+    lapsed for `JOB_LEASE` seconds, because their worker died, are queued again. Workers pick
+    the highest priority job first. Failed jobs are retried with exponential backoff until
+    `max_attempts`, after which their part is marked as failed, unless the kind of job has a
+    failure handler. Jobs sharing a `dedup_key` are only queued once while pending.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, JobHandler] = {}
+        self._failure_handlers: dict[str, JobFailureHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def register(
+            self, kind: str, on_failure: Optional[JobFailureHandler] = None
+    ) -> Callable[[JobHandler], JobHandler]:
+        """
+        Decorator registering the handler of a kind of job.
+
+        Handlers are coroutines receiving the job payload and a `JobContext`. Raising an
+        exception fails the attempt.
+
+        Args:
+            kind: The kind of job.
+            on_failure: Coroutine receiving the payload, a `JobContext` and the error once every
+                attempt failed. Jobs with a failure handler are not fatal to their part: its
+                status and status message are left as they are.
+        """
+
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[kind] = handler
+            if on_failure is not None:
+                self._failure_handlers[kind] = on_failure
+            return handler
+
+        return decorator
+
+    async def enqueue(
+            self,
+            kind: str,
+            payload: Optional[dict] = None,
+            dedup_key: Optional[str] = None,
+            part_name: Optional[str] = None,
+            priority: int = 0,
+            max_attempts: int = 3,
+    ) -> int:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind: Name of a registered handler.
+            payload: JSON-serializable handler arguments.
+            dedup_key: Content key; while a job with this key is queued or running, no other is added.
+            part_name: Name of the part whose status reflects this job.
+            priority: Higher priorities run first.
+            max_attempts: Maximum number of attempts.
+
+        Returns:
+            The id of the new or already pending job.
+        """
+        values = dict(
+            kind=kind,
+            payload=json.dumps(payload or {}),
+            part_name=part_name,
+            priority=priority,
+            max_attempts=max_attempts,
+            status=JobStatus.QUEUED,
+            attempts=0,
+            run_at=time.time(),
+            locked_by=None,
+            locked_at=None,
+            error=None,
+            created_at=time.time(),
+        )
+        async with sessionmanager.session() as session:
+            existing = None
+            if dedup_key is not None:
+                result = await session.execute(select(Job).where(Job.dedup_key == dedup_key))
+                existing = result.scalars().first()
+            if existing is not None and existing.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                logger.info(f"[Jobs] {kind} job {existing.id} already pending for {dedup_key}")
+                return existing.id
+            if existing is not None:
+                for name, value in values.items():
+                    setattr(existing, name, value)
+                job = existing
+            else:
+                job = Job(dedup_key=dedup_key, **values)
+                session.add(job)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # another process queued the same content concurrently
+                await session.rollback()
+                result = await session.execute(select(Job.id).where(Job.dedup_key == dedup_key))
+                return result.scalar_one()
+            job_id = job.id
+        self._wakeup.set()
+        return job_id
+
+    async def _claim(self) -> Optional[Job]:
+        """
+        Atomically take the next runnable job, recovering jobs of dead workers first.
+        """
+        now = time.time()
+        async with sessionmanager.session() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.status == JobStatus.RUNNING, Job.locked_at < now - JOB_LEASE)
+                .values(status=JobStatus.QUEUED, locked_by=None, locked_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            next_job = (
+                select(Job.id)
+                .where(Job.status == JobStatus.QUEUED, Job.run_at <= now, Job.kind.in_(list(self._handlers)))
+                .order_by(Job.priority.desc(), Job.id)
+                .limit(1)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == next_job, Job.status == JobStatus.QUEUED)
+                .values(
+                    status=JobStatus.RUNNING,
+                    locked_by=self._worker_id,
+                    locked_at=now,
+                    attempts=Job.attempts + 1,
+                )
+                .returning(Job)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.scalars().first()
+            await session.commit()
+            return job
+
+    async def _renew_lease(self, job: Job):
+        """
+        Keep the lease of a running job until cancelled, or until another worker took the job over.
+        """
+        while True:
+            await asyncio.sleep(JOB_LEASE_RENEW_INTERVAL)
+            try:
+                async with sessionmanager.session() as session:
+                    result = await session.execute(
+                        update(Job)
+                        .where(Job.id == job.id, Job.status == JobStatus.RUNNING, Job.locked_by == self._worker_id)
+                        .values(locked_at=time.time())
+                    )
+                    await session.commit()
+            except Exception as e:
+                # the lease outlives a few failed renewals
+                logger.warning(f"[Jobs] Failed to renew the lease of {job.kind} job {job.id}: {e}")
+                continue
+            if result.rowcount == 0:
+                logger.warning(f"[Jobs] {job.kind} job {job.id} lost its lease")
+                return
+
+    async def _release(self, job: Job):
+        async with sessionmanager.session() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(status=JobStatus.QUEUED, attempts=Job.attempts - 1, locked_by=None, locked_at=None)
+            )
+            await session.commit()
+
+    async def _finish(self, job: Job, error: Optional[BaseException] = None):
+        events = []
+        on_failure = self._failure_handlers.get(job.kind)
+        # jobs with a failure handler don't report to their part
+        part_name = job.part_name if on_failure is None else None
+        async with sessionmanager.session() as session:
+            if error is None:
+                # finished jobs are only kept while they are useful for deduplication
+                await session.execute(delete(Job).where(Job.id == job.id))
+            elif job.attempts < job.max_attempts:
+                backoff = min(JOB_BACKOFF_BASE * 2 ** (job.attempts - 1), JOB_BACKOFF_MAX)
+                backoff *= random.uniform(0.5, 1.5)
+                await session.execute(
+                    update(Job)
+                    .where(Job.id == job.id)
+                    .values(status=JobStatus.QUEUED, run_at=time.time() + backoff, locked_by=None, error=str(error))
+                )
+                logger.warning(f"[Jobs] {job.kind} job {job.id} failed ({error}), retrying in {backoff:.0f}s")
+                if part_name is not None:
+                    message = f"Retrying ({job.attempts}/{job.max_attempts}): {error}"
+                    await session.execute(
+                        update(MultimodalPartEntry)
+                        .where(MultimodalPartEntry.name == job.part_name)
+                        .values(status_message=message)
+                    )
+                    events.append(dict(type="progress", message=message))
+            else:
+                await session.execute(
+                    update(Job)
+                    .where(Job.id == job.id)
+                    .values(status=JobStatus.FAILED, locked_by=None, error=str(error))
+                )
+                logger.error(f"[Jobs] {job.kind} job {job.id} failed after {job.attempts} attempts: {error}")
+                if part_name is not None:
+                    message = getattr(error, "reason", getattr(error, "message", str(error)))
+                    await session.execute(
+                        update(MultimodalPartEntry)
+                        .where(MultimodalPartEntry.name == job.part_name)
+                        .values(status=EntryStatus.ERROR, status_message=str(message))
+                    )
+                    events.append(dict(type="status", status=EntryStatus.ERROR, message=str(message)))
+            await session.commit()
+        for event in events:
+            await publish_part_event(job.part_name, **event)
+        if error is not None and job.attempts >= job.max_attempts and on_failure is not None:
+            try:
+                await on_failure(json.loads(job.payload), JobContext(job), error)
+            except Exception as e:
+                logger.error(f"[Jobs] Failure handler of {job.kind} job {job.id} failed: {e}")
+
+    async def run_once(self) -> bool:
+        """
+        Claim and run one job.
+
+        Returns:
+            Whether a job was run.
+        """
+        job = await self._claim()
+        if job is None:
+            return False
+        logger.info(f"[Jobs] Running {job.kind} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+        lease = asyncio.create_task(self._renew_lease(job))
+        try:
+            try:
+                await self._handlers[job.kind](json.loads(job.payload), JobContext(job))
+            finally:
+                lease.cancel()
+        except asyncio.CancelledError:
+            # interrupted by a shutdown: requeue without consuming an attempt
+            await self._release(job)
+            raise
+        except Exception as e:
+            await self._finish(job, e)
+        else:
+            await self._finish(job)
+        return True
+
+    async def _work(self):
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Jobs] Worker error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, workers: int = JOB_WORKERS):
+        """
+        Start `workers` worker tasks on the running event loop.
+        """
+        # the event must belong to the loop the workers run on
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+        if workers:
+            logger.info(f"[Jobs] Started {workers} workers")
+
+    async def stop(self):
+        """
+        Cancel the worker tasks and wait for them.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def jobs(self, status: Optional[JobStatus] = None) -> list[Job]:
+        """
+        List the jobs, optionally filtered by status.
+        """
+        async with sessionmanager.session() as session:
+            query = select(Job).order_by(Job.priority.desc(), Job.id)
+            if status is not None:
+                query = query.where(Job.status == status)
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+
+job_queue = JobQueue()
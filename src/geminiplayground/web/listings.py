@@ -0,0 +1,129 @@
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from geminiplayground.utils import MemoryCache
+from .db.models import ChangeCounter
+
+# Rendered listings kept in memory, per table version and query
+LISTING_CACHE_SIZE = 256
+LISTING_MAX_LIMIT = 1000
+
+
+class InvalidListingQueryError(ValueError):
+    """
+    A listing was requested with an invalid cursor, limit or field.
+    """
+
+
+def encode_cursor(value: str) -> str:
+    """
+    Encode the sort key of the last item of a page as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Decode a cursor made by `encode_cursor`.
+
+    Raises:
+        InvalidListingQueryError: If the cursor is malformed.
+    """
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise InvalidListingQueryError(f"Invalid cursor: {cursor}")
+
+
+def parse_fields(fields: Optional[str], allowed: list[str]) -> list[str]:
+    """
+    Parse a comma-separated field selection, defaulting to every allowed field.
+
+    Raises:
+        InvalidListingQueryError: If a field is not allowed.
+    """
+    if not fields:
+        return list(allowed)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise InvalidListingQueryError(f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(allowed)}")
+    return selected
+
+
+def check_limit(limit: Optional[int]):
+    """
+    Raises:
+        InvalidListingQueryError: If the page size is out of range.
+    """
+    if limit is not None and not 0 < limit <= LISTING_MAX_LIMIT:
+        raise InvalidListingQueryError(f"limit must be between 1 and {LISTING_MAX_LIMIT}")
+
+
+async def get_table_version(session: AsyncSession, table_name: str) -> int:
+    """
+    Return the change counter of a table.
+    """
+    result = await session.execute(select(ChangeCounter.version).where(ChangeCounter.name == table_name))
+    return result.scalar() or 0
+
+
+class ListingCache:
+    """
+    Serve JSON listings of a table from memory, with ETags, until the table changes.
+
+    The table version comes from its `change_counter` row, which triggers bump on every write,
+    so writes from any process invalidate the listings of every process. Checking it costs a
+    single primary key lookup per request. Responses carry an ETag made of the listing name, a
+    hash of the query key and the version, so a client holding the current listing gets a 304
+    without the listing being rendered at all, and never for another page or listing.
+    """
+
+    def __init__(self, table_name: str, name: Optional[str] = None, max_size: int = LISTING_CACHE_SIZE):
+        self.table_name = table_name
+        self.name = name or table_name
+        self._cache = MemoryCache(max_size=max_size)
+
+    async def respond(
+            self,
+            request: Request,
+            session: AsyncSession,
+            key: tuple,
+            render: Callable[[], Any],
+    ) -> Response:
+        """
+        Return the listing identified by `key`, rendering it with `render` on a miss.
+
+        Args:
+            request: The incoming request, checked for `If-None-Match`.
+            session: A database session.
+            key: Everything the listing depends on besides the table content (query, base URL...).
+            render: Coroutine function returning `(items, next_cursor)`.
+
+        Returns:
+            The JSON listing, with the next page cursor in the `X-Next-Cursor` header, or a 304.
+        """
+        version = await get_table_version(session, self.table_name)
+        key_hash = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+        etag = f'W/"{self.name}-{key_hash}-{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+            return Response(status_code=304, headers=headers)
+
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != version:
+            items, next_cursor = await render()
+            cached = (version, json.dumps(items, separators=(",", ":")).encode(), next_cursor)
+            self._cache.set(key, cached)
+
+        _, body, next_cursor = cached
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return Response(content=body, media_type="application/json", headers=headers)
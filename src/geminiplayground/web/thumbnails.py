@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi.concurrency import run_in_threadpool
+
+from geminiplayground.utils import FileUtils, ImageUtils, VideoUtils, PDFUtils
+
+logger = logging.getLogger("rich")
+
+THUMBNAIL_SIZES = {
+    "sm": (64, 64),
+    "md": (256, 256),
+    "lg": (512, 512),
+}
+DEFAULT_THUMBNAIL_SIZE = "sm"
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+THUMBNAIL_NAME_PATTERN = re.compile(r"^(?P<digest>[0-9a-f]{64})_(?P<size>[a-z]+)\.jpg$")
+
+
+def render_thumbnail(
+        source_path: str,
+        content_type: str,
+        thumbnail_size: tuple[int, int],
+        output_path: str,
+) -> str:
+    """
+    Render a thumbnail and write it atomically to disk.
+
+    Runs inside a worker process, so it must stay a picklable module-level function.
+
+    Args:
+        source_path: Path to the source file.
+        content_type: One of "image", "video" or "pdf".
+        thumbnail_size: Thumbnail size as (width, height).
+        output_path: Destination of the JPEG thumbnail.
+
+    Returns:
+        The output path.
+
+    Raises:
+        ValueError: If the content type has no thumbnail renderer.
+    """
+    thumbnail_func = {
+        "image": ImageUtils.create_image_thumbnail,
+        "video": VideoUtils.create_video_thumbnail,
+        "pdf": PDFUtils.create_pdf_thumbnail,
+    }.get(content_type, None)
+    if thumbnail_func is None:
+        raise ValueError(f"Unknown content type: {content_type}")
+
+    thumbnail_img = thumbnail_func(source_path, thumbnail_size).convert("RGB")
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        thumbnail_img.save(tmp_path, format="JPEG")
+        os.replace(tmp_path, output_path)
+    finally:
+        # only left behind if saving or renaming failed
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return output_path
+
+
+class ThumbnailService:
+    """
+    Content-addressed thumbnail store backed by a process pool.
+
+    Thumbnails are named after the SHA-256 digest of the source content and the size name,
+    so identical files share thumbnails and different files never collide. A small JSON
+    sidecar per digest remembers the source files, which allows regenerating any size lazily.
+    Sources are paths that may be overwritten with other content, so a source is only rendered
+    after checking that it still hashes to the digest.
+    """
+
+    def __init__(self, thumbnails_dir: Union[str, Path], max_workers: Optional[int] = None):
+        self.thumbnails_dir = Path(thumbnails_dir)
+        self.thumbnails_dir.mkdir(parents=True, exist_ok=True)
+        self._max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """
+        Lazily create the worker pool, so importing the web app does not spawn processes.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @staticmethod
+    def thumbnail_name(digest: str, size: str = DEFAULT_THUMBNAIL_SIZE) -> str:
+        """
+        Build the content-addressed file name of a thumbnail.
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unknown thumbnail size: {size}. Available: {list(THUMBNAIL_SIZES)}")
+        return f"{digest}_{size}.jpg"
+
+    def _source_index_path(self, digest: str) -> Path:
+        return self.thumbnails_dir / f"{digest}.json"
+
+    def _write_source_index(self, digest: str, source_path: Path, content_type: str):
+        index = self._read_source_index(digest) or {"sources": []}
+        sources = [source for source in index["sources"] if source != str(source_path)]
+        index_path = self._source_index_path(digest)
+        tmp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"sources": [str(source_path), *sources], "content_type": content_type}))
+        os.replace(tmp_path, index_path)
+
+    def _read_source_index(self, digest: str) -> Optional[dict]:
+        index_path = self._source_index_path(digest)
+        if not index_path.exists():
+            return None
+        index = json.loads(index_path.read_text())
+        if "source" in index:
+            # written before sources were a list
+            index["sources"] = [index.pop("source")]
+        return index
+
+    @staticmethod
+    def _source_matches(source_path: Path, digest: str) -> bool:
+        return source_path.is_file() and FileUtils.get_file_digest(source_path) == digest
+
+    async def _render(self, source_path: Path, content_type: str, digest: str, size: str) -> Path:
+        """
+        Render one thumbnail in the process pool, sharing the work between concurrent callers.
+        """
+        output_path = self.thumbnails_dir / self.thumbnail_name(digest, size)
+        if output_path.exists():
+            return output_path
+
+        key = output_path.name
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor,
+                render_thumbnail,
+                str(source_path),
+                content_type,
+                THUMBNAIL_SIZES[size],
+                str(output_path),
+            )
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        await asyncio.shield(future)
+        return output_path
+
+    async def create(
+            self,
+            source_path: Union[str, Path],
+            content_type: str,
+            size: str = DEFAULT_THUMBNAIL_SIZE,
+            digest: Optional[str] = None,
+    ) -> str:
+        """
+        Create (or reuse) the thumbnail of a file.
+
+        Args:
+            source_path: Path to the source file.
+            content_type: One of "image", "video" or "pdf".
+            size: Thumbnail size name, see `THUMBNAIL_SIZES`.
+            digest: SHA-256 of the source content, if already known.
+
+        Returns:
+            The thumbnail file name, relative to the thumbnails directory.
+        """
+        source_path = Path(source_path)
+        if digest is None:
+            digest = await run_in_threadpool(FileUtils.get_file_digest, source_path)
+        self._write_source_index(digest, source_path, content_type)
+        output_path = await self._render(source_path, content_type, digest, size)
+        return output_path.name
+
+    async def resolve(self, thumbnail_name: str) -> Optional[Path]:
+        """
+        Resolve a thumbnail file, regenerating it from its source on a miss.
+
+        Args:
+            thumbnail_name: A name produced by `thumbnail_name`.
+
+        Returns:
+            The thumbnail path, or None if it is unknown or no source with that content is left.
+        """
+        match = THUMBNAIL_NAME_PATTERN.match(thumbnail_name)
+        if match is None or match["size"] not in THUMBNAIL_SIZES:
+            return None
+
+        thumbnail_path = self.thumbnails_dir / thumbnail_name
+        if thumbnail_path.exists():
+            return thumbnail_path
+
+        index = self._read_source_index(match["digest"])
+        if index is None:
+            return None
+        for source in index["sources"]:
+            # a source overwritten with other content must not be rendered under this digest
+            if await run_in_threadpool(self._source_matches, Path(source), match["digest"]):
+                logger.info(f"[Thumbnail Miss] Regenerating {thumbnail_name}")
+                return await self._render(Path(source), index["content_type"], match["digest"], match["size"])
+        return None
+
+    def delete(self, digest: str):
+        """
+        Remove every size of a thumbnail together with its source index.
+
+        Thumbnails are shared by every file with the same content: only call this once no
+        remaining file has that digest.
+        """
+        for path in self.thumbnails_dir.glob(f"{digest}*"):
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        """
+        Remove all thumbnails.
+        """
+        FileUtils.clear_folder(self.thumbnails_dir)
+
+    def shutdown(self):
+        """
+        Stop the worker pool.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+thumbnail_service = ThumbnailService(Path(__file__).resolve().parent / "files" / "thumbnails")
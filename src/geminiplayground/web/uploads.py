@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import python_multipart as multipart
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from google.genai.types import File
+from python_multipart.multipart import parse_options_header
+
+from geminiplayground.core import GeminiClient
+from geminiplayground.core.gemini_client import UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger("rich")
+
+MAX_UPLOAD_SIZE = int(os.environ.get("GEMINI_PLAYGROUND_MAX_UPLOAD_SIZE", 2 * 1024 ** 3))
+# Chunks waiting to be sent by an eager upload before the request body stops being read
+EAGER_UPLOAD_QUEUE_SIZE = 8
+
+
+class UploadTooLargeError(Exception):
+    """
+    The upload exceeds the size limit.
+    """
+
+
+class UnsupportedUploadError(Exception):
+    """
+    The upload is missing, has an unsupported content type or an invalid file name.
+    """
+
+
+def check_upload_file_name(filename: Optional[str]):
+    """
+    Raises:
+        UnsupportedUploadError: If the file name is missing, is "." or "..", or is hidden (which
+            also keeps it apart from the temporary ".part" files).
+    """
+    if not filename:
+        raise UnsupportedUploadError("Missing file name.")
+    if filename.startswith("."):
+        raise UnsupportedUploadError(f"Invalid file name: {filename}")
+
+
+class StreamedUpload:
+    """
+    A file received with `receive_upload`.
+    """
+
+    def __init__(self, path: Path, content_type: str, size: int, sha256: str, remote_file: Optional[File] = None):
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.remote_file = remote_file
+
+
+class EagerUploader:
+    """
+    Forward the bytes of an incoming file to a Gemini resumable upload session while they arrive.
+
+    Chunks are sent from a worker thread in multiples of the protocol granularity. The session is
+    opened without a total size, which is fixed by the finalizing chunk. The queue feeding the
+    thread is bounded, so a slow upload slows down reading the request instead of buffering it.
+    """
+
+    def __init__(self, gemini_client: GeminiClient, mime_type: str, display_name: str):
+        self._gemini_client = gemini_client
+        self._mime_type = mime_type
+        self._display_name = display_name
+        self._queue = queue.Queue(maxsize=EAGER_UPLOAD_QUEUE_SIZE)
+        self._result: Optional[File] = None
+        self._error: Optional[BaseException] = None
+        self._aborted = False
+        self._thread = threading.Thread(target=self._run, name="eager-upload", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            upload_url = self._gemini_client.start_upload_session(None, self._mime_type, self._display_name)
+            buffer = bytearray()
+            offset = 0
+            while True:
+                data = self._queue.get()
+                if self._aborted:
+                    return
+                if data is None:
+                    self._result = self._gemini_client.upload_chunk(upload_url, bytes(buffer), offset, finalize=True)
+                    return
+                buffer.extend(data)
+                while len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    self._gemini_client.upload_chunk(upload_url, bytes(buffer[:UPLOAD_CHUNK_SIZE]), offset)
+                    offset += UPLOAD_CHUNK_SIZE
+                    del buffer[:UPLOAD_CHUNK_SIZE]
+        except BaseException as e:
+            self._error = e
+            # keep draining, so the producer never blocks on a dead consumer
+            while not self._aborted:
+                try:
+                    if self._queue.get(timeout=1) is None:
+                        return
+                except queue.Empty:
+                    continue
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    async def feed(self, data: bytes):
+        if not self.failed:
+            await run_in_threadpool(self._queue.put, data)
+
+    async def finish(self) -> Optional[File]:
+        """
+        Send the last chunk and return the uploaded file, or None if the upload failed.
+        """
+        await run_in_threadpool(self._queue.put, None)
+        await run_in_threadpool(self._thread.join)
+        if self._error is not None:
+            logger.warning(f"Eager upload of {self._display_name} failed, it will be uploaded later: {self._error}")
+        return self._result
+
+    def abort(self):
+        """
+        Stop the upload without finalizing it.
+        """
+        self._aborted = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # the thread checks the flag when it takes the next chunk
+            pass
+
+
+async def receive_upload(
+        request: Request,
+        dest_dir: Path,
+        allowed_content_types: set[str],
+        field_name: str = "file",
+        max_size: int = MAX_UPLOAD_SIZE,
+        gemini_client: Optional[GeminiClient] = None,
+) -> StreamedUpload:
+    """
+    Stream a multipart file upload to disk, hashing it on the way.
+
+    The request body is parsed as it arrives, so memory use stays bounded by the chunk size.
+    The upload is written to a temporary file that only replaces `dest_dir/<filename>` once
+    complete. Oversized uploads are rejected from the Content-Length header when possible, and
+    otherwise as soon as the limit is crossed.
+
+    Args:
+        request: The incoming request.
+        dest_dir: Directory of the received file.
+        allowed_content_types: Accepted MIME types of the file part.
+        field_name: Name of the form field holding the file.
+        max_size: Maximum file size in bytes.
+        gemini_client: When given, the file is also uploaded to Gemini as the bytes arrive.
+
+    Returns:
+        The received file.
+
+    Raises:
+        UploadTooLargeError: If the file exceeds `max_size`.
+        UnsupportedUploadError: If the file part is missing, its content type is not allowed or
+            its file name is invalid.
+    """
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > max_size + 64 * 1024:
+        raise UploadTooLargeError(f"Upload exceeds the {max_size} bytes limit.")
+
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UnsupportedUploadError("Missing multipart boundary.")
+
+    state = {"headers": {}, "header_field": b"", "header_value": b"", "is_file": False}
+    pending: list[bytes] = []
+    file_info: dict = {}
+
+    def on_part_begin():
+        state.update(headers={}, is_file=False)
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].decode("latin-1").lower()] = state["header_value"].decode("latin-1")
+        state.update(header_field=b"", header_value=b"")
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get("content-disposition", ""))
+        if disposition.get(b"name", b"").decode() == field_name and b"filename" in disposition:
+            state["is_file"] = True
+            # the client controls the file name: drop any directory component
+            file_info["filename"] = Path(disposition[b"filename"].decode("utf-8", "replace")).name
+            file_info["content_type"] = state["headers"].get("content-type", "").split(";")[0].strip()
+
+    def on_part_data(data, start, end):
+        if state["is_file"]:
+            pending.append(data[start:end])
+
+    parser = multipart.MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+        },
+    )
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_dir.joinpath(f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    uploader: Optional[EagerUploader] = None
+    f = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if not pending:
+                continue
+            if f is None:
+                check_upload_file_name(file_info.get("filename"))
+                if file_info.get("content_type") not in allowed_content_types:
+                    raise UnsupportedUploadError(f"Unsupported content type: {file_info.get('content_type')}")
+                f = open(tmp_path, "wb")
+                if gemini_client is not None:
+                    uploader = EagerUploader(gemini_client, file_info["content_type"], file_info["filename"])
+            for data in pending:
+                size += len(data)
+                if size > max_size:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_size} bytes limit.")
+                digest.update(data)
+                await run_in_threadpool(f.write, data)
+                if uploader is not None:
+                    await uploader.feed(data)
+            pending.clear()
+        parser.finalize()
+
+        if f is None:
+            # an empty file part never produces data
+            if not file_info.get("filename"):
+                raise UnsupportedUploadError(f"Missing '{field_name}' file field.")
+            check_upload_file_name(file_info["filename"])
+            if file_info["content_type"] not in allowed_content_types:
+                raise UnsupportedUploadError(f"Unsupported content type: {file_info['content_type']}")
+            f = open(tmp_path, "wb")
+        f.close()
+
+        remote_file = await uploader.finish() if uploader is not None else None
+        uploader = None
+        file_path = dest_dir.joinpath(file_info["filename"])
+        os.replace(tmp_path, file_path)
+        return StreamedUpload(file_path, file_info["content_type"], size, digest.hexdigest(), remote_file)
+    finally:
+        if f is not None and not f.closed:
+            f.close()
+        if uploader is not None:
+            uploader.abort()
+        tmp_path.unlink(missing_ok=True)
@@ -1,73 +1,162 @@
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Callable, Iterable
+
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import select
 
 from geminiplayground.parts import MultimodalPartFactory, GitRepo
-from geminiplayground.utils import LibUtils
+from geminiplayground.utils import LibUtils, MemoryCache
 from geminiplayground.web.db.models import MultimodalPartEntry
-from geminiplayground.web.db.session_manager import get_db_session
+from geminiplayground.web.db.session_manager import sessionmanager
+
+STREAM_BUFFER_SIZE = 16
+# Tagged parts resolved at once; resolving may upload files
+PART_RESOLVE_CONCURRENCY = 4
+PART_REGISTRY_SIZE = 256
+_STREAM_END = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(iterable_factory: Callable[[], Iterable], max_buffer: int = STREAM_BUFFER_SIZE) -> AsyncIterator:
+    """
+    Consume a blocking iterable in a worker thread and yield its items on the event loop.
+
+    Items are forwarded through a bounded asyncio queue: once `max_buffer` items are pending,
+    the worker blocks until the consumer catches up. Closing the async iterator (e.g. because
+    the consuming task was cancelled) stops the worker and closes the underlying iterator.
+
+    Args:
+        iterable_factory: Called in the worker thread, so that creating the iterable
+            (e.g. sending the request) doesn't block the event loop either.
+        max_buffer: Maximum number of items waiting to be consumed.
+
+    Yields:
+        The items of the iterable. Exceptions raised by it are re-raised here.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffer)
+    cancelled = threading.Event()
+
+    def put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not cancelled.is_set():
+            try:
+                future.result(timeout=0.1)
+                return True
+            except FutureTimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def produce():
+        iterator = None
+        try:
+            iterator = iter(iterable_factory())
+            for item in iterator:
+                if cancelled.is_set() or not put(item):
+                    break
+            else:
+                put(_STREAM_END)
+        except BaseException as e:
+            put(_StreamError(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, name="stream-bridge", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, _StreamError):
+                raise item.error
+            yield item
+    finally:
+        cancelled.set()
 
-from asyncio import gather
+
+# part objects by content type, path and modification time
+part_registry = MemoryCache(max_size=PART_REGISTRY_SIZE)
 
 
 async def get_parts_from_prompt_text(prompt):
     """
-    Transform prompt into parts.
+    Transform prompt into parts, keeping the text and the tagged parts in their prompt order.
     :param prompt: The prompt text.
     :return: A list of parts.
     """
 
     prompt_parts = LibUtils.split_and_label_prompt_parts_from_string(prompt)
-    files_dir = LibUtils.get_lib_home()
-    repos_dir = files_dir.joinpath("repos")
+    names = list(dict.fromkeys(part["value"] for part in prompt_parts if part["type"] == "multimodal"))
+    resolved = await resolve_multimodal_parts(names) if names else {}
 
-    # Separate multimodal parts for concurrent processing
-    text_parts = [part for part in prompt_parts if part["type"] == "text"]
-    multimodal_parts = [part for part in prompt_parts if part["type"] == "multimodal"]
+    parts = []
+    for part in prompt_parts:
+        if part["type"] == "multimodal":
+            parts.extend(resolved.get(part["value"], []))
+        else:
+            parts.append(part["value"])
+    return parts
 
-    # Process text parts
-    parts = [part["value"] for part in text_parts]
 
-    # Process multimodal parts concurrently
-    multimodal_results = await gather(
-        *[
-            process_multimodal_part(part, files_dir, repos_dir)
-            for part in multimodal_parts
-        ]
-    )
-    for result in multimodal_results:
-        parts.extend(result)
+def get_multimodal_part(name: str, content_type: str):
+    """
+    Return the part object of a part entry, reusing it while its file or folder is unchanged.
+    :param name: The part name.
+    :param content_type: The part content type.
+    :return: The part object.
+    """
+    files_dir = LibUtils.get_lib_home()
+    if content_type in ["image", "video", "audio", "pdf"]:
+        path = files_dir.joinpath(name)
+    elif content_type == "repo":
+        path = files_dir.joinpath("repos", name)
+    else:
+        raise ValueError(f"Unsupported content type: {content_type}")
 
-    return parts
+    key = (content_type, str(path), path.stat().st_mtime_ns if path.exists() else None)
+    multimodal_part = part_registry.get(key)
+    if multimodal_part is None:
+        if content_type == "repo":
+            multimodal_part = GitRepo.from_folder(path, config={"content": "code-files"})
+        else:
+            multimodal_part = MultimodalPartFactory.from_path(path)
+        part_registry.set(key, multimodal_part)
+    return multimodal_part
 
 
-async def process_multimodal_part(part, files_dir, repos_dir):
+async def resolve_multimodal_parts(names: list[str]) -> dict[str, list]:
     """
-    Process a multimodal part asynchronously.
-    :param part: The part to process.
-    :param files_dir: The directory for files.
-    :param repos_dir: The directory for repos.
-    :return: A list of content parts from the multimodal part.
+    Resolve tagged parts to their content parts.
+
+    The part entries are fetched with a single query, and the blocking content part resolution
+    (which may upload files) runs in the threadpool, at most `PART_RESOLVE_CONCURRENCY` at once.
+    Unknown names are left out.
+    :param names: The part names.
+    :return: The content parts of each known part.
     """
-    parts = []
-    async for session in get_db_session():
-        part_entry = await session.execute(
-            select(MultimodalPartEntry).filter(
-                MultimodalPartEntry.name == part["value"]
+    async with sessionmanager.session() as session:
+        result = await session.execute(
+            select(MultimodalPartEntry.name, MultimodalPartEntry.content_type).where(
+                MultimodalPartEntry.name.in_(names)
             )
         )
-        part_entry = part_entry.scalars().first()
-        if part_entry:
-            content_type = part_entry.content_type
-            if content_type in ["image", "video", "audio", "pdf"]:
-                file_path = files_dir.joinpath(part_entry.name)
-                multimodal_part = MultimodalPartFactory.from_path(file_path)
-                parts.extend(multimodal_part.content_parts())
-            elif content_type == "repo":
-                repo_folder = repos_dir.joinpath(part_entry.name)
-                repo = GitRepo.from_folder(
-                    repo_folder,
-                    config={"content": "code-files"},
-                )
-                parts.extend(repo.content_parts())
-            else:
-                raise ValueError(f"Unsupported content type: {content_type}")
-    return parts
+        entries = result.all()
+
+    semaphore = asyncio.Semaphore(PART_RESOLVE_CONCURRENCY)
+
+    async def resolve(name: str, content_type: str):
+        async with semaphore:
+            multimodal_part = await run_in_threadpool(get_multimodal_part, name, content_type)
+            return await run_in_threadpool(multimodal_part.content_parts)
+
+    content_parts = await asyncio.gather(*(resolve(name, content_type) for name, content_type in entries))
+    return {name: parts for (name, _), parts in zip(entries, content_parts)}
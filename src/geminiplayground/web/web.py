@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 
@@ -5,14 +6,16 @@ from fastapi import FastAPI, HTTPException
 from fastapi import Request
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.concurrency import run_in_threadpool
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 import logging
 
 from fastapi.staticfiles import StaticFiles
 
-from geminiplayground.core import GeminiPlayground, ToolCall
-from geminiplayground.web.utils import get_parts_from_prompt_text
+from geminiplayground.core import ToolCall
+from geminiplayground.web.chat_sessions import chat_sessions, history_messages
+from geminiplayground.web.utils import get_parts_from_prompt_text, iterate_in_thread
+from geminiplayground.web.thumbnails import thumbnail_service, THUMBNAIL_CACHE_CONTROL
+from geminiplayground.web.events import event_bus
 
 logger = logging.getLogger(__name__)
 web = FastAPI()
@@ -41,6 +44,22 @@ def list_files(request: Request) -> HTMLResponse:
     )
 
 
+@web.get("/files/thumbnails/{thumbnail_name}")
+async def get_thumbnail(thumbnail_name: str) -> FileResponse:
+    """
+    Return a content-addressed thumbnail, regenerating it if it is missing.
+    """
+    thumbnail_path = await thumbnail_service.resolve(thumbnail_name)
+    if thumbnail_path is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    return FileResponse(
+        thumbnail_path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": THUMBNAIL_CACHE_CONTROL},
+    )
+
+
 @web.get("/files/{file_name}")
 def get_file(file_name: str) -> FileResponse:
     """
@@ -61,15 +80,71 @@ async def dispatch_event(websocket: WebSocket, event_type, data=None):
     await websocket.send_json({"event": event_type, "data": data})
 
 
+async def generate_response(
+        ws: WebSocket, session_id: str, model: str, prompt: str, previous: asyncio.Task = None
+):
+    """
+    Stream the response to a prompt over the websocket.
+
+    The blocking SDK stream is consumed in a worker thread, so a slow stream never stalls the
+    event loop, and cancelling this coroutine stops it. Tool calls are sent as "tool_call" events
+    as they complete, while the model goes on answering. Chat turns are sequential, so the
+    response to the `previous` prompt is awaited first, and so is the turn of any other
+    websocket sharing the session. The session history is saved once the response is complete.
+    """
+    if previous is not None:
+        await asyncio.wait([previous])
+    try:
+        async with chat_sessions.turn(session_id):
+            chat = await chat_sessions.get(session_id, model)
+            prompt_parts = await get_parts_from_prompt_text(prompt)
+            await dispatch_event(ws, "response_started")
+            async for message_chunk in iterate_in_thread(lambda: chat.send_message(prompt_parts)):
+                if isinstance(message_chunk, ToolCall):
+                    await dispatch_event(ws, "tool_call", message_chunk.model_dump(mode="json"))
+                    continue
+                await dispatch_event(ws, "response_chunk", message_chunk.text)
+            await dispatch_event(ws, "response_completed")
+            await chat_sessions.save(session_id, chat)
+    except asyncio.CancelledError:
+        logger.info("Response generation cancelled")
+        raise
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(e)
+        await dispatch_event(ws, "response_error", {"message": str(e)})
+
+
+async def forward_part_events(ws: WebSocket):
+    """
+    Forward part events to the websocket until cancelled.
+    """
+    with event_bus.subscribe() as queue:
+        while True:
+            event = await queue.get()
+            await dispatch_event(ws, "part_event", event.model_dump(mode="json"))
+
+
 @web.websocket("/ws")
 async def websocket_receiver(ws: WebSocket):
     """
     Websocket receiver
+
+    Connect with `?session_id=<id>` to resume a conversation; the session id and the restored
+    history are sent in a "session_restored" event.
     """
+    generations: set[asyncio.Task] = set()
+    generation: asyncio.Task = None
+    part_events: asyncio.Task = None
     try:
         await ws.accept()
-        chat = None
-        logger.info(f"Websocket connected to {chat}")
+        session_id = chat_sessions.session_id(ws.query_params.get("session_id"))
+        history = await chat_sessions.history(session_id)
+        await dispatch_event(
+            ws, "session_restored", {"session_id": session_id, "history": history_messages(history)}
+        )
+        logger.info(f"Websocket connected to chat session {session_id}")
         while True:
             data = await ws.receive_json()
             event = data.get("event")
@@ -77,8 +152,9 @@ async def websocket_receiver(ws: WebSocket):
 
             match event:
                 case "clear_queue":
-                    if chat:
-                        chat.reset_chat()
+                    for task in generations:
+                        task.cancel()
+                    await chat_sessions.reset(session_id)
                 case "generate_response":
                     try:
                         generate_prompt = data.get("message")
@@ -86,27 +162,31 @@ async def websocket_receiver(ws: WebSocket):
                         model = generate_settings.get("model", None)
                         if model is None:
                             raise ValueError("Model not specified")
-                        if chat is None or chat.model != model:
-                            playground = GeminiPlayground(model=model)
-                            chat = playground.start_chat()
-                        prompt_parts = await get_parts_from_prompt_text(generate_prompt)
-                        generate_response = await run_in_threadpool(chat.send_message, prompt_parts)
-                        await dispatch_event(ws, "response_started")
-                        for message_chunk in generate_response:
-                            if isinstance(message_chunk, ToolCall):
-                                await dispatch_event(ws, "response_chunk",
-                                                     f"Calling function ...{message_chunk.tool_name}")
-                                break
-                            await dispatch_event(ws, "response_chunk", message_chunk.text)
-                        await dispatch_event(ws, "response_completed")
+                        generation = asyncio.create_task(
+                            generate_response(ws, session_id, model, generate_prompt, generation)
+                        )
+                        generations.add(generation)
+                        generation.add_done_callback(generations.discard)
                     except Exception as e:
                         logger.error(e)
                         await dispatch_event(ws, "response_error", {"message": str(e)})
+                case "subscribe_parts":
+                    if part_events is None or part_events.done():
+                        part_events = asyncio.create_task(forward_part_events(ws))
+                case "unsubscribe_parts":
+                    if part_events is not None:
+                        part_events.cancel()
+                        part_events = None
                 case _:
                     pass
 
     except WebSocketDisconnect:
         logger.warning("client disconnected ...")
+    finally:
+        for task in generations:
+            task.cancel()
+        if part_events is not None:
+            part_events.cancel()
 
 
 os.environ["FILES_DIR"] = str(FILES_DIR)
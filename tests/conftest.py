@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# the package reads its home and API key at import time
+os.environ.setdefault("GEMINI_PLAYGROUND_HOME", tempfile.mkdtemp(prefix="geminiplayground-tests-"))
+os.environ.setdefault("GEMINI_API_KEY", "test")
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from diskcache import Cache
+
+from geminiplayground.utils import Cacheable
+
+
+def make_document_class(cache):
+    @Cacheable(cache, "name")
+    class Document:
+        calls = 0
+
+        def __init__(self, name):
+            self.name = name
+
+        @Cacheable.cache_func
+        def describe(self, prefix):
+            Document.calls += 1
+            return f"{prefix} {self.name}"
+
+    return Document
+
+
+def test_cache_func_keeps_the_results_of_instances_apart(tmp_path):
+    Document = make_document_class(Cache(str(tmp_path)))
+    first, second = Document("first"), Document("second")
+
+    assert first.describe("about") == "about first"
+    assert second.describe("about") == "about second"
+    assert first.describe("about") == "about first"
+    assert Document.calls == 2
+
+
+def test_clear_cache_drops_only_the_instance_results(tmp_path):
+    Document = make_document_class(Cache(str(tmp_path)))
+    first, second = Document("first"), Document("second")
+    first.describe("about")
+    second.describe("about")
+
+    first.clear_cache()
+    first.describe("about")
+    second.describe("about")
+    assert Document.calls == 3
+
+
+def test_get_or_set_computes_once_under_contention(tmp_path):
+    Document = make_document_class(Cache(str(tmp_path)))
+    document = Document("report")
+    computed = []
+
+    def compute():
+        computed.append(threading.get_ident())
+        time.sleep(0.1)
+        return "summary"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(document.get_or_set("summary", compute)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["summary"] * 4
+    assert len(computed) == 1
+
+
+def test_key_lock_is_reentrant_and_excludes_other_threads(tmp_path):
+    cache = Cache(str(tmp_path))
+    acquired = []
+
+    def try_lock():
+        with Cacheable.key_lock(cache, "report", blocking=False) as locked:
+            acquired.append(locked)
+
+    with Cacheable.key_lock(cache, "report") as locked:
+        with Cacheable.key_lock(cache, "report") as relocked:
+            assert locked and relocked
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    assert acquired == [False]
+    assert "lock:report" not in cache
+    with Cacheable.key_lock(cache, "report", blocking=False) as locked:
+        assert locked
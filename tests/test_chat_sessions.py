@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from geminiplayground.web.chat_sessions import ChatSessionStore
+from geminiplayground.web.db.models import ChatSessionEntry
+from geminiplayground.web.db.session_manager import sessionmanager
+
+
+def run(scenario):
+    async def main():
+        await sessionmanager.init(drop_all=True)
+        try:
+            return await scenario()
+        finally:
+            # pooled connections belong to this event loop
+            await sessionmanager._engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_expire_deletes_only_sessions_unused_for_the_ttl():
+    # a private instance, bypassing the singleton
+    store = type.__call__(ChatSessionStore, session_ttl=60)
+
+    async def scenario():
+        async with sessionmanager.session() as session:
+            session.add(ChatSessionEntry(id="old", model="m", history="[]", updated_at=time.time() - 120))
+            session.add(ChatSessionEntry(id="recent", model="m", history="[]", updated_at=time.time()))
+            await session.commit()
+        expired = await store.expire()
+        async with sessionmanager.session() as session:
+            return expired, await session.get(ChatSessionEntry, "old"), await session.get(ChatSessionEntry, "recent")
+
+    expired, old, recent = run(scenario)
+    assert expired == 1
+    assert old is None and recent is not None
+
+
+def test_turns_of_a_session_do_not_interleave():
+    store = type.__call__(ChatSessionStore)
+    events = []
+
+    async def turn(session_id, name):
+        async with store.turn(session_id):
+            events.append(f"{name} started")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} ended")
+
+    async def scenario():
+        await asyncio.gather(turn("shared", "first"), turn("shared", "second"), turn("other", "other"))
+
+    asyncio.run(scenario())
+    assert events.index("first ended") < events.index("second started")
+    assert events.index("other started") < events.index("first ended")
+    assert store._turn_locks == {}
@@ -0,0 +1,55 @@
+import http.server
+import threading
+
+import pytest
+
+from geminiplayground.utils import DownloadCache
+
+CONTENT = b"x" * 10_000
+ETAG = '"v1"'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.command, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(CONTENT)))
+        self.end_headers()
+        self.wfile.write(CONTENT)
+
+    def do_HEAD(self):
+        # ignores conditional headers, like many servers
+        self.requests.append((self.command, self.headers.get("If-None-Match")))
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/file.bin"
+    httpd.shutdown()
+
+
+def test_stale_entries_are_revalidated_with_a_conditional_get(tmp_path, server):
+    # a private instance, bypassing the singleton
+    cache = type.__call__(DownloadCache, directory=tmp_path, max_age=0)
+
+    first = cache.get(server)
+    second = cache.get(server)
+
+    assert first == second and first.read_bytes() == CONTENT
+    assert Handler.requests == [("GET", None), ("GET", ETAG)]
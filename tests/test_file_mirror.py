@@ -0,0 +1,39 @@
+import datetime
+
+from google.genai.types import File
+
+from geminiplayground.core import GeminiClient
+from geminiplayground.core.file_mirror import FileMirror
+
+FILES_URL = "https://generativelanguage.googleapis.com/v1beta/files"
+
+
+def test_find_matches_name_prefixes_literally(tmp_path):
+    mirror = FileMirror(gemini_client=None, database=tmp_path / "mirror.db")
+    mirror.upsert([
+        File(name="files/a", display_name="C:\\reports\\q1_100%.pdf"),
+        File(name="files/b", display_name="C:\\reportsXq1"),
+        File(name="files/c", display_name="q1x100.pdf"),
+    ])
+
+    def names(prefix):
+        return sorted(file.name for file in mirror.find(name_prefix=prefix))
+
+    assert names("C:\\reports\\") == ["files/a"]
+    assert names("C:\\reports\\q1_100%") == ["files/a"]
+    assert names("q1_") == []
+
+
+def test_files_are_available_until_they_expire(tmp_path):
+    # a private instance, bypassing the singleton
+    client = type.__call__(GeminiClient, api_key="test")
+    client._file_mirror = FileMirror(client, database=tmp_path / "mirror.db")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    client.file_mirror.upsert([
+        File(name="files/live", expiration_time=now + datetime.timedelta(hours=1)),
+        File(name="files/expired", expiration_time=now - datetime.timedelta(hours=1)),
+    ])
+
+    assert client.is_file_available(f"{FILES_URL}/live")
+    assert not client.is_file_available(f"{FILES_URL}/expired")
+    assert client.is_file_available("https://example.com/files/photo.png")
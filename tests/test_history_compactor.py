@@ -0,0 +1,83 @@
+import uuid
+from types import SimpleNamespace
+
+from google.genai.types import Content, FileData, Part
+
+from geminiplayground.core import HistoryCompactor
+from geminiplayground.core.history_compactor import HISTORY_SUMMARY_ACK, HISTORY_SUMMARY_PREFIX
+
+FILES_URL = "https://generativelanguage.googleapis.com/v1beta/files"
+
+
+class FakeGeminiClient:
+    def __init__(self, summaries, unavailable=()):
+        self.summaries = list(summaries)
+        self.unavailable = set(unavailable)
+        self.prompts = []
+
+    def generate(self, model, prompt, config=None):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=self.summaries.pop(0))
+
+    def is_file_available(self, file_uri):
+        return file_uri not in self.unavailable
+
+
+def make_compactor(client, **kwargs):
+    # a model name of its own, so summaries cached by other tests are never hit
+    return HistoryCompactor(
+        token_budget=2_000, keep_recent=2, summary_model=f"test-{uuid.uuid4().hex}", gemini_client=client, **kwargs
+    )
+
+
+def make_history(turns, files=()):
+    history = []
+    for turn in range(turns):
+        parts = [Part(text=f"question {turn} " + "x" * 2_000)]
+        if turn < len(files):
+            parts.append(Part(file_data=FileData(file_uri=files[turn], mime_type="image/png")))
+        history.append(Content(role="user", parts=parts))
+        history.append(Content(role="model", parts=[Part(text=f"answer {turn} " + "y" * 2_000)]))
+    return history
+
+
+def test_histories_within_the_budget_are_kept():
+    compactor = make_compactor(FakeGeminiClient([]))
+    history = make_history(1)
+
+    assert compactor.compact(history) is history
+
+
+def test_older_turns_are_replaced_with_a_summary_keeping_available_files():
+    files = [f"{FILES_URL}/{name}" for name in ("a", "b", "c")]
+    client = FakeGeminiClient(["They talked."], unavailable={files[1]})
+    compactor = make_compactor(client, max_files=4)
+    history = make_history(4, files)
+
+    compacted = compactor.compact(history)
+
+    summary, ack, *recent = compacted
+    assert summary.parts[0].text == f"{HISTORY_SUMMARY_PREFIX}\nThey talked."
+    assert [part.file_data.file_uri for part in summary.parts[1:]] == [files[0], files[2]]
+    assert ack.parts[0].text == HISTORY_SUMMARY_ACK
+    assert recent == history[-2:]
+    assert compactor.is_summary(summary)
+
+
+def test_summaries_are_cached_by_the_turns_they_replace():
+    client = FakeGeminiClient(["They talked."])
+    compactor = make_compactor(client)
+    history = make_history(4)
+
+    assert compactor.compact(history) == compactor.compact(history)
+    assert len(client.prompts) == 1
+
+
+def test_an_empty_summary_keeps_the_history_and_is_not_cached():
+    client = FakeGeminiClient(["", "They talked."])
+    compactor = make_compactor(client)
+    history = make_history(4)
+
+    assert compactor.compact(history) is history
+    assert compactor.compact(history)[0].parts[0].text.endswith("They talked.")
+    assert len(client.prompts) == 2
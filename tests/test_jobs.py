@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+from sqlalchemy import select, update
+
+from geminiplayground.web import jobs
+from geminiplayground.web.db.models import Job, JobStatus
+from geminiplayground.web.db.session_manager import sessionmanager
+from geminiplayground.web.jobs import JobQueue
+
+
+def run(scenario):
+    async def main():
+        await sessionmanager.init(drop_all=True)
+        try:
+            return await scenario()
+        finally:
+            # pooled connections belong to this event loop
+            await sessionmanager._engine.dispose()
+
+    return asyncio.run(main())
+
+
+def make_queue(handler, on_failure=None):
+    # a private instance, bypassing the singleton
+    queue = type.__call__(JobQueue)
+    queue.register("work", on_failure=on_failure)(handler)
+    return queue
+
+
+async def get_job(job_id):
+    async with sessionmanager.session() as session:
+        return (await session.execute(select(Job).where(Job.id == job_id))).scalar_one_or_none()
+
+
+def test_jobs_are_claimed_by_priority():
+    async def handler(payload, context):
+        pass
+
+    async def scenario():
+        queue = make_queue(handler)
+        low = await queue.enqueue("work")
+        high = await queue.enqueue("work", priority=5)
+        claims = [await queue._claim() for _ in range(3)]
+        return [low, high], claims
+
+    (low, high), claims = run(scenario)
+    assert [job.id for job in claims[:2]] == [high, low]
+    assert claims[2] is None
+    assert all(job.status == JobStatus.RUNNING and job.attempts == 1 for job in claims[:2])
+
+
+def test_concurrent_claims_take_a_job_once():
+    async def handler(payload, context):
+        pass
+
+    async def scenario():
+        queue, other_queue = make_queue(handler), make_queue(handler)
+        await queue.enqueue("work")
+        return await asyncio.gather(queue._claim(), other_queue._claim())
+
+    claims = run(scenario)
+    assert len([job for job in claims if job is not None]) == 1
+
+
+def test_pending_jobs_are_deduplicated():
+    async def handler(payload, context):
+        pass
+
+    async def scenario():
+        queue = make_queue(handler)
+        first = await queue.enqueue("work", dedup_key="same")
+        second = await queue.enqueue("work", dedup_key="same")
+        return first, second
+
+    first, second = run(scenario)
+    assert first == second
+
+
+def test_failed_jobs_are_retried_until_they_succeed(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_BACKOFF_BASE", 0.0)
+    attempts = []
+
+    async def handler(payload, context):
+        attempts.append(context.attempt)
+        if context.attempt == 1:
+            raise RuntimeError("flaky")
+
+    async def scenario():
+        queue = make_queue(handler)
+        job_id = await queue.enqueue("work")
+        assert await queue.run_once()
+        retried = await get_job(job_id)
+        assert await queue.run_once()
+        return retried, await get_job(job_id)
+
+    retried, finished = run(scenario)
+    assert attempts == [1, 2]
+    assert retried.status == JobStatus.QUEUED and retried.error == "flaky"
+    assert finished is None
+
+
+def test_jobs_failing_every_attempt_call_their_failure_handler(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_BACKOFF_BASE", 0.0)
+    failures = []
+
+    async def handler(payload, context):
+        raise RuntimeError("broken")
+
+    async def on_failure(payload, context, error):
+        failures.append((payload, context.attempt, str(error)))
+
+    async def scenario():
+        queue = make_queue(handler, on_failure)
+        job_id = await queue.enqueue("work", {"n": 1}, max_attempts=2)
+        while await queue.run_once():
+            pass
+        return await get_job(job_id)
+
+    failed = run(scenario)
+    assert failed.status == JobStatus.FAILED
+    assert failures == [({"n": 1}, 2, "broken")]
+
+
+def test_jobs_of_dead_workers_are_reclaimed_once_their_lease_lapsed():
+    async def handler(payload, context):
+        pass
+
+    async def scenario():
+        queue = make_queue(handler)
+        job_id = await queue.enqueue("work")
+        # a job left running by a worker that died
+        async with sessionmanager.session() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(status=JobStatus.RUNNING, locked_by="dead", locked_at=time.time() - 2 * jobs.JOB_LEASE)
+            )
+            await session.commit()
+        return job_id, await queue._claim()
+
+    job_id, claimed = run(scenario)
+    assert claimed is not None and claimed.id == job_id and claimed.locked_by != "dead"
+
+
+def test_a_running_job_renews_its_lease(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_RENEW_INTERVAL", 0.05)
+    lease_times = []
+
+    async def handler(payload, context):
+        started = (await get_job(context.job_id)).locked_at
+        await asyncio.sleep(0.3)
+        lease_times.append((started, (await get_job(context.job_id)).locked_at))
+
+    async def scenario():
+        queue = make_queue(handler)
+        await queue.enqueue("work")
+        await queue.run_once()
+
+    run(scenario)
+    [(started, renewed)] = lease_times
+    assert renewed > started
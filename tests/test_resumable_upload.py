@@ -0,0 +1,95 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from geminiplayground.core import gemini_client as gemini_client_module
+from geminiplayground.core import GeminiClient
+
+CHUNK_SIZE = gemini_client_module.UPLOAD_CHUNK_GRANULARITY
+CONTENT = bytes(range(256)) * (CHUNK_SIZE * 2 // 256) + b"tail"
+
+
+class UploadServer(http.server.BaseHTTPRequestHandler):
+    """
+    A stand-in for the resumable upload endpoint, failing the requests listed in `fail`
+    after processing them, as when a response is lost.
+    """
+
+    received = bytearray()
+    final = False
+    commands = []
+    fail = set()
+
+    def _reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _file(self):
+        return json.dumps({"file": {"name": "files/upload", "size_bytes": len(self.received)}}).encode()
+
+    def do_POST(self):
+        command = self.headers["X-Goog-Upload-Command"]
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).commands.append(command)
+        if command == "start":
+            self._reply(200, {"X-Goog-Upload-URL": f"http://127.0.0.1:{self.server.server_port}/session"})
+        elif command == "query":
+            if self.final:
+                self._reply(200, {"X-Goog-Upload-Status": "final"}, self._file())
+            else:
+                self._reply(200, {"X-Goog-Upload-Status": "active",
+                                  "X-Goog-Upload-Size-Received": str(len(self.received))})
+        else:
+            assert int(self.headers["X-Goog-Upload-Offset"]) == len(self.received)
+            self.received.extend(data)
+            type(self).final = "finalize" in command
+            if len(self.commands) in self.fail:
+                self._reply(503)
+            else:
+                self._reply(200, {"X-Goog-Upload-Status": "final" if self.final else "active"},
+                            self._file() if self.final else b"")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    UploadServer.received, UploadServer.final, UploadServer.commands = bytearray(), False, []
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), UploadServer)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(gemini_client_module, "sleep", lambda seconds: None)
+    # a private instance, bypassing the singleton
+    client = type.__call__(GeminiClient, api_key="test")
+    client.upload_base_url = f"http://127.0.0.1:{httpd.server_port}"
+    yield client
+    httpd.shutdown()
+
+
+def upload(client, tmp_path, fail):
+    UploadServer.fail = fail
+    file_path = tmp_path / "video.bin"
+    file_path.write_bytes(CONTENT)
+    return client.upload_file_resumable(file_path, "application/octet-stream", chunk_size=CHUNK_SIZE)
+
+
+def test_a_failed_chunk_resumes_from_the_received_bytes(client, tmp_path):
+    uploaded_file = upload(client, tmp_path, fail={2})
+
+    assert uploaded_file.name == "files/upload"
+    assert bytes(UploadServer.received) == CONTENT
+    assert UploadServer.commands == ["start", "upload", "query", "upload", "upload, finalize"]
+
+
+def test_a_lost_finalize_response_returns_the_finalized_file(client, tmp_path):
+    uploaded_file = upload(client, tmp_path, fail={4})
+
+    assert uploaded_file.name == "files/upload"
+    assert uploaded_file.size_bytes == len(CONTENT)
+    assert UploadServer.commands == ["start", "upload", "upload", "upload, finalize", "query"]
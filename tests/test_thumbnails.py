@@ -0,0 +1,41 @@
+import asyncio
+
+from PIL import Image
+
+from geminiplayground.web.thumbnails import ThumbnailService
+
+
+def test_resolve_regenerates_from_a_matching_source(tmp_path):
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (64, 64), "red").save(source)
+    service = ThumbnailService(tmp_path / "thumbnails", max_workers=1)
+
+    async def scenario():
+        name = await service.create(source, "image")
+        (service.thumbnails_dir / name).unlink()
+        return name, await service.resolve(name)
+
+    try:
+        name, resolved = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    assert resolved is not None and resolved.name == name
+
+
+def test_resolve_refuses_a_source_overwritten_with_other_content(tmp_path):
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (64, 64), "red").save(source)
+    service = ThumbnailService(tmp_path / "thumbnails", max_workers=1)
+
+    async def scenario():
+        name = await service.create(source, "image")
+        (service.thumbnails_dir / name).unlink()
+        Image.new("RGB", (64, 64), "blue").save(source)
+        return name, await service.resolve(name)
+
+    try:
+        name, resolved = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    assert resolved is None
+    assert not (service.thumbnails_dir / name).exists()
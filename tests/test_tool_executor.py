@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from google.genai.types import FunctionCall
+
+from geminiplayground.core.tool_executor import ToolExecutor
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def fail():
+    raise RuntimeError("broken")
+
+
+def block():
+    time.sleep(1)
+
+
+async def add_later(a: int, b: int) -> int:
+    await asyncio.sleep(0.01)
+    return a + b
+
+
+async def wait_forever():
+    await asyncio.sleep(60)
+
+
+TOOLBOX = {
+    "add": add,
+    "fail": fail,
+    "block": block,
+    "add_later": add_later,
+    "wait_forever": wait_forever,
+}
+
+
+def run(calls, timeout=5.0):
+    executor = ToolExecutor(TOOLBOX, timeout=timeout)
+    return {call.id: part.function_response.response for call, part in executor.run(calls)}
+
+
+def test_sync_and_async_tools_return_their_results():
+    responses = run([
+        FunctionCall(id="1", name="add", args={"a": 1, "b": 2}),
+        FunctionCall(id="2", name="add_later", args={"a": 3, "b": 4}),
+    ])
+
+    assert responses == {"1": {"result": 3}, "2": {"result": 7}}
+
+
+def test_errors_and_unknown_tools_become_error_responses():
+    responses = run([
+        FunctionCall(id="1", name="fail"),
+        FunctionCall(id="2", name="missing"),
+        FunctionCall(id="3", name="add", args={"c": 1}),
+        FunctionCall(id="4", name="add_later", args={"c": 1}),
+    ])
+
+    assert responses["1"] == {"error": "RuntimeError: broken"}
+    assert responses["2"] == {"error": "ValueError: Unknown tool: missing"}
+    assert responses["3"]["error"].startswith("TypeError:")
+    assert responses["4"]["error"].startswith("TypeError:")
+
+
+def test_timed_out_calls_come_last_without_holding_up_the_others():
+    started = time.monotonic()
+    executor = ToolExecutor(TOOLBOX, timeout=0.2)
+    results = list(executor.run([
+        FunctionCall(id="1", name="wait_forever"),
+        FunctionCall(id="2", name="block"),
+        FunctionCall(id="3", name="add", args={"a": 1, "b": 1}),
+    ]))
+
+    assert time.monotonic() - started < 0.9
+    assert results[0][0].id == "3" and results[0][1].function_response.response == {"result": 2}
+    assert {call.id: part.function_response.response for call, part in results[1:]} == {
+        "1": {"error": "wait_forever timed out"},
+        "2": {"error": "block timed out"},
+    }